@@ -21,16 +21,50 @@ Example::
 """
 
 
-# Import console logging / printing functions
-from fruit.modules.console import echo, error, warning
+import importlib
+import sys
 
-# Export decorators
-from fruit.api.decorators import target, step, provider
+# Exported names of the fruit api and the modules defining them. The modules are imported on
+# first access of a name, so that importing fruit (e.g. for the cli) stays fast.
+_EXPORTS = {
+    # Console logging / printing functions
+    'echo': 'fruit.modules.console',
+    'error': 'fruit.modules.console',
+    'warning': 'fruit.modules.console',
 
-# Export exceptions
-from fruit.api.api import abort, finish, skip, fail
+    # Decorators
+    'target': 'fruit.api.decorators',
+    'step': 'fruit.api.decorators',
+    'provider': 'fruit.api.decorators',
 
-# Export the shell module
-from fruit.api.shell import shell
+    # Exceptions
+    'abort': 'fruit.api.api',
+    'finish': 'fruit.api.api',
+    'skip': 'fruit.api.api',
+    'fail': 'fruit.api.api',
 
-from fruit.modules.config import config
+    # Shell module
+    'shell': 'fruit.api.shell',
+    'shell_many': 'fruit.api.shell',
+    'ashell': 'fruit.api.shell',
+
+    # Parallel steps
+    'map': 'fruit.api.parallel',
+
+    'config': 'fruit.modules.config',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    # NOTE: The builtin globals() is shadowed by the submodule fruit.globals
+    module = sys.modules[__name__]
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    setattr(module, name, value) # Skip the lookup on the next access
+    return value
+
+def __dir__():
+    return sorted(set(vars(sys.modules[__name__])) | set(_EXPORTS))
@@ -1,12 +1,12 @@
 
 from fruit.modules.garden import Garden
 from fruit.modules.target import Target
-from fruit.modules.step   import Step
+from fruit.modules.step   import StepDescriptor
 from fruit.modules.provider import Provider
 
-from typing import Callable, Any
+from typing import Callable, Any, List
 
-def target(name:str=None, help:str=None): # TODO: Document
+def target(name:str=None, help:str=None, depends:List[str]=None, tags:List[str]=None): # TODO: Document
     """
     Create a new target, that can be executed via `fruit make`.
 
@@ -19,6 +19,34 @@ def target(name:str=None, help:str=None): # TODO: Document
     The lines above will allow the execution of the target function by
     >>> fruit make lint
 
+    Targets may declare other targets as dependencies. The dependencies are made
+    before the target itself, independent ones in parallel with `fruit make -j N`.
+
+    Example::
+
+        @fruit.target(depends=['lint', 'test'])
+        def package():
+            pass
+
+    Targets can be selected by glob patterns of their names or by their tags.
+
+    Example::
+
+        @fruit.target(tags=['slow'])
+        def test_integration():
+            pass
+
+    >>> fruit make 'test-*' @tag:slow
+
+    Target functions may be coroutine functions. `fruit make` executes them in an event
+    loop, inside of which async steps and other async targets are awaited.
+
+    Example::
+
+        @fruit.target()
+        async def test():
+            await asyncio.gather(test_package('core'), test_package('cli'))
+
     Parameters
     ----------
         name : str, optional
@@ -27,6 +55,11 @@ def target(name:str=None, help:str=None): # TODO: Document
         help : str, optional
             Help text of the target, by default None. When left `None`, the 
             help text will be an empty string.
+        depends : List[str], optional
+            Names of the targets, that have to be made before this target, by
+            default None.
+        tags : List[str], optional
+            Tags of the target for the selection with `@tag:<tag>`, by default None.
     """
 
     def decorator(func:Callable[[], None]) -> Callable[[], None]:
@@ -35,24 +68,23 @@ def target(name:str=None, help:str=None): # TODO: Document
         trg_name = name if name is not None else func.__name__
         trg_help = help if help is not None else ""
 
-        new_trg = Target(func=func, name=trg_name, help=trg_help)
-        new_trg.OnActivate += Garden().delegate_OnTargetActivate  # Attach the event handler
-        new_trg.OnDeactivate += Garden().delegate_OnTargetDeactivate  # Attach the event handler
+        new_trg = Target(func=func, name=trg_name, help=trg_help, depends=depends, tags=tags)
 
         # Add the target to the garden
         Garden().add_target(new_trg)
 
         def warpper() -> None:
             """Wrapped target function."""
-            # Call the class object's __call__ function
-            new_trg()
+            # Call the class object's __call__ function. Async targets return their coroutine
+            # inside of a running event loop.
+            return new_trg()
 
         return warpper
 
     return decorator
 
 
-def step(name:str=None, help:str=None): # TODO: Document
+def step(name:str=None, help:str=None, inputs:List[str]=None, outputs:List[str]=None, cache:bool=True): # TODO: Document
     """
     Create a new target step for extended diagnostics.
 
@@ -64,6 +96,12 @@ def step(name:str=None, help:str=None): # TODO: Document
         help : str, optional
             Help text of the step, by default None. When left empty,
             an empty string will be used.
+        inputs : List[str], optional
+            Glob patterns of the files read by the step, by default None.
+        outputs : List[str], optional
+            Glob patterns of the files created by the step, by default None.
+        cache : bool, optional
+            Store the outputs of the step in the local artifact cache, by default True.
 
     Description
     -----------
@@ -91,36 +129,67 @@ def step(name:str=None, help:str=None): # TODO: Document
                 return lint(config)
             else:
                 return 1
+
+    Steps with declared inputs or outputs are incremental. They are skipped with
+    the status "Cached", when neither the files, nor the code of the step or its
+    arguments changed since the last successful execution. Steps with inputs and
+    outputs restore their outputs from the local artifact cache (~/.cache/fruit/cas),
+    when the same inputs were already built before.
+
+    Example::
+
+        @fruit.step(inputs=['docs/**/*.rst'], outputs=['build/html/**'])
+        def build_docs():
+            fruit.shell('sphinx-build docs build/html')
+
+    Async steps (`async def`) are awaited inside of async targets and steps, e.g. with
+    `asyncio.gather()`, and each call is recorded as its own step. The time of the step
+    includes the awaited time. Called outside of an event loop, the step runs in a new one.
+
+    Example::
+
+        @fruit.step()
+        async def test_package(name: str) -> int:
+            return await fruit.ashell(f"pytest {name}")
     """
 
     def decorator(func:Callable[[Any], Any]) -> Callable[[Any], Any]:
+        stp_name = name if name is not None else func.__name__
+        stp_help = help if help is not None else ""
 
-        def wrapper(*args, **kwargs) -> Any:
-            # NOTE: Steps can be executed multiple times, the object creation belongs to the call!
-            stp_name = name if name is not None else func.__name__
-            stp_help = help if help is not None else ""
-
-            new_step = Step(func, name=stp_name, help=stp_help)
+        # NOTE: Steps can be executed multiple times. The definition is created once, each
+        # call records its execution in a new step object.
+        descriptor = StepDescriptor(func, name=stp_name, help=stp_help, inputs=inputs, outputs=outputs, cache=cache)
 
-            # Attach the event handlers
-            new_step.OnActivate   += Garden().delegate_OnStepActivate
-            new_step.OnSkipped    += Garden().delegate_OnStepSkipped
-            new_step.OnFailed     += Garden().delegate_OnStepFailed
-            new_step.OnAborted    += Garden().delegate_OnStepAborted
-            new_step.OnDeactivate += Garden().delegate_OnStepDeactivate
+        # The garden tracks the execution through the lifecycle bus
+        Garden()
 
-            return new_step(*args, **kwargs)
+        def wrapper(*args, **kwargs) -> Any:
+            return descriptor(*args, **kwargs)
 
+        # E.g. fruit.map() executes the calls of the step itself
+        wrapper.descriptor = descriptor
         return wrapper
     return decorator
 
-def provider(name:str=None, help:str=None) -> Callable:
+def provider(name:str=None, help:str=None, cache:str=None, ttl:float=None, depends_on:List[str]=None) -> Callable:
     """
     Decorator function to create fruit information provider.
 
     Information provides are also shown with the command `fruit collect`
     and can be executed via `fruit get <name>`.
 
+    The values of expensive providers can be cached. With `cache='run'` the value
+    is calculated once per fruit run, with `cache='disk'` it is stored in the user
+    cache directory and reused by the following `fruit get` calls. Cached values
+    expire after `ttl` seconds or when a file matching `depends_on` changes.
+
+    Example::
+
+        @fruit.provider(cache='disk', depends_on=['.git/HEAD', '.git/refs/tags/**'])
+        def version():
+            return fruit.shell('git describe --tags', capture=True, echo=False).stdout
+
     Parameters
     ----------
         name : str, optional
@@ -129,6 +198,13 @@ def provider(name:str=None, help:str=None) -> Callable:
         help : str, optional
             Help text of the provider, by default None. When left empty, then function docstring
             will be used.
+        cache : str, optional
+            Caching mode of the values: 'run' or 'disk', by default None (no caching).
+        ttl : float, optional
+            Time to live of the cached values in seconds, by default None (no expiry).
+        depends_on : List[str], optional
+            Glob patterns of the files, whose changes invalidate the cached values, by
+            default None.
 
     Returns
     -------
@@ -150,12 +226,12 @@ def provider(name:str=None, help:str=None) -> Callable:
         else:
             p_help = func.__doc__
 
-        obj = Provider(name=p_name, help=p_help, func=func)
+        obj = Provider(name=p_name, help=p_help, func=func, cache=cache, ttl=ttl, depends_on=depends_on)
         Garden().add_provider(obj)
 
-        def wrapper(func) -> str:
+        def wrapper(*args, **kwargs) -> str:
             # Call the class call implementation
-            return obj()
+            return obj(*args, **kwargs)
 
         return wrapper
     return decorator
\ No newline at end of file
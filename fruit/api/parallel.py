@@ -0,0 +1,146 @@
+"""
+Module for executing a step for many items at the same time.
+
+`fruit.map()` calls a step for every item of an iterable on a pool of workers. Every call is
+recorded as its own step under the name of the step, so that the calls are aggregated by
+`--summary aggregate` and profiled together, and nested in the step calling `fruit.map()`.
+The console messages of a call show the index of its item (e.g. `test[3]`).
+
+With `mode='thread'` the calls are executed by threads. This suits steps waiting for
+subprocesses or I/O. With `mode='process'` the step functions are executed by forked worker
+processes, which suits CPU bound Python code. The steps are still recorded by the fruit
+process, only the functions are executed by the workers: the items, the return values and the
+exceptions are transferred with `pickle`. Steps called by the step function inside of a worker
+process are neither recorded nor shown in the summary.
+"""
+
+import os
+import contextlib
+import contextvars
+import itertools
+import functools
+import inspect
+import threading
+import multiprocessing
+import concurrent.futures as futures
+import fruit.modules.console as console
+import fruit.modules.lifecycle as lifecycle
+from fruit.modules.step import Step, StepDescriptor, run_coroutine
+from typing import Any, Callable, Dict, Iterable, List
+
+MODES = ('thread', 'process')
+
+# Step functions of the running fruit.map() calls in process mode. The worker processes are
+# forked and inherit them, so the functions do not have to be picklable. The entry of a call
+# is removed, when the call returns.
+_functions: Dict[int, Callable] = {}
+_keys = itertools.count()
+_lock = threading.Lock()
+
+
+def _call_forked(key: int, args: tuple, kwargs: dict) -> Any:
+    """Call a step function inside of a worker process. Async functions run in their own event loop."""
+    try:
+        retval = _functions[key](*args, **kwargs)
+        return run_coroutine(retval) if inspect.iscoroutine(retval) else retval
+    finally:
+        console.flush()
+
+
+def _submit(pool: futures.ProcessPoolExecutor, key: int, *args, **kwargs) -> Any:
+    """Call a step function in a worker process and wait for its result."""
+    return pool.submit(_call_forked, key, args, kwargs).result()
+
+
+def map(step: Callable, items: Iterable, workers: int = None, mode: str = 'thread') -> List[Any]:
+    """
+    Call a step for every item at the same time.
+
+    Example::
+
+        @fruit.step()
+        def test_package(path: str) -> int:
+            return fruit.shell(f"pytest {path}")
+
+        @fruit.target()
+        def test():
+            returncodes = fruit.map(test_package, packages, workers=16)
+
+    Every call is recorded as a step with the name of the step. Its console messages show the
+    index of the item, e.g. `test_package[0]`. Steps skipped with `fruit.skip()` or failed
+    with `fruit.fail()` return None, like calling the step directly. When a call raises an
+    exception (e.g. `fruit.abort()`), the calls that did not start yet are cancelled and the
+    exception of the first failing item is raised, after the running calls finished.
+
+    Parameters
+    ----------
+    `step` : Callable
+        Step decorated with `@fruit.step()` or a function executed as a step. Each item is
+        passed as the only argument.
+    `items` : Iterable
+        Items to call the step for
+    `workers` : int, optional
+        Maximum number of calls executed at the same time, by default the number of CPUs
+    `mode` : str, optional
+        'thread' or 'process', by default 'thread'
+
+    Returns
+    -------
+    List[Any]
+        Return values of the calls in the order of the items
+
+    Raises
+    ------
+    ValueError
+        Invalid number of workers or mode, or the process mode is not supported by the platform
+    """
+    if mode not in MODES:
+        raise ValueError(f"The mode must be one of {', '.join(MODES)}!")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("The number of workers must be at least 1!")
+
+    descriptor = getattr(step, 'descriptor', None)
+    if not isinstance(descriptor, StepDescriptor):
+        descriptor = StepDescriptor(step, name=getattr(step, '__name__', 'map'))
+
+    items = list(items)
+    if len(items) == 0:
+        return []
+
+    with contextlib.ExitStack() as cleanup:
+        if mode == 'process':
+            if 'fork' not in multiprocessing.get_all_start_methods():
+                raise ValueError("The process mode requires forking processes, use mode='thread'!")
+            with _lock:
+                key = next(_keys)
+                _functions[key] = descriptor.func
+            cleanup.callback(_functions.pop, key, None)
+
+            # Fork the workers before the threads of the calls exist and while the console and
+            # the lifecycle workers are idle, so that the children do not inherit held locks
+            console.flush()
+            lifecycle.flush()
+            pool = futures.ProcessPoolExecutor(min(workers, len(items)), mp_context=multiprocessing.get_context('fork'))
+            cleanup.callback(pool.shutdown, cancel_futures=True)
+            pool.submit(os.getpid).result()
+            descriptor = descriptor.replace(functools.partial(_submit, pool, key))
+
+        # The calls continue the active targets and steps of the caller in their own copy
+        context = contextvars.copy_context()
+
+        def call(index: int, item: Any) -> Any:
+            return context.copy().run(Step(descriptor, label=f"[{index}]"), item)
+
+        with futures.ThreadPoolExecutor(min(workers, len(items)), thread_name_prefix='fruit-map') as executor:
+            calls = [executor.submit(call, index, item) for index, item in enumerate(items)]
+            done, __ = futures.wait(calls, return_when=futures.FIRST_EXCEPTION)
+            if any(each.exception() is not None for each in done):
+                for each_call in calls:
+                    each_call.cancel()
+
+    for each_call in calls:
+        if not each_call.cancelled() and each_call.exception() is not None:
+            raise each_call.exception()
+    return [each.result() for each in calls]
@@ -1,24 +1,348 @@
 """
 Module for implementing shell interactions within fruit
+
+The commands are executed as asyncio subprocesses. By default they inherit the standard output
+and error of fruit, so that the commands detect the terminal (e.g. for colors and progress
+output). The output of captured commands and of the commands of `shell_many()` is piped and
+streamed line by line to the fruit console, which allows running multiple commands at the same
+time with prefixed output lines.
+
+Commands given as a string are executed by the shell (`/bin/sh`). Commands given as an argument
+list are executed directly without an intermediate shell. The executables of such commands are
+looked up in the PATH only once and the processes are spawned without duplicating the memory of
+the fruit process (`posix_spawn`/`vfork` based spawning of the subprocess module).
 """
 import os
+import shlex
+import shutil
+import asyncio
 import fruit.modules.console as console
 from fruit.globals import SHELLCHAR
+from fruit.modules.step import run_sync
+from typing import Dict, List, Sequence, Tuple, Union
+
+# Maximum length of a single output line of a command
+LINE_LIMIT = 1 << 24
+
+# Command string for the shell or argument list for direct execution
+Command = Union[str, Sequence[str]]
+
+# Resolved executables by program name and PATH
+_executables: Dict[Tuple[str, str], str] = {}
+
 
-def shell(cmd: str) -> int:
+def which(program: str) -> str:
     """
-    Execute the given shell string 
-    
+    Find the executable of a program in the PATH. The results are cached for each PATH.
+
     Parameters
     ----------
-    `cmd` : str
-        Command string to execute
-    
+    `program` : str
+        Program name or path of the executable
+
+    Returns
+    -------
+    str
+        Path of the executable
+
+    Raises
+    ------
+    FileNotFoundError
+        The program is not found in the PATH
+    """
+    if os.path.dirname(program):
+        return program
+
+    path = os.environ.get('PATH', os.defpath)
+    executable = _executables.get((program, path))
+    if executable is None:
+        executable = shutil.which(program, path=path)
+        if executable is None:
+            raise FileNotFoundError(f"The executable '{program}' is not found in the PATH!")
+        _executables[(program, path)] = executable
+    return executable
+
+
+def format_command(cmd: Command) -> str:
+    """Get the printable form of a command."""
+    return cmd if isinstance(cmd, str) else " ".join(shlex.quote(arg) for arg in cmd)
+
+
+async def _spawn(cmd: Command, pipe: bool) -> asyncio.subprocess.Process:
+    """Start a command as a subprocess with piped or inherited output."""
+    if pipe:
+        pipes = dict(stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, limit=LINE_LIMIT)
+    else:
+        pipes = {}
+    # The subprocess may write to the terminal directly, after the queued messages
+    console.flush()
+
+    if isinstance(cmd, str):
+        return await asyncio.create_subprocess_shell(cmd, **pipes)
+
+    if len(cmd) < 1:
+        raise ValueError("The argument list of the command is empty!")
+    args = [str(arg) for arg in cmd]
+
+    # NOTE: Without close_fds the subprocess module may use posix_spawn. The file descriptors
+    # of fruit are non-inheritable anyway.
+    try:
+        return await asyncio.create_subprocess_exec(which(args[0]), *args[1:], close_fds=False, **pipes)
+    except FileNotFoundError:
+        # The cached executable may have been removed, look it up again
+        _executables.clear()
+        return await asyncio.create_subprocess_exec(which(args[0]), *args[1:], close_fds=False, **pipes)
+
+
+class ShellResult(object):
+    """
+    Result of a shell command executed with `capture=True`.
+
+    Attributes
+    ----------
+    cmd : str
+        Executed command
+    returncode : int
+        Returncode of the command. Negative values indicate the signal, that terminated it.
+    stdout : str
+        Captured standard output
+    stderr : str
+        Captured standard error
+    """
+
+    cmd: str = ""
+    returncode: int = 0
+    stdout: str = ""
+    stderr: str = ""
+
+    def __init__(self, cmd: str, returncode: int, stdout: str, stderr: str):
+        self.cmd = cmd
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+    def __repr__(self) -> str:
+        return f"ShellResult(cmd={self.cmd!r}, returncode={self.returncode})"
+
+
+async def _pump(stream: asyncio.StreamReader, lines: List[str], echo: bool, prefix: str, err: bool) -> None:
+    """Read a stream of a subprocess line by line."""
+    while True:
+        raw = await stream.readline()
+        if not raw:
+            break
+
+        line = raw.decode(errors='replace').rstrip('\r\n')
+        if lines is not None:
+            lines.append(line)
+        if echo:
+            console.echo(prefix + line, err=err)
+
+
+async def run_async(cmd: Command, capture: bool = False, timeout: float = None, echo: bool = True, prefix: str = "",
+                    pipe: bool = True) -> ShellResult:
+    """
+    Execute a shell command as an asyncio subprocess.
+
+    Parameters
+    ----------
+    `cmd` : Union[str, Sequence[str]]
+        Command string to execute by the shell or argument list to execute directly
+    `capture` : bool, optional
+        Collect the output of the command in the result, by default False
+    `timeout` : float, optional
+        Maximum execution time in seconds, by default None (no limit)
+    `echo` : bool, optional
+        Write the command and its output to the console, by default True
+    `prefix` : str, optional
+        Prefix of the output lines written to the console, by default ""
+    `pipe` : bool, optional
+        Read the output of the command and write it to the console, by default True. Without
+        pipes the command writes to the standard output and error of fruit directly, its
+        output cannot be captured.
+
+    Returns
+    -------
+    ShellResult
+        Returncode and (captured) output of the command
+
+    Raises
+    ------
+    TimeoutError
+        The command did not finish within the timeout. The process is killed.
+    """
+    if echo:
+        console.echo(prefix + SHELLCHAR + format_command(cmd))
+
+    proc = await _spawn(cmd, pipe or capture)
+
+    stdout = [] if capture else None
+    stderr = [] if capture else None
+
+    try:
+        if pipe or capture:
+            await asyncio.wait_for(asyncio.gather(
+                _pump(proc.stdout, stdout, echo, prefix, False),
+                _pump(proc.stderr, stderr, echo, prefix, True),
+                proc.wait()), timeout)
+        else:
+            await asyncio.wait_for(proc.wait(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise TimeoutError(f"The command '{format_command(cmd)}' did not finish in {timeout} seconds!")
+
+    return ShellResult(
+        format_command(cmd), proc.returncode,
+        "\n".join(stdout) if capture else "",
+        "\n".join(stderr) if capture else "")
+
+
+def shell(cmd: Command, capture: bool = False, timeout: float = None, echo: bool = True) -> Union[int, ShellResult]:
+    """
+    Execute the given shell string or argument list.
+
+    Example::
+
+        fruit.shell("git describe --tags | cut -d- -f1")
+        fruit.shell(["git", "describe", "--tags"])
+
+    Inside of an async target, the event loop waits until the command finished. Use
+    `await fruit.ashell()` to continue other steps in the meantime.
+
+    Parameters
+    ----------
+    `cmd` : Union[str, Sequence[str]]
+        Command string to execute by the shell or argument list to execute directly without
+        a shell
+    `capture` : bool, optional
+        Return the output of the command as a `ShellResult`, by default False
+    `timeout` : float, optional
+        Maximum execution time in seconds, by default None (no limit)
+    `echo` : bool, optional
+        Write the command and its output to the console, by default True. The output of
+        commands, that are not captured, is written by the command itself to the standard
+        output and error inherited from fruit. With False, the output is discarded.
+
+    Returns
+    -------
+    int
+        Returncode of the command, when `capture` is False. Unlike the wait status of
+        `os.system()`, it is the exit code of the command, or the negative number of the
+        signal, that terminated it.
+    ShellResult
+        Returncode and output of the command, when `capture` is True
+
+    Raises
+    ------
+    TimeoutError
+        The command did not finish within the timeout
+    FileNotFoundError
+        The executable of an argument list is not found
+    """
+    result = run_sync(run_async(cmd, capture=capture, timeout=timeout, echo=echo, pipe=capture or not echo))
+    return result if capture else result.returncode
+
+
+async def ashell(cmd: Command, capture: bool = False, timeout: float = None, echo: bool = True) -> Union[int, ShellResult]:
+    """
+    Execute the given shell string or argument list in an async step or target.
+
+    `fruit.shell()` blocks the running event loop until the command finished. Other commands
+    and steps continue while the command of `fruit.ashell()` is awaited.
+
+    Example::
+
+        @fruit.step()
+        async def build(package: str) -> int:
+            return await fruit.ashell(["make", "-C", package])
+
+    Parameters
+    ----------
+    `cmd` : Union[str, Sequence[str]]
+        Command string to execute by the shell or argument list to execute directly without
+        a shell
+    `capture` : bool, optional
+        Return the output of the command as a `ShellResult`, by default False
+    `timeout` : float, optional
+        Maximum execution time in seconds, by default None (no limit)
+    `echo` : bool, optional
+        Write the command and its output to the console, by default True. The output of
+        commands, that are not captured, is written by the command itself to the standard
+        output and error inherited from fruit. With False, the output is discarded.
+
     Returns
     -------
     int
-        Returncode of the shell
+        Returncode of the command, when `capture` is False. Unlike the wait status of
+        `os.system()`, it is the exit code of the command, or the negative number of the
+        signal, that terminated it.
+    ShellResult
+        Returncode and output of the command, when `capture` is True
+
+    Raises
+    ------
+    TimeoutError
+        The command did not finish within the timeout
+    FileNotFoundError
+        The executable of an argument list is not found
+    """
+    result = await run_async(cmd, capture=capture, timeout=timeout, echo=echo, pipe=capture or not echo)
+    return result if capture else result.returncode
+
+
+def shell_many(cmds: List[Command], max_parallel: int = None, capture: bool = False, timeout: float = None,
+               echo: bool = True) -> List[Union[int, ShellResult]]:
     """
-    # Print the string to the console
-    console.echo(SHELLCHAR + cmd)
-    return os.system(cmd)
+    Execute multiple shell strings at the same time.
+
+    The output lines of the commands are prefixed with the (1-based) number of the command.
+    All commands are executed, even if some of them fail or time out.
+
+    Example::
+
+        returncodes = fruit.shell_many([f"pytest {pkg}" for pkg in packages], max_parallel=8)
+
+    Parameters
+    ----------
+    `cmds` : List[Union[str, Sequence[str]]]
+        Command strings or argument lists to execute
+    `max_parallel` : int, optional
+        Maximum number of commands running at the same time, by default None (no limit)
+    `capture` : bool, optional
+        Return the output of the commands as `ShellResult` objects, by default False
+    `timeout` : float, optional
+        Maximum execution time of each command in seconds, by default None (no limit)
+    `echo` : bool, optional
+        Stream the commands and their output line by line to the console, by default True
+
+    Returns
+    -------
+    List[Union[int, ShellResult]]
+        Results of the commands in the order of `cmds`
+
+    Raises
+    ------
+    TimeoutError
+        A command did not finish within the timeout. Raised after all commands finished.
+    """
+    if max_parallel is not None and max_parallel < 1:
+        raise ValueError("The number of parallel commands must be at least 1!")
+
+    async def run_all() -> list:
+        limit = asyncio.Semaphore(max_parallel if max_parallel is not None else len(cmds) or 1)
+
+        async def run_one(number: int, cmd: Command) -> ShellResult:
+            async with limit:
+                return await run_async(cmd, capture=capture, timeout=timeout, echo=echo, prefix=f"[{number}] ")
+
+        return await asyncio.gather(
+            *(run_one(nr, cmd) for nr, cmd in enumerate(cmds, start=1)), return_exceptions=True)
+
+    results = run_sync(run_all())
+
+    for each_result in results:
+        if isinstance(each_result, BaseException):
+            raise each_result
+
+    return [res if capture else res.returncode for res in results]
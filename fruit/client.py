@@ -0,0 +1,83 @@
+"""
+Thin client of the fruit daemon.
+
+`fruitc` takes the same arguments as `fruit`. The command is executed by the running fruit
+daemon (`fruit daemon`) and its output is written by the client. Without a running daemon,
+the command is executed by the client itself.
+
+The client imports nothing of fruit but its globals, so it starts faster than `fruit`.
+"""
+
+import os
+import sys
+import json
+import shutil
+import socket
+
+import fruit.globals as glb
+
+
+def run(argv: list, path: str = None) -> int:
+    """
+    Execute a fruit command in the fruit daemon.
+
+    Parameters
+    ----------
+    `argv` : list
+        Arguments of the fruit command, e.g. `['make', 'release']`
+    `path` : str, optional
+        Path of the socket of the daemon, by default `DAEMON_SOCKET`
+
+    Returns
+    -------
+    int
+        Exit code of the command
+
+    Raises
+    ------
+    ConnectionRefusedError
+        The daemon is not running
+    ConnectionAbortedError
+        The daemon stopped during the command
+    """
+    stdout, stderr = sys.stdout, sys.stderr
+    env = dict(os.environ)
+    # The daemon has no terminal, the width of the terminal of the client is used
+    env.setdefault('COLUMNS', str(shutil.get_terminal_size().columns))
+    request = {'argv': list(argv), 'cwd': os.getcwd(), 'env': env, 'tty': stdout.isatty()}
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(path or glb.DAEMON_SOCKET)
+        except OSError as exc:
+            raise ConnectionRefusedError("The fruit daemon is not running!") from exc
+        connection.sendall((json.dumps(request) + "\n").encode('utf-8'))
+
+        with connection.makefile('r', encoding='utf-8') as lines:
+            for each_line in lines:
+                message = json.loads(each_line)
+                if 'out' in message:
+                    stdout.write(message['out'])
+                    stdout.flush()
+                elif 'err' in message:
+                    stderr.write(message['err'])
+                    stderr.flush()
+                elif 'exit' in message:
+                    return message['exit']
+    raise ConnectionAbortedError("The fruit daemon stopped during the command!")
+
+
+def main():
+    try:
+        code = run(sys.argv[1:])
+    except ConnectionRefusedError:
+        # Executed without the daemon
+        from fruit.fruit import cli
+        cli.main(args=sys.argv[1:], prog_name='fruit')
+        return
+    except ConnectionAbortedError as exc:
+        sys.stderr.write(f"{exc}\n")
+        code = 1
+    except KeyboardInterrupt:
+        code = 130
+    sys.exit(code)
@@ -1,25 +1,46 @@
 """
 Fruit CLI Framework for process automation.
+
+The fruit modules are imported by the commands on demand. Only the modules required by the
+called subcommand are loaded, which keeps the startup of the cli fast.
 """
 
 import click
+import contextlib
 import sys
-from fruit.modules.fruitloader import load
-from fruit.modules.garden import Garden
 import fruit.modules.console as console
-import fruit.modules.printing as printing
-from fruit.modules.pickup import pickup_path, drop_path, load_fruit_env
 
-# Import the extensions!
-import fruit.extensions.global_providers
+def garden():
+    """
+    Get the fruit garden with the global extensions registered.
+
+    Returns
+    -------
+    Garden
+        Fruit garden singleton
+    """
+    from fruit.modules.garden import Garden
+
+    # Import the extensions!
+    import fruit.extensions.global_providers
+
+    return Garden()
 
 @click.group()
-def cli(dir):
+@click.option('-v', '--verbose', is_flag=True, default=False, help='Show the debug messages')
+@click.option('-q', '--quiet', is_flag=True, default=False, help='Only show the warnings and errors')
+@click.option('--log', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='Append every message with its level to a log file')
+def cli(verbose: bool, quiet: bool, log: str):
     """
     Fruit cli framework for task automation.
     """
-    # Load the fruit config in the directory
-    pass
+    if verbose:
+        console.CONSOLE.set_level(console.DEBUG)
+    elif quiet:
+        console.CONSOLE.set_level(console.WARNING)
+    if log is not None:
+        console.CONSOLE.set_logfile(log)
 
 
 @cli.command()
@@ -34,6 +55,9 @@ def path(pickup: click.Path, drop: click.Path):
     To add a path, use the option --pickup <path>.
     To remove a path, use the option --drop <path>.
     """
+    from fruit.modules.pickup import pickup_path, drop_path, load_fruit_env
+    from fruit.modules.workspace import project_name
+
     if pickup is None and drop is None:
         # Print the list of paths
         pathlist = load_fruit_env()
@@ -42,7 +66,7 @@ def path(pickup: click.Path, drop: click.Path):
             console.echo()
 
             for path in pathlist:
-                console.echo("  " + path)
+                console.echo(f"  {project_name(path)}: {path}")
             console.echo()
         else:
             console.echo("🍌 There are no fruits picked up!")
@@ -57,19 +81,47 @@ def path(pickup: click.Path, drop: click.Path):
 @click.option(
     '-d', '--dir', required=False, type=click.Path(exists=True, dir_okay=True, file_okay=False),
     help='Directory to load fruit configuration from', default='.')
-def collect(dir):
+@click.option('-g', '--global', 'workspace', is_flag=True, default=False,
+              help='List the targets of the picked-up configurations instead')
+def collect(dir, workspace):
     """
     List the fruit targets in the given path.
     \b
 
     PATH (default: .) - Path of the directory or .py file to scan.
+
+    \b
+    The configuration is scanned without executing it. Only configurations
+    with dynamically created targets or providers are executed.
+
+    \b
+    With --global the targets of the picked-up configurations are listed as
+    <project>:<target>, which can be made from any directory.
     """
-    load(dir)
+    from fruit.modules.fruitloader import ensure_loaded, obtain_config
+    from fruit.modules.scanner import load_index
+    import fruit.modules.printing as printing
+
     try:
+        if workspace:
+            from fruit.modules.workspace import load_workspace
+            printing.print_target_list(load_workspace().targets())
+            return
+
+        index = load_index(obtain_config(dir))
+
+        if index.dynamic:
+            ensure_loaded(dir)
+            targets = list(garden().get_targets())
+            providers = list(garden().get_providers())
+        else:
+            targets = index.targets
+            providers = list(garden().get_providers()) + index.providers
+
         # Print the list of targets
-        printing.print_target_list(Garden().get_targets())
+        printing.print_target_list(targets)
 
-        printing.print_provider_list(Garden().get_providers())
+        printing.print_provider_list(providers)
 
 
     except Exception as err:
@@ -81,25 +133,185 @@ def collect(dir):
     help='Directory to load fruit configuration from', default='.')
 @click.argument('target', required=True, nargs=-1)
 @click.option('-p', '--pure', type=click.BOOL, is_flag=True, default=False, help='Only show user logs and error messages')
-def make(dir: click.Path, target: str, pure: bool):
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=1, help='Number of independent targets to make in parallel')
+@click.option('--retention', type=click.STRING, default='full', show_default=True,
+              help="Step records kept for the summary: 'full', 'aggregate' or 'last:N'")
+@click.option('--summary', type=click.Choice(['table', 'aggregate', 'auto']), default='auto', show_default=True,
+              help='Summary of the steps: one row per execution, statistics per step name or by the number of steps')
+@click.option('--trace', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='Write a timeline of the targets and steps in the Chrome trace format to the file')
+@click.option('--resources', is_flag=True, default=False,
+              help='Measure the CPU time, peak memory and block I/O of the steps and their child processes')
+@click.option('--report', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='Write the step records and their statistics as JSON to the file')
+@click.option('--profile', type=click.Path(file_okay=False, writable=True), default=None,
+              help='Profile the targets and steps and write the profiles to the directory')
+@click.option('--profile-sampling', type=click.FLOAT, default=None, metavar='MS',
+              help='Sample the call stacks every MS milliseconds instead of profiling every call')
+@click.option('--memprofile', is_flag=True, default=False,
+              help='Trace the memory allocations of the steps and report their peak and leaked memory')
+def make(dir: click.Path, target: str, pure: bool, jobs: int, retention: str, summary: str, trace: str,
+         resources: bool, report: str, profile: str, profile_sampling: float, memprofile: bool):
     """
     Make a fruit target from the parsed fruitconfig.py file.
+
+    \b
+    TARGET is a target name, a glob pattern of target names ('test-*') or a
+    tag of targets (@tag:slow).
+
+    \b
+    The dependencies of the targets are made first. Use -j N to make up to N
+    independent targets at the same time.
+
+    \b
+    Targets calling millions of steps can limit the memory of the summary with
+    --retention aggregate (statistics per step name) or --retention last:N.
+    Use --summary aggregate to print the count, total, min, p50, p95 and max
+    durations of every step name instead of one row per step execution.
+
+    \b
+    Use --trace trace.json to record a timeline of the run, that can be opened
+    with chrome://tracing or https://ui.perfetto.dev.
+
+    \b
+    Use --resources to add the CPU time, the peak RSS and the block I/O of the
+    steps to the summary and --report report.json for a machine readable copy.
+
+    \b
+    Use --profile DIR to write a cProfile profile of every target and step
+    name (e.g. DIR/step-build.prof) and DIR/merged.prof of the whole run. Long
+    steps can be sampled with --profile-sampling 5 instead, which writes the
+    collapsed stacks to DIR/samples.folded.
+
+    \b
+    Use --memprofile to report the peak memory of every step, the memory still
+    allocated after it returned and the source lines allocating it.
     """
-    load(dir)
+    from fruit.modules.fruitloader import ensure_loaded
+    from fruit.modules.workspace import is_global
+
+    if profile_sampling is not None and profile is None:
+        raise click.UsageError("--profile-sampling requires --profile DIR")
+
+    if any(is_global(each) for each in target):
+        # Only the configuration of the picked-up project is loaded
+        from fruit.modules.workspace import load_workspace
+        try:
+            config, target = load_workspace().resolve(target)
+        except ValueError as exc:
+            raise click.UsageError(str(exc))
+        dir = config or dir
+
+    ensure_loaded(dir)
     try:
         if pure is not None:
-            Garden().options['pure'] = pure
-        # Pass all the targets to the make function
-        Garden().make_multiple(*target)
+            garden().options['pure'] = pure
+        if resources:
+            from fruit.modules.resources import is_supported
+            if not is_supported():
+                console.warning("The resource accounting is not supported on this platform!")
+                resources = False
+        garden().reset_records(retention, resources=resources)
+        garden().options['summary'] = summary
+
+        with contextlib.ExitStack() as recorders:
+            if trace is not None:
+                from fruit.modules.trace import TraceRecorder
+                recorders.enter_context(TraceRecorder(trace))
+            if resources:
+                from fruit.modules.resources import ResourceMonitor
+                recorders.enter_context(ResourceMonitor())
+            if profile is not None:
+                from fruit.modules.profiler import StepProfiler
+                interval = profile_sampling / 1000 if profile_sampling is not None else None
+                recorders.enter_context(StepProfiler(profile, interval))
+            if memprofile:
+                from fruit.modules.memprofile import MemoryProfiler
+                from fruit.modules.printing import print_memory_report
+                profiler = MemoryProfiler()
+                # The report is printed after the tracing stopped, also for failed runs
+                recorders.callback(lambda: print_memory_report(profiler.results()))
+                recorders.enter_context(profiler)
+
+            try:
+                # Pass all the targets to the make function
+                garden().make_multiple(*target, jobs=jobs)
+            finally:
+                # The report of a failed run shows the failing steps
+                if report is not None:
+                    import json
+                    with open(report, 'w') as fp:
+                        json.dump(garden().records.to_dict(), fp, indent=2)
     except Exception as exc:
         console.error(str(exc))
 
+@cli.command()
+@click.option(
+    '-d', '--dir', required=False, type=click.Path(exists=True, dir_okay=True, file_okay=False),
+    help='Directory to load fruit configuration from', default='.')
+@click.argument('target', required=True, nargs=-1)
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=1, help='Number of independent targets to make in parallel')
+@click.option('--debounce', type=click.IntRange(min=0), default=100, show_default=True, metavar='MS',
+              help='Milliseconds without further file changes, before the targets are made again')
+@click.option('--poll', is_flag=True, default=False, help='Poll the files instead of using inotify')
+def watch(dir: click.Path, target: str, jobs: int, debounce: int, poll: bool):
+    """
+    Make fruit targets and make them again, when their files change.
+
+    \b
+    The inputs of the steps executed by the targets and the fruit configuration
+    are watched. Only the targets, whose inputs changed, are made again and
+    unchanged incremental steps are skipped. A changed configuration is loaded
+    again. Press Ctrl+C to stop watching.
+    """
+    from fruit.modules.watch import WatchSession
+
+    garden() # Register the global extensions
+    WatchSession(dir, target, jobs=jobs, debounce=debounce / 1000, poll=poll).run()
+
+@cli.command()
+@click.option('--socket', 'path', type=click.Path(dir_okay=False), default=None,
+              help='Path of the Unix socket (default: $FRUIT_DAEMON_SOCKET or the fruit cache)')
+@click.option('--stop', is_flag=True, default=False, help='Stop the running daemon')
+def daemon(path: str, stop: bool):
+    """
+    Serve the fruit commands of fruitc from a persistent process.
+
+    \b
+    The daemon keeps fruit and the fruit configurations loaded. A configuration
+    is loaded again, when a python file in its directory changed. Run the
+    commands with `fruitc` instead of `fruit`, e.g. `fruitc make release`.
+    The commands are executed one at a time. Press Ctrl+C to stop the daemon.
+    """
+    import fruit.modules.daemon as fruitdaemon
+
+    if stop:
+        if not fruitdaemon.stop(path):
+            console.warning("The fruit daemon is not running!")
+        return
+
+    garden() # Register the global extensions
+    try:
+        server = fruitdaemon.FruitDaemon(path)
+    except RuntimeError as exc:
+        console.error(str(exc))
+        sys.exit(1)
+
+    console.echo(f"🍎 The fruit daemon is listening on '{server.path}'")
+    console.flush()
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
 @cli.command()
 @click.option(
     '-d', '--dir', required=False, type=click.Path(exists=True, dir_okay=True, file_okay=False),
     help='Directory to load fruit configuration from', default='.')
 @click.argument('name', required=True)
-def get(name: str):
+@click.option('-r', '--refresh', is_flag=True, default=False, help='Ignore the cached value of the provider')
+def get(dir: click.Path, name: str, refresh: bool):
     """Run an information provider to obtain data from the current project.
     
     \b
@@ -107,8 +319,13 @@ def get(name: str):
         fruit get version
     
     """
+    from fruit.modules.fruitloader import ensure_loaded
+
     try:
-        result = Garden().run_provider(name=name)
+        ensure_loaded(dir)
+        if refresh:
+            garden().get_provider(name).invalidate()
+        result = garden().run_provider(name=name)
 
         console.echo(result)
     except Exception as exc:
@@ -1,17 +1,64 @@
-import click
+import os
+import shutil
+import functools
 
 FRUITCONFIG_NAME = "fruitconfig.py"
 FRUIT_DIR_NAME = ".fruit"
 FRUIT_DIR_CONFIG = f"{FRUIT_DIR_NAME}/__init__.py"
+# State of the incremental steps, relative to the project directory of the fruit configuration
+FRUIT_STATE_FILE = f"{FRUIT_DIR_NAME}/state.json"
 
-WIDTH = (click.get_terminal_size()[0] - 10)
+# User level cache directory of fruit
+CACHE_DIR = os.environ.get('FRUIT_CACHE_DIR') or os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'fruit')
 
-SEP_TARGET          = "=" * WIDTH
-SEP_STEP            = "-" * WIDTH
+# Content addressed store of step outputs and its size limit in bytes
+CAS_DIR = os.path.join(CACHE_DIR, 'cas')
+CAS_MAX_SIZE = int(os.environ.get('FRUIT_CAS_MAX_SIZE', 2 * 1024**3))
 
-FMT_STEPHEADER      = "🥝 Step {number}: {name}\n" + "-"* WIDTH
-FMT_TARGETHEADER    = "🍉 Making '{target}' ...\n" + "=" * WIDTH
-FMT_SUBTARGETHEADER = "🍎 Making sub-target '{target}' ..." + ">"* WIDTH
+# Compiled code objects of the fruit configurations
+CODE_CACHE_DIR = os.path.join(CACHE_DIR, 'bytecode')
+
+# Statically scanned indexes of the fruit configurations
+INDEX_CACHE_DIR = os.path.join(CACHE_DIR, 'index')
+
+# Index of the targets of the picked-up fruit configurations
+WORKSPACE_INDEX_FILE = os.path.join(CACHE_DIR, 'workspace.json')
+
+# Persistently cached values of the information providers
+PROVIDER_CACHE_FILE = os.path.join(CACHE_DIR, 'providers.json')
+
+# Unix socket of the fruit daemon
+DAEMON_SOCKET = os.environ.get('FRUIT_DAEMON_SOCKET') or os.path.join(CACHE_DIR, 'daemon.sock')
+
+@functools.lru_cache(maxsize=1)
+def terminal_width() -> int:
+    """Usable width of the terminal for separator lines."""
+    return shutil.get_terminal_size()[0] - 10
+
+# Constants depending on the terminal width. They are created on first access, so
+# that importing fruit does not query the terminal.
+_WIDTH_CONSTANTS = {
+    'WIDTH':               lambda w: w,
+    'SEP_TARGET':          lambda w: "=" * w,
+    'SEP_STEP':            lambda w: "-" * w,
+    'FMT_STEPHEADER':      lambda w: "🥝 Step {number}: {name}\n" + "-" * w,
+    'FMT_TARGETHEADER':    lambda w: "🍉 Making '{target}' ...\n" + "=" * w,
+    'FMT_SUBTARGETHEADER': lambda w: "🍎 Making sub-target '{target}' ..." + ">" * w,
+}
+
+def reset_terminal_width() -> None:
+    """Forget the width of the terminal, e.g. when a long running process serves another terminal."""
+    terminal_width.cache_clear()
+    for each_name in _WIDTH_CONSTANTS:
+        globals().pop(each_name, None)
+
+def __getattr__(name: str):
+    if name in _WIDTH_CONSTANTS:
+        value = _WIDTH_CONSTANTS[name](terminal_width())
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
 
 SHELLCHAR = '$ '
 
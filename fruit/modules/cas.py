@@ -0,0 +1,230 @@
+"""
+Local content addressed store for the output files of incremental steps.
+
+The files are stored zlib compressed under the digest of their content. Entries map the
+key of a step execution (digest of the step code, arguments and input files) to the
+output files, that the execution created::
+
+    <root>/objects/ab/cdef...   compressed file contents
+    <root>/entries/<key>.json   {"files": {"<path>": ["<digest>", <mode>]}}
+
+The modification time of an entry is updated on every access. When the size of the stored
+objects exceeds the limit, the least recently used entries are evicted.
+"""
+
+import os
+import json
+import zlib
+import shutil
+from typing import Dict, List
+
+from fruit.globals import CAS_DIR, CAS_MAX_SIZE
+from .fingerprint import CHUNK_SIZE
+
+
+class ArtifactCache(object):
+    """
+    Content addressed store of step outputs with LRU eviction.
+
+    Attributes
+    ----------
+    root : str
+        Root directory of the store
+    max_size : int
+        Maximum size of the compressed objects in bytes
+    """
+
+    __default: 'ArtifactCache' = None
+
+    root: str = ""
+    max_size: int = 0
+    __modified: bool = False
+
+    def __init__(self, root: str, max_size: int = CAS_MAX_SIZE):
+        self.root = root
+        self.max_size = max_size
+
+    @classmethod
+    def default(cls) -> 'ArtifactCache':
+        """Get the store of the user cache directory."""
+        if cls.__default is None:
+            cls.__default = cls(CAS_DIR)
+        return cls.__default
+
+    @classmethod
+    def set_default(cls, cache: 'ArtifactCache') -> None:
+        """Replace the store used by the steps, e.g. to use a different directory."""
+        cls.__default = cache
+
+    def __object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest[2:])
+
+    def __entry_path(self, key: str) -> str:
+        return os.path.join(self.root, "entries", key + ".json")
+
+    def __write_object(self, path: str, digest: str) -> None:
+        """Compress a file into the store, unless its content is already stored."""
+        obj_path = self.__object_path(digest)
+        if os.path.exists(obj_path):
+            return
+
+        os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+        tmp_path = "{}.{}.tmp".format(obj_path, os.getpid())
+        compressor = zlib.compressobj()
+
+        with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for each_chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                dst.write(compressor.compress(each_chunk))
+            dst.write(compressor.flush())
+        os.replace(tmp_path, obj_path)
+
+    def __read_object(self, digest: str, path: str, mode: int) -> None:
+        """Decompress a stored object to the given path."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        decompressor = zlib.decompressobj()
+
+        with open(self.__object_path(digest), 'rb') as src, open(tmp_path, 'wb') as dst:
+            for each_chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                dst.write(decompressor.decompress(each_chunk))
+            dst.write(decompressor.flush())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+
+    def store(self, key: str, fingerprints: Dict[str, list]) -> None:
+        """
+        Store the output files of a step execution.
+
+        Parameters
+        ----------
+        `key` : str
+            Key of the step execution
+        `fingerprints` : Dict[str, list]
+            Fingerprints `[mtime_ns, size, digest]` of the output files
+        """
+        files = {}
+        for each_path, (__, __, digest) in fingerprints.items():
+            self.__write_object(each_path, digest)
+            files[each_path] = [digest, os.stat(each_path).st_mode & 0o777]
+
+        entry_path = self.__entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        tmp_path = "{}.{}.tmp".format(entry_path, os.getpid())
+        with open(tmp_path, 'w') as fp:
+            json.dump({"files": files}, fp)
+        os.replace(tmp_path, entry_path)
+
+        self.__modified = True
+
+    def restore(self, key: str) -> List[str]:
+        """
+        Restore the output files of a previous step execution.
+
+        Parameters
+        ----------
+        `key` : str
+            Key of the step execution
+
+        Returns
+        -------
+        List[str]
+            Paths of the restored files or None, when there is no complete entry for the key
+        """
+        entry_path = self.__entry_path(key)
+        try:
+            with open(entry_path, 'r') as fp:
+                files = json.load(fp)["files"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # Incomplete entries (e.g. evicted objects) cannot be restored
+        for each_digest, __ in files.values():
+            if not os.path.exists(self.__object_path(each_digest)):
+                return None
+
+        try:
+            for each_path, (digest, mode) in files.items():
+                self.__read_object(digest, each_path, mode)
+        except OSError:
+            # The objects were evicted by another process in the meantime
+            return None
+
+        # Mark the entry as recently used
+        os.utime(entry_path)
+        return list(files)
+
+    def evict(self, force: bool = False) -> None:
+        """
+        Remove the least recently used entries until the objects fit into the size limit
+        and delete the objects, that are not used by any entry.
+
+        Parameters
+        ----------
+        `force` : bool, optional
+            Also run the eviction, when nothing was stored by this process, by default False
+        """
+        if not self.__modified and not force:
+            return
+        self.__modified = False
+
+        entry_dir = os.path.join(self.root, "entries")
+        object_dir = os.path.join(self.root, "objects")
+        if not os.path.isdir(entry_dir):
+            return
+
+        # Sizes of the stored objects. Other fruit processes may evict them at the same time.
+        sizes = {}
+        for each_dir in os.listdir(object_dir) if os.path.isdir(object_dir) else []:
+            try:
+                names = os.listdir(os.path.join(object_dir, each_dir))
+            except FileNotFoundError:
+                continue
+            for each_name in names:
+                if each_name.endswith(".tmp"):
+                    continue
+                try:
+                    sizes[each_dir + each_name] = os.path.getsize(os.path.join(object_dir, each_dir, each_name))
+                except FileNotFoundError:
+                    continue
+
+        # Entries ordered by their last use, most recent first
+        entries = []
+        for each_name in os.listdir(entry_dir):
+            if not each_name.endswith(".json"):
+                continue
+            path = os.path.join(entry_dir, each_name)
+            try:
+                with open(path, 'r') as fp:
+                    digests = {digest for digest, __ in json.load(fp)["files"].values()}
+                entries.append((os.path.getmtime(path), path, digests))
+            except (OSError, ValueError, KeyError):
+                continue
+        entries.sort(reverse=True)
+
+        used = set()
+        total = 0
+        for __, path, digests in entries:
+            new_digests = digests - used
+            size = sum(sizes.get(digest, 0) for digest in new_digests)
+
+            if total + size > self.max_size:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            else:
+                used |= new_digests
+                total += size
+
+        for each_digest in set(sizes) - used:
+            try:
+                os.remove(self.__object_path(each_digest))
+            except FileNotFoundError:
+                continue
+
+    def clear(self) -> None:
+        """Remove every entry and object of the store."""
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -0,0 +1,148 @@
+"""
+Bytecode cache for fruit configuration files and the helper modules they import.
+
+Compiled code objects are stored with `marshal` in the user cache directory. A cached code
+object is only used, when the path, the modification time and the size of the source file
+and the version of the interpreter match the ones it was compiled from.
+"""
+
+import os
+import sys
+import struct
+import marshal
+import hashlib
+import importlib.util
+import importlib.machinery
+from types import CodeType
+from typing import List
+
+from fruit.globals import CODE_CACHE_DIR
+
+# Header of the cache files: magic number of the interpreter, version, mtime and size
+HEADER = struct.Struct('<4sIQQ')
+
+# Directories, whose modules are loaded through the cache
+_directories: List[str] = []
+
+
+def cache_path(path: str, filename: str) -> str:
+    """
+    Get the path of the cache file of a source file.
+
+    Parameters
+    ----------
+    `path` : str
+        Path of the source file
+    `filename` : str
+        File name compiled into the code object
+
+    Returns
+    -------
+    str
+        Path of the cache file
+    """
+    key = hashlib.sha1((os.path.abspath(path) + "\0" + filename).encode()).hexdigest()
+    return os.path.join(CODE_CACHE_DIR, f"{key}.{sys.implementation.cache_tag}.bin")
+
+
+def compile_cached(path: str, filename: str = None) -> CodeType:
+    """
+    Compile a python source file or load its code object from the cache.
+
+    Parameters
+    ----------
+    `path` : str
+        Path of the python source file
+    `filename` : str, optional
+        File name for the code object (shown in tracebacks), by default the path
+
+    Returns
+    -------
+    CodeType
+        Compiled code object of the module
+    """
+    if filename is None:
+        filename = path
+
+    stat = os.stat(path)
+    header = HEADER.pack(importlib.util.MAGIC_NUMBER, sys.hexversion, stat.st_mtime_ns, stat.st_size)
+    cache_file = cache_path(path, filename)
+
+    try:
+        with open(cache_file, 'rb') as fp:
+            data = fp.read()
+        if data[:HEADER.size] == header:
+            return marshal.loads(data[HEADER.size:])
+    except (OSError, ValueError, EOFError, TypeError):
+        pass # Missing or corrupt cache file
+
+    # Read the source as bytes, so that the encoding declaration of the file is respected
+    with open(path, 'rb') as fp:
+        source = fp.read()
+    code = compile(source, filename, 'exec', dont_inherit=True)
+
+    try:
+        os.makedirs(CODE_CACHE_DIR, exist_ok=True)
+        tmp_path = "{}.{}.tmp".format(cache_file, os.getpid())
+        with open(tmp_path, 'wb') as fp:
+            fp.write(header + marshal.dumps(code))
+        os.replace(tmp_path, cache_file)
+    except OSError:
+        pass # The cache is optional, e.g. for read-only home directories
+
+    return code
+
+
+class CachedSourceLoader(importlib.machinery.SourceFileLoader):
+    """Source file loader, that loads the code objects through the fruit bytecode cache."""
+
+    def get_code(self, fullname: str) -> CodeType:
+        return compile_cached(self.get_filename(fullname))
+
+
+def _is_registered(path: str) -> bool:
+    """Check, whether a path is (inside of) a registered directory."""
+    path = os.path.abspath(path)
+    return any(path == d or path.startswith(d + os.sep) for d in _directories)
+
+
+def path_hook(path: str) -> importlib.machinery.FileFinder:
+    """
+    Import path hook creating finders with the cached loader for registered directories.
+
+    Raises
+    ------
+    ImportError
+        The path does not belong to a fruit configuration directory
+    """
+    if not _is_registered(path):
+        raise ImportError("Not a fruit configuration directory")
+
+    return importlib.machinery.FileFinder(
+        path,
+        (importlib.machinery.ExtensionFileLoader, importlib.machinery.EXTENSION_SUFFIXES),
+        (CachedSourceLoader, importlib.machinery.SOURCE_SUFFIXES),
+        (importlib.machinery.SourcelessFileLoader, importlib.machinery.BYTECODE_SUFFIXES))
+
+
+def register_directory(directory: str) -> None:
+    """
+    Load the modules imported from the given directory through the bytecode cache.
+
+    Parameters
+    ----------
+    `directory` : str
+        Directory of a fruit configuration
+    """
+    directory = os.path.abspath(directory)
+    if directory in _directories:
+        return
+
+    _directories.append(directory)
+    if path_hook not in sys.path_hooks:
+        sys.path_hooks.insert(0, path_hook)
+
+    # Drop the finders created before the registration
+    for each_path in list(sys.path_importer_cache):
+        if _is_registered(each_path):
+            del sys.path_importer_cache[each_path]
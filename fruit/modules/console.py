@@ -1,42 +1,323 @@
+"""
+Console output of fruit.
+
+The messages are written by a background thread of the console. The callers only append the
+messages to a queue, the writer thread styles them and writes them in batches with a single
+write per batch instead of a write and a flush per line. The queue is bounded: a caller
+producing messages faster than the terminal can print them waits, until the writer caught up.
+
+Messages below the level of the console are dropped before they are queued. Building an
+expensive message can be avoided with `enabled()`::
+
+    if console.enabled(console.DEBUG):
+        console.debug(f"Environment: {describe(os.environ)}")
+
+The module functions write to the console of the process. The queued messages are written,
+before the process exits or with `flush()`. The console of the process wraps `sys.stdout` and
+`sys.stderr`, so that other writers (e.g. `print()` in a step) first wait for the queued
+messages and the output keeps its order.
+"""
+
+import os
+import sys
+import time
+import atexit
+import threading
 import click
+from collections import deque
+from typing import Callable, Iterable, List, TextIO
+
+# Levels of the messages
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+# Maximum number of queued messages
+QUEUE_SIZE = 4096
+
+# Maximum number of messages written at once
+BATCH_SIZE = 512
+
+
+class _OrderedStream(object):
+    """Standard stream writing the queued messages of a console before the text of other writers."""
+
+    def __init__(self, stream: TextIO, flush: Callable[[], None]):
+        self.__stream = stream
+        self.__flush = flush
+
+    def write(self, text: str) -> int:
+        self.__flush()
+        return self.__stream.write(text)
+
+    def writelines(self, lines: Iterable[str]) -> None:
+        self.__flush()
+        self.__stream.writelines(lines)
+
+    def __getattr__(self, name: str):
+        return getattr(self.__stream, name)
 
-# TODO: Create a console object instead of the module.
-#  - Refactor and rename functions
-#  - Extended functionality
 
-def echo(obj: any=None):
+class Console(object):
+    """
+    Console writing the messages from a background thread.
+
+    Attributes
+    ----------
+    level : int
+        Messages below this level are not written to the terminal
+    """
+
+    level: int = INFO
+
+    def __init__(self, level: int = INFO, asynchronous: bool = True, ordered: bool = False):
+        self.level = level
+        self.__asynchronous = asynchronous
+        # Wrap the standard streams, so that other writers wait for the queued messages
+        self.__ordered = ordered and asynchronous
+
+        # Lowest level of the terminal and the log file
+        self.__threshold = level
+        self.__logfile: TextIO = None
+        self.__loglevel = DEBUG
+
+        self.__lock = threading.Lock()
+        self.__writer: threading.Thread = None
+
+        # Queued messages, the writer is woken up, when the first message is queued
+        self.__pending = deque()
+        self.__wakeup = threading.Event()
+        # Notified, when the writer wrote a batch or became idle
+        self.__written = threading.Condition()
+        self.__busy = False
+
+        if hasattr(os, 'register_at_fork'):
+            # The writer thread does not exist in a forked child
+            os.register_at_fork(after_in_child=self.__reset)
+        atexit.register(self.flush)
+
+    def set_level(self, level: int) -> None:
+        """
+        Set the level of the messages written to the terminal.
+
+        Parameters
+        ----------
+        `level` : int
+            Lowest level written to the terminal: `DEBUG`, `INFO`, `WARNING` or `ERROR`
+        """
+        self.flush()
+        self.level = level
+        self.__update()
+
+    def set_logfile(self, path: str, level: int = DEBUG) -> None:
+        """
+        Write the messages to a log file in addition to the terminal.
+
+        Parameters
+        ----------
+        `path` : str
+            Path of the log file or None to close the log file. The file is appended.
+        `level` : int, optional
+            Lowest level written to the log file, by default `DEBUG`
+        """
+        self.flush()
+        if self.__logfile is not None:
+            self.__logfile.close()
+            self.__logfile = None
+
+        if path is not None:
+            self.__logfile = open(path, 'a', encoding='utf-8')
+            self.__loglevel = level
+        self.__update()
+
+    def enabled(self, level: int) -> bool:
+        """
+        Check, whether messages of a level are written anywhere.
+
+        Parameters
+        ----------
+        `level` : int
+            Level of the messages
+
+        Returns
+        -------
+        bool
+            True, if the messages are written to the terminal or the log file
+        """
+        return level >= self.__threshold
+
+    def write(self, level: int, obj: any = None, err: bool = False, fg: str = None) -> None:
+        """
+        Write a message to the console.
+
+        Parameters
+        ----------
+        `level` : int
+            Level of the message
+        `obj` : any, optional
+            Any object, that is compatible with the `print()` function, by default an empty line
+        `err` : bool, optional
+            Write to the standard error instead of the standard output, by default False
+        `fg` : str, optional
+            Foreground color of the message on the terminal, by default None
+        """
+        if level < self.__threshold:
+            return
+
+        message = (level, "" if obj is None else str(obj), err, fg)
+        if not self.__asynchronous:
+            with self.__lock:
+                self.__write([message])
+            return
+
+        if self.__writer is None:
+            self.__start()
+        if self.__ordered:
+            self.__order_streams()
+
+        pending = self.__pending
+        pending.append(message)
+        if not self.__wakeup.is_set():
+            self.__wakeup.set()
+
+        if len(pending) >= QUEUE_SIZE and threading.current_thread() is not self.__writer:
+            with self.__written:
+                self.__written.wait_for(lambda: len(pending) < QUEUE_SIZE // 2)
+
+    def flush(self) -> None:
+        """Wait until the queued messages are written."""
+        if self.__writer is not None and threading.current_thread() is not self.__writer:
+            with self.__written:
+                self.__written.wait_for(lambda: len(self.__pending) == 0 and not self.__busy)
+
+    def __update(self) -> None:
+        """Update the level of the messages, that are written anywhere."""
+        self.__threshold = min(self.level, self.__loglevel) if self.__logfile is not None else self.level
+
+    def __start(self) -> None:
+        """Start the writer thread."""
+        with self.__lock:
+            if self.__writer is None:
+                writer = threading.Thread(target=self.__work, name='fruit-console', daemon=True)
+                writer.start()
+                self.__writer = writer
+
+    def __order_streams(self) -> None:
+        """Wrap the current standard streams, e.g. after they were redirected."""
+        for each_name in ('stdout', 'stderr'):
+            stream = getattr(sys, each_name)
+            if stream is not None and not isinstance(stream, _OrderedStream):
+                setattr(sys, each_name, _OrderedStream(stream, self.flush))
+
+    def __reset(self) -> None:
+        """Forget the queued messages and the writer thread of the parent process."""
+        self.__lock = threading.Lock()
+        self.__writer = None
+        self.__pending = deque()
+        self.__wakeup = threading.Event()
+        self.__written = threading.Condition()
+        self.__busy = False
+
+    def __work(self) -> None:
+        """Write the queued messages in batches."""
+        pending = self.__pending
+        while True:
+            self.__wakeup.wait()
+            self.__wakeup.clear()
+            with self.__written:
+                self.__busy = True
+
+            while len(pending) > 0:
+                batch = []
+                try:
+                    while len(batch) < BATCH_SIZE:
+                        batch.append(pending.popleft())
+                except IndexError:
+                    pass
+
+                try:
+                    self.__write(batch)
+                except Exception:
+                    pass # E.g. a closed pipe, the messages cannot be written anywhere
+                with self.__written:
+                    self.__written.notify_all()
+
+            with self.__written:
+                self.__busy = False
+                self.__written.notify_all()
+
+    def __write(self, batch: List[tuple]) -> None:
+        """Write a batch of messages to the terminal and the log file."""
+        # Consecutive messages to the same stream are written at once
+        lines, stream = [], False
+        for level, text, err, fg in batch:
+            if level < self.level:
+                continue
+            if err != stream and len(lines) > 0:
+                click.echo("".join(lines), err=stream, nl=False)
+                lines = []
+            stream = err
+            lines.append((click.style(text, fg=fg) if fg is not None else text) + "\n")
+        if len(lines) > 0:
+            click.echo("".join(lines), err=stream, nl=False)
+
+        if self.__logfile is not None:
+            stamp = time.strftime('%Y-%m-%d %H:%M:%S')
+            self.__logfile.write("".join(
+                f"{stamp} {LEVEL_NAMES.get(level, level):<7} {text}\n"
+                for level, text, __, __ in batch if level >= self.__loglevel))
+            self.__logfile.flush()
+
+
+# Console of the process
+CONSOLE = Console(ordered=True)
+
+def echo(obj: any=None, err: bool=False):
     """
     Write a string to the console.
-    
+
     Parameters
     ----------
     `obj` : any
         Any object, that is compatible with the `print()` function.
+    `err` : bool, optional
+        Write to the standard error instead of the standard output, by default False
     """
-    if obj is not None:
-        click.echo(obj)
-    else:
-        click.echo()
+    CONSOLE.write(INFO, obj, err=err)
 
 def echo_green(obj: any):
     """
     Write a string to the console with green color
-    
+
     Parameters
     ----------
     `obj` : any
         Any object, that is compatible with print
-    
+
     Note
     ----
-    The green color usually means success, however it is not a standard definitions as 
-    yellow = warning and red = error. This is the reason why the function is simply called 
+    The green color usually means success, however it is not a standard definitions as
+    yellow = warning and red = error. This is the reason why the function is simply called
     `echo_green`.
     """
-    click.secho(obj, fg='green')
+    CONSOLE.write(INFO, obj, fg='green')
+
+def debug(obj: any):
+    CONSOLE.write(DEBUG, obj)
 
 def warning(obj: any):
-    click.secho(obj, fg='yellow')
+    CONSOLE.write(WARNING, obj, fg='yellow')
 
 def error(obj: any):
-    click.secho(obj, fg='red')
\ No newline at end of file
+    CONSOLE.write(ERROR, obj, fg='red')
+
+def enabled(level: int) -> bool:
+    """Check, whether messages of a level are written to the console."""
+    return CONSOLE.enabled(level)
+
+def flush():
+    """Wait until the queued messages are written."""
+    CONSOLE.flush()
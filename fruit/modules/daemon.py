@@ -0,0 +1,256 @@
+"""
+Persistent fruit process serving the fruit commands over a Unix socket.
+
+Every fruit command starts a new interpreter, imports fruit and loads the configuration. The
+daemon keeps a fruit process running instead: the garden, the imported modules and the loaded
+configurations stay in memory and a configuration is loaded again only, when its files changed.
+The thin client (`fruitc`) sends its command line, working directory and environment to the
+daemon and writes the output streamed back.
+
+The protocol consists of JSON lines. The client sends one request::
+
+    {"argv": ["make", "release"], "cwd": "/home/user/project", "env": {...}, "tty": true}
+
+and the daemon answers with the output of the command and its exit code::
+
+    {"out": "..."}
+    {"err": "..."}
+    {"exit": 0}
+
+The requests are executed one at a time, as the garden, the working directory, the environment
+and the standard streams are shared by the whole process. Only the output written through
+`sys.stdout` and `sys.stderr` is sent to the client: subprocesses writing directly to the
+inherited file descriptors write to the output of the daemon.
+"""
+
+import io
+import os
+import sys
+import json
+import socket
+import threading
+import traceback
+import socketserver
+
+import fruit.globals as glb
+import fruit.modules.console as console
+
+
+class _ClientStream(io.TextIOBase):
+    """Text stream sending the written text to the client."""
+
+    def __init__(self, connection: socket.socket, key: str, tty: bool, lock: threading.Lock):
+        self.__connection = connection
+        self.__key = key
+        self.__tty = tty
+        self.__lock = lock
+
+    @property
+    def encoding(self) -> str:
+        return 'utf-8'
+
+    def isatty(self) -> bool:
+        # The output is styled, if the client writes to a terminal
+        return self.__tty
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if not isinstance(text, str):
+            # Like the text streams, so that click does not take it for a binary stream
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        if len(text) > 0:
+            send(self.__connection, {self.__key: text}, self.__lock)
+        return len(text)
+
+
+def send(connection: socket.socket, message: dict, lock: threading.Lock = None) -> None:
+    """
+    Send a message of the protocol.
+
+    Parameters
+    ----------
+    `connection` : socket.socket
+        Connected socket
+    `message` : dict
+        Message serialized as one JSON line
+    `lock` : threading.Lock, optional
+        Lock serializing the messages of multiple threads, by default None
+    """
+    data = (json.dumps(message) + "\n").encode('utf-8')
+    if lock is None:
+        connection.sendall(data)
+    else:
+        with lock:
+            connection.sendall(data)
+
+
+def _reset() -> None:
+    """Forget the state of the previous command, that the next command must not see."""
+    from .garden import Garden
+    from .fingerprint import StateFile
+
+    # The state files may be changed by other fruit processes meanwhile
+    StateFile.unload_all()
+    for each_provider in Garden().get_providers():
+        each_provider.reset()
+
+    console.CONSOLE.set_logfile(None)
+    console.CONSOLE.set_level(console.INFO)
+    glb.reset_terminal_width()
+
+
+def execute(connection: socket.socket, request: dict) -> int:
+    """
+    Execute a fruit command of a client.
+
+    Parameters
+    ----------
+    `connection` : socket.socket
+        Connection of the client receiving the output
+    `request` : dict
+        Command line (`argv`), working directory (`cwd`), environment (`env`) of the client and
+        whether the client writes to a terminal (`tty`)
+
+    Returns
+    -------
+    int
+        Exit code of the command
+    """
+    from fruit.fruit import cli
+
+    lock = threading.Lock()
+    tty = bool(request.get('tty', False))
+    streams = (sys.stdout, sys.stderr)
+    cwd = os.getcwd()
+    environ = dict(os.environ)
+
+    sys.stdout = _ClientStream(connection, 'out', tty, lock)
+    sys.stderr = _ClientStream(connection, 'err', tty, lock)
+    try:
+        os.chdir(request['cwd'])
+        os.environ.clear()
+        os.environ.update(request['env'])
+        glb.reset_terminal_width()
+
+        try:
+            cli.main(args=list(request['argv']), prog_name='fruit')
+            code = 0
+        except SystemExit as exc:
+            code = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+        except Exception:
+            traceback.print_exc()
+            code = 1
+
+        console.flush()
+        return code
+    finally:
+        sys.stdout, sys.stderr = streams
+        os.environ.clear()
+        os.environ.update(environ)
+        os.chdir(cwd)
+        _reset()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Handler of a client connection."""
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return # Not a client of the protocol
+
+        if request.get('stop', False):
+            send(self.connection, {'exit': 0})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+
+        with self.server.lock:
+            code = execute(self.connection, request)
+        send(self.connection, {'exit': code})
+
+
+class FruitDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Server of the fruit daemon.
+
+    Example::
+
+        with FruitDaemon(glb.DAEMON_SOCKET) as daemon:
+            daemon.serve_forever()
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str = None):
+        self.path = path or glb.DAEMON_SOCKET
+        # Serializes the commands
+        self.lock = threading.Lock()
+
+        if os.path.exists(self.path):
+            if is_running(self.path):
+                raise RuntimeError(f"The fruit daemon is already running at '{self.path}'!")
+            os.remove(self.path) # Left behind by a daemon, that was killed
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Only the user may connect, the clients execute their commands as the user
+        umask = os.umask(0o177)
+        try:
+            super().__init__(self.path, _Handler)
+        finally:
+            os.umask(umask)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def is_running(path: str = None) -> bool:
+    """
+    Check, whether a fruit daemon accepts connections.
+
+    Parameters
+    ----------
+    `path` : str, optional
+        Path of the socket, by default `DAEMON_SOCKET`
+
+    Returns
+    -------
+    bool
+        True, if a daemon is running
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path or glb.DAEMON_SOCKET)
+        return True
+    except OSError:
+        return False
+    finally:
+        connection.close()
+
+
+def stop(path: str = None) -> bool:
+    """
+    Stop a running fruit daemon.
+
+    Parameters
+    ----------
+    `path` : str, optional
+        Path of the socket, by default `DAEMON_SOCKET`
+
+    Returns
+    -------
+    bool
+        True, if a daemon was running
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(path or glb.DAEMON_SOCKET)
+        except OSError:
+            return False
+        send(connection, {'stop': True})
+        connection.recv(1024)
+    return True
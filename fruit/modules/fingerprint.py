@@ -0,0 +1,263 @@
+"""
+Module for fingerprinting files and functions to detect changes between fruit runs.
+
+File fingerprints are stored as `[mtime_ns, size, digest]` lists. When the modification
+time and the size of a file are unchanged, the stored digest is reused and the file is
+not read again.
+"""
+
+import os
+import glob
+import json
+import hashlib
+import threading
+from types import CodeType
+from typing import Any, Callable, Dict, Iterable, List
+
+# Size of the chunks, that are read from a file at once
+CHUNK_SIZE = 1 << 20
+
+
+def expand(patterns: Iterable[str]) -> List[str]:
+    """
+    Expand a list of glob patterns into a sorted list of existing files.
+
+    Parameters
+    ----------
+    `patterns` : Iterable[str]
+        Glob patterns; `**` matches any number of subdirectories
+
+    Returns
+    -------
+    List[str]
+        Sorted list of file paths without duplicates
+    """
+    files = set()
+    for each_pattern in patterns:
+        for each_path in glob.iglob(each_pattern, recursive=True):
+            if os.path.isfile(each_path):
+                files.add(os.path.normpath(each_path))
+    return sorted(files)
+
+
+def hash_file(path: str) -> str:
+    """
+    Calculate the SHA-256 digest of the content of a file.
+
+    Parameters
+    ----------
+    `path` : str
+        Path of the file
+
+    Returns
+    -------
+    str
+        Hexadecimal digest of the file content
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for each_chunk in iter(lambda: fp.read(CHUNK_SIZE), b''):
+            sha.update(each_chunk)
+    return sha.hexdigest()
+
+
+def fingerprint_files(paths: Iterable[str], known: Dict[str, list] = None) -> Dict[str, list]:
+    """
+    Create the fingerprints of the given files.
+
+    Parameters
+    ----------
+    `paths` : Iterable[str]
+        Paths of the files to fingerprint
+    `known` : Dict[str, list], optional
+        Previously created fingerprints. Digests of files with an unchanged modification
+        time and size will be reused, by default None
+
+    Returns
+    -------
+    Dict[str, list]
+        Fingerprint `[mtime_ns, size, digest]` of each file
+    """
+    if known is None:
+        known = {}
+
+    result = {}
+    for each_path in paths:
+        stat = os.stat(each_path)
+        previous = known.get(each_path)
+
+        if previous is not None and previous[0] == stat.st_mtime_ns and previous[1] == stat.st_size:
+            result[each_path] = previous
+        else:
+            result[each_path] = [stat.st_mtime_ns, stat.st_size, hash_file(each_path)]
+    return result
+
+
+def _update_code(sha, code: CodeType) -> None:
+    """Add the byte code, the constants and the names of a code object to a hash."""
+    sha.update(code.co_code)
+    sha.update(repr(code.co_names).encode())
+    for each_const in code.co_consts:
+        if isinstance(each_const, CodeType):
+            _update_code(sha, each_const)
+        else:
+            sha.update(repr(each_const).encode())
+
+
+def code_digest(func: Callable) -> str:
+    """
+    Calculate a digest of the code of a function. The digest does not depend on the line
+    numbers of the function, so moving the function inside the file keeps the digest.
+
+    Parameters
+    ----------
+    `func` : Callable
+        Python function
+
+    Returns
+    -------
+    str
+        Hexadecimal digest of the function code
+    """
+    sha = hashlib.sha256()
+    code = getattr(func, '__code__', None)
+    if code is not None:
+        _update_code(sha, code)
+    else:
+        sha.update(repr(func).encode())
+    return sha.hexdigest()
+
+
+def call_digest(args: tuple, kwargs: dict) -> str:
+    """
+    Calculate a digest of the arguments of a function call.
+
+    Parameters
+    ----------
+    `args` : tuple
+        Positional arguments
+    `kwargs` : dict
+        Keyword arguments
+
+    Returns
+    -------
+    str
+        Hexadecimal digest of the arguments
+    """
+    data = repr(args) + repr(sorted(kwargs.items()))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def combine(*parts: Any) -> str:
+    """
+    Combine multiple digests and JSON serializable values into a single digest.
+
+    Returns
+    -------
+    str
+        Hexadecimal digest
+    """
+    data = json.dumps(parts, sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class StateFile(object):
+    """
+    Persistent key-value state stored as a JSON file.
+
+    The file is loaded on first access and written atomically by `StateFile.save()`.
+    Use `StateFile.open()` to share one object for each file path.
+    """
+
+    __instances: Dict[str, 'StateFile'] = {}
+
+    __path: str = ""
+    __data: dict = None
+    __dirty: bool = False
+    __lock: threading.Lock = None
+
+    def __init__(self, path: str):
+        self.__path = path
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: str) -> 'StateFile':
+        """
+        Get the shared state object of the given file.
+
+        Parameters
+        ----------
+        `path` : str
+            Path of the JSON state file
+
+        Returns
+        -------
+        StateFile
+            State object of the file
+        """
+        path = os.path.abspath(path)
+        if path not in cls.__instances:
+            cls.__instances[path] = cls(path)
+        return cls.__instances[path]
+
+    @property
+    def path(self) -> str:
+        """Path of the state file"""
+        return self.__path
+
+    @property
+    def data(self) -> dict:
+        """Content of the state file. Invalid or missing files result in an empty state."""
+        if self.__data is None:
+            try:
+                with open(self.__path, 'r') as fp:
+                    self.__data = json.load(fp)
+                if not isinstance(self.__data, dict):
+                    self.__data = {}
+            except (OSError, ValueError):
+                self.__data = {}
+        return self.__data
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a stored value."""
+        return self.data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value. The value has to be JSON serializable."""
+        with self.__lock:
+            self.data[key] = value
+            self.__dirty = True
+
+    def remove(self, key: str) -> None:
+        """Remove a stored value, if it exists."""
+        with self.__lock:
+            if self.data.pop(key, None) is not None:
+                self.__dirty = True
+
+    def save(self) -> None:
+        """Write the state to the disk."""
+        directory = os.path.dirname(self.__path)
+        os.makedirs(directory, exist_ok=True)
+
+        with self.__lock:
+            tmp_path = "{}.{}.tmp".format(self.__path, os.getpid())
+            with open(tmp_path, 'w') as fp:
+                json.dump(self.data, fp)
+            os.replace(tmp_path, self.__path)
+            self.__dirty = False
+
+    @classmethod
+    def save_all(cls) -> None:
+        """Write every modified state to the disk."""
+        for each_state in list(cls.__instances.values()):
+            if each_state.__dirty:
+                each_state.save()
+
+    @classmethod
+    def unload_all(cls) -> None:
+        """
+        Write every modified state to the disk and forget the loaded states. The files are
+        loaded again on the next access, e.g. after another fruit process changed them.
+        """
+        cls.save_all()
+        cls.__instances.clear()
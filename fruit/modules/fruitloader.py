@@ -5,7 +5,9 @@ This module implements the scan, loading and compiling of fruitconfig.py files.
 import os
 import sys
 import fruit.globals as glb
+import fruit.modules.console as console
 import importlib.util
+from .codecache import compile_cached, register_directory
 
 
 def obtain_config(path: str) -> str:
@@ -63,6 +65,9 @@ def compile_config(path: str):
     The given path will be added to the python path for the time of the execution. It may be removed afterwards to avoid
     module name collisions, when loading multiple modules.
 
+    The compiled code of the configuration and of the modules imported from its directory is cached in the fruit
+    bytecode cache, so unchanged files are not compiled again.
+
     Parameters
     ----------
     path: str
@@ -70,22 +75,85 @@ def compile_config(path: str):
 
     """
 
-    # Read the source code
-    with open(path, 'r') as fp:
-        source = fp.read()
-
     filename = os.path.basename(path)
 
     # Append the fruit config directory to the current python path, to import submodules
     directory = os.path.dirname(os.path.abspath(path))
-    sys.path.append(directory)
+    register_directory(directory)
+    if directory not in sys.path:
+        sys.path.append(directory)
 
     # Create a global namespace for the execution
     namespace = {}
-    pyobj = compile(source=source, filename=filename, mode='exec')
+    pyobj = compile_cached(path, filename=filename)
     exec(pyobj, namespace, namespace)
 
 
+def _imported_modules(directory: str) -> dict:
+    """Names and file paths of the python modules imported from a directory or its subdirectories."""
+    prefix = os.path.join(os.path.abspath(directory), '')
+    modules = {}
+    for each_name, each_module in list(sys.modules.items()):
+        filename = getattr(each_module, '__file__', None)
+        if filename is None or not filename.endswith('.py') or each_name.split('.')[0] in ('fruit', '__main__'):
+            continue # Extension modules cannot be loaded again, fruit itself is kept
+        filename = os.path.abspath(filename)
+        if filename.startswith(prefix) and 'site-packages' not in filename[len(prefix):]:
+            modules[each_name] = filename
+    return modules
+
+
+def unload_modules(directory: str):
+    """
+    Forget the modules imported from a directory (e.g. helpers next to the fruit configuration),
+    so that loading the configuration again executes their current code.
+
+    Parameters
+    ----------
+    directory: str
+        Directory of the modules
+    """
+    for each_name in _imported_modules(directory):
+        del sys.modules[each_name]
+
+
+# Directory of the project of the fruit configuration loaded last
+_project: str = None
+
+def project_directory(configpath: str) -> str:
+    """
+    Get the project directory of a fruit configuration: the directory of `fruitconfig.py` or the
+    parent directory of `.fruit/__init__.py`.
+
+    Parameters
+    ----------
+    `configpath` : str
+        Path of the fruit configuration file
+
+    Returns
+    -------
+    str
+        Absolute path of the project directory
+    """
+    directory = os.path.dirname(os.path.abspath(configpath))
+    if os.path.basename(directory) == glb.FRUIT_DIR_NAME:
+        directory = os.path.dirname(directory)
+    return directory
+
+def state_file() -> str:
+    """
+    Path of the state file of the incremental steps. It is stored in the project of the loaded
+    fruit configuration, also when fruit is executed in another directory (e.g. `fruit make -d other/`).
+
+    Returns
+    -------
+    str
+        Path of the state file, relative to the working directory, when no configuration is loaded
+    """
+    if _project is None:
+        return glb.FRUIT_STATE_FILE
+    return os.path.join(_project, glb.FRUIT_STATE_FILE)
+
 def load(*path: str):
     """
     Load multiple instances of fruit configurations into the current running instance of fruit.
@@ -96,8 +164,71 @@ def load(*path: str):
         List of paths to load
     """
 
+    global _project
+
     # TODO: Implement loading of multiple fruit configs
     # TODO: Add load local option
     for each_path in path:
         configpath = obtain_config(each_path)
-        compile_config(configpath)
\ No newline at end of file
+        console.debug(f"Loading the fruit configuration '{configpath}'")
+        _project = project_directory(configpath)
+        compile_config(configpath)
+
+# Path of the configuration loaded by `ensure_loaded()` and the fingerprint of its files
+_loaded: tuple = None
+
+def _fingerprint(paths: list) -> tuple:
+    """Modification times and sizes of files. Missing files have no modification time."""
+    stats = []
+    for each_path in sorted(paths):
+        try:
+            stat = os.stat(each_path)
+            stats.append((each_path, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stats.append((each_path, None, None))
+    return tuple(stats)
+
+def ensure_loaded(path: str) -> bool:
+    """
+    Load a fruit configuration, unless it is loaded already and unchanged.
+
+    The configuration counts as changed, when it or a module imported from its directory or
+    its subdirectories (e.g. a helper module of the configuration) changed. A changed or a
+    different configuration replaces the loaded one. A long running fruit process
+    (`fruit daemon`) so loads the configurations only, when needed.
+
+    Parameters
+    ----------
+    `path` : str
+        Directory path to a containing directory or file path
+
+    Returns
+    -------
+    bool
+        True, if the configuration was loaded
+    """
+    from .garden import Garden
+    global _loaded
+
+    configpath = os.path.abspath(obtain_config(path))
+    directory = os.path.dirname(configpath)
+    if _loaded is not None and _loaded[0] == configpath and _fingerprint(_loaded[1]) == _loaded[2]:
+        return False
+
+    if _loaded is not None:
+        Garden().clear()
+        unload_modules(os.path.dirname(_loaded[0]))
+        _loaded = None
+
+    try:
+        load(configpath)
+    except BaseException:
+        # A partially loaded configuration is not kept
+        Garden().clear()
+        unload_modules(directory)
+        raise
+
+    # The configuration and the modules it imported from its directory
+    paths = [configpath] + list(_imported_modules(directory).values())
+    _loaded = (configpath, paths, _fingerprint(paths))
+    return True
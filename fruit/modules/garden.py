@@ -5,21 +5,58 @@ from .patterns import SingletonMeta
 from .target   import Target, FruitError
 from .step     import Step, SkipStepSignal, FailStepSignal, AbortStepSignal
 from .provider import Provider
+from .scheduler import Scheduler
+from .fingerprint import StateFile
+from .cas import ArtifactCache
+from .records import StepRecords, NO_PARENT
+from . import lifecycle
 import fruit.modules.console as console
 import fruit.modules.printing as printing
 
-from typing import List, Dict
+from typing import List, Dict, NamedTuple, Tuple
+import contextvars
+import fnmatch
+import time
 import os
 
+# Prefix of the target selectors matching the tags of the targets
+TAG_PREFIX = "@tag:"
+
+class ExecutionContext(NamedTuple):
+    """
+    Active targets and steps of a thread or an asyncio task.
+
+    The garden keeps the execution context in a context variable. Threads and asyncio tasks
+    started with a copy of the current context (e.g. the calls of `fruit.map()`) continue the
+    active targets and steps of their creator. The context is immutable, so they extend their
+    own copy of the stacks instead of modifying the stacks of their creator.
+    """
+
+    targets: Tuple[Target, ...] = ()
+    steps: Tuple[Step, ...] = ()
+
+    def without(self, sender: object) -> 'ExecutionContext':
+        """
+        Remove a finished target or step from the stack together with the ones above it, which
+        were interrupted by an exception caught by the caller.
+        """
+        field = 'targets' if isinstance(sender, Target) else 'steps'
+        stack = getattr(self, field)
+        for index in range(len(stack) - 1, -1, -1):
+            if stack[index] is sender:
+                return self._replace(**{field: stack[:index]})
+        return self
+
 class Garden(metaclass=SingletonMeta):
 
-    __targets : list = None
-    __providers: list = None
+    __targets : Dict[str, Target] = None
+    __providers: Dict[str, Provider] = None
+    __tags: Dict[str, List[str]] = None  # Target names by their tags
 
-    __steps : list = None
-    __target_stack: List[Target] = None
-    __step_stack : List[Step] = None
+    __records : StepRecords = None  # Executions of the steps of every thread and task
+    __context : contextvars.ContextVar = None  # Execution context of the current thread or task
     __options : dict = None
+    __scheduling : bool = False  # The summary is printed by make_multiple() after every target
     # Overall returncode of the file. Each target call resets it
     __returncode: int = 1
 
@@ -27,36 +64,96 @@ class Garden(metaclass=SingletonMeta):
 
         # Initialize the collection the first time
         if self.__targets is None:
-            self.__targets = []
-
-        if self.__target_stack is None:
-            self.__target_stack = []
+            self.__targets = {}
+            self.__tags = {}
 
-        if self.__step_stack is None:
-            self.__step_stack = []
+        if self.__context is None:
+            self.__context = contextvars.ContextVar('fruit_execution_context', default=ExecutionContext())
 
         if self.__options is None:
             self.__options = {}
             self.__create_options()
 
-        if self.__steps is None:
-            self.__steps = list() # Initialize a new list for the steps
+        if self.__records is None:
+            self.__records = StepRecords()
 
         # Initialize the provider list
         if self.__providers is None:
-            self.__providers = []
+            self.__providers = {}
+
+        self.__subscribe()
+
+    def __subscribe(self) -> None:
+        """
+        Subscribe the delegates to the lifecycle bus. The delegates are referenced weakly, so
+        that gardens created besides the singleton (e.g. for tests) do not track the targets.
+        """
+        for each_topic, each_delegate in [
+                (lifecycle.TARGET_START, self.delegate_OnTargetActivate),
+                (lifecycle.TARGET_END,   self.delegate_OnTargetDeactivate),
+                (lifecycle.STEP_START,   self.delegate_OnStepActivate),
+                (lifecycle.STEP_SKIP,    self.delegate_OnStepSkipped),
+                (lifecycle.STEP_FAIL,    self.delegate_OnStepFailed),
+                (lifecycle.STEP_ABORT,   self.delegate_OnStepAborted),
+                (lifecycle.STEP_CACHED,  self.delegate_OnStepCached),
+                (lifecycle.STEP_END,     self.delegate_OnStepDeactivate)]:
+            lifecycle.subscribe(each_topic, each_delegate, weak=True)
+
+    @property
+    def __target_stack(self) -> Tuple[Target, ...]:
+        """Stack of the active targets in the current context."""
+        return self.__context.get().targets
+
+    @property
+    def __step_stack(self) -> Tuple[Step, ...]:
+        """Stack of the active steps in the current context."""
+        return self.__context.get().steps
 
     def __create_options(self) -> None:
         """
         Create the default fruit configuraiton options.
         """
         self.options['pure'] = False
+        self.options['summary'] = printing.SUMMARY_AUTO
 
     @property
     def options(self) -> Dict:
         """Get the global options."""
         return self.__options
 
+    @property
+    def records(self) -> StepRecords:
+        """Records of the executed steps"""
+        return self.__records
+
+    def reset_records(self, retention: str = 'full', resources: bool = False) -> None:
+        """
+        Replace the step records with an empty store using the given retention policy.
+
+        Parameters
+        ----------
+        `retention` : str, optional
+            'full', 'aggregate' or 'last:N', by default 'full'
+        `resources` : bool, optional
+            Store the resource usage of the steps, by default False
+
+        Raises
+        ------
+        ValueError
+            Invalid retention policy
+        """
+        self.__records = StepRecords(retention, resources=resources)
+
+    def clear(self) -> None:
+        """
+        Remove the registered targets and providers, e.g. before loading the fruit
+        configuration again. The global providers (`@<name>`) of the extensions are kept.
+        """
+        self.__targets.clear()
+        self.__tags.clear()
+        for each_name in [name for name in self.__providers if not name.startswith('@')]:
+            del self.__providers[each_name]
+
     def getcwd(self) -> str:
         """
         Get the absolute path of the current working directory.
@@ -81,11 +178,15 @@ class Garden(metaclass=SingletonMeta):
         ------
         TypeError
             Raised, when the passed object is not a provider.
+        ValueError
+            Raised, when a provider with the same name is already registered.
         """
-        if isinstance(provider, Provider):
-            self.__providers.append(provider)
-        else:
+        if not isinstance(provider, Provider):
             raise TypeError("The given object is not an information provider!")
+        if provider.name in self.__providers:
+            raise ValueError(f"The provider '{provider.name}' is already defined!")
+
+        self.__providers[provider.name] = provider
 
     def run_provider(self, name: str) -> str:
         """
@@ -102,13 +203,31 @@ class Garden(metaclass=SingletonMeta):
             Provided value.
         """
         # TODO: Add argument propagation!!!
-        flt = list(filter(lambda p: p.name == name, self.__providers))
+        return self.get_provider(name)()
 
-        if len(flt) < 1:
-            raise ValueError(f"There is no provider found for '{name}'!")
-        else:
-            prov, = flt
-            return prov()
+    def get_provider(self, name: str) -> Provider:
+        """
+        Get a registered information provider by its name.
+
+        Parameters
+        ----------
+        `name` : str
+            Name of the provider
+
+        Returns
+        -------
+        Provider
+            Provider object
+
+        Raises
+        ------
+        ValueError
+            There is no provider with the given name
+        """
+        try:
+            return self.__providers[name]
+        except KeyError:
+            raise ValueError(f"There is no provider found for '{name}'!") from None
 
     def get_providers(self):
         """
@@ -119,8 +238,7 @@ class Garden(metaclass=SingletonMeta):
         Provider
             All registered providers.
         """
-        for each_provider in self.__providers:
-            yield each_provider
+        yield from self.__providers.values()
 
     def add_target(self, target: Target):
         """
@@ -130,8 +248,77 @@ class Garden(metaclass=SingletonMeta):
         ----------
         `target` : Target
             Target object
+
+        Raises
+        ------
+        ValueError
+            A target with the same name is already registered
+        """
+        if target.name in self.__targets:
+            raise ValueError(f"The target '{target.name}' is already defined!")
+
+        self.__targets[target.name] = target
+        for each_tag in target.tags:
+            self.__tags.setdefault(each_tag, []).append(target.name)
+
+    def get_target(self, target_name: str) -> Target:
+        """
+        Find the target with the selected name
+
+        Parameters
+        ----------
+        `target_name` : str
+            Target name to search for
+
+        Returns
+        -------
+        Target
+            Target object
+
+        Raises
+        ------
+        ValueError
+            There is no target with the given name
+        """
+        try:
+            return self.__targets[target_name]
+        except KeyError:
+            raise ValueError("The target '{}' is not found!".format(target_name)) from None
+
+    def select_targets(self, *selectors: str) -> List[str]:
         """
-        self.__targets.append(target)
+        Find the names of the targets matching the given selectors. A selector is either
+        a target name, a glob pattern of target names (e.g. `test-*`) or a tag in the form
+        `@tag:<tag>`.
+
+        Parameters
+        ----------
+        `*selectors` : str
+            Target names, glob patterns or tags
+
+        Returns
+        -------
+        List[str]
+            Names of the selected targets without duplicates in the order of the selectors
+
+        Raises
+        ------
+        ValueError
+            A selector does not match any target
+        """
+        names = {}
+        for each_selector in selectors:
+            if each_selector.startswith(TAG_PREFIX):
+                matches = self.__tags.get(each_selector[len(TAG_PREFIX):], [])
+            elif any(char in each_selector for char in "*?["):
+                matches = [name for name in self.__targets if fnmatch.fnmatchcase(name, each_selector)]
+            else:
+                matches = [self.get_target(each_selector).name]
+
+            if len(matches) < 1:
+                raise ValueError("There is no target matching '{}'!".format(each_selector))
+            names.update(dict.fromkeys(matches))
+        return list(names)
 
     def make_target(self, target_name: str):
         """
@@ -142,31 +329,53 @@ class Garden(metaclass=SingletonMeta):
         `target_name` : str
             Target name to make
         """
-        flt_target = list(filter(lambda trg: trg.name == target_name, self.__targets))
-
-        if len(flt_target) < 1:
-            raise ValueError("The target '{}' is not found!".format(target_name))
-        else:
-            cl, = flt_target
-            cl()
+        self.get_target(target_name)()
 
-    def make_multiple(self, *targets):
+    def make_multiple(self, *targets, jobs: int = 1):
         """
-        Make every listed target. When a target is not found the make process will be
-        aborted.
+        Make every listed target together with its dependencies. When a target is not found
+        the make process will be aborted.
+
+        Parameters
+        ----------
+        `*targets` : str
+            Names, glob patterns or tags (`@tag:<tag>`) of the targets to make
+        `jobs` : int, optional
+            Number of targets to make in parallel, by default 1
         """
+        selected = self.select_targets(*targets)
+        schedule = Scheduler(self.get_target, *selected)
+        self.__scheduling = True
         try:
-            # Call the make command on each passed target
-            for each_targetname in targets:
-                self.make_target(each_targetname)
+            # Make the targets in the order of their dependencies
+            # The targets interrupted by an exception leave nothing active in the caller's context
+            schedule.run(lambda trg: contextvars.copy_context().run(trg), jobs=jobs)
+            # One summary of every made target, also when they were made in parallel
+            if self.options['pure'] is False and len(schedule.order) > 0:
+                printing.print_summary([self.get_target(each) for each in selected], self.__records,
+                                       self.options['summary'])
         except AbortStepSignal as aerr:
             console.error("The make process was aborted! Reason: {}".format(str(aerr)))
             # Try to print the summary
-            printing.print_summary_abort(self.__target_stack[0], self.__steps)
+            printing.print_summary_abort(schedule.failed, self.__records, self.options['summary'],
+                                         targets=[self.get_target(each) for each in selected])
         except SkipStepSignal:
             console.error("fruit.skip() may only be called from inside of a step!")
         except FailStepSignal:
             console.error("fruit.fail() may only be called from inside of a step!")
+        finally:
+            self.__scheduling = False
+            # Deliver the events to the asynchronous listeners
+            lifecycle.flush()
+            # Persist the fingerprints of the incremental steps
+            try:
+                StateFile.save_all()
+            except OSError as exc:
+                console.warning(f"The state of the incremental steps cannot be saved! Reason: {str(exc)}")
+            try:
+                ArtifactCache.default().evict()
+            except OSError as exc:
+                console.warning(f"The artifact cache cannot be cleaned up! Reason: {str(exc)}")
 
     def delegate_OnTargetActivate(self, sender: Target) -> None:
         """
@@ -177,7 +386,9 @@ class Garden(metaclass=SingletonMeta):
         `caller` : Target
             Target, that has been activated via a function call.
         """
-        self.__target_stack.append(sender) # Add the target to the stack
+        # Add the target to the stack
+        context = self.__context.get()
+        self.__context.set(context._replace(targets=context.targets + (sender,)))
 
         # Only print, when allowed
         if self.options['pure'] is False:
@@ -193,19 +404,20 @@ class Garden(metaclass=SingletonMeta):
             Target, that triggered the event.
         """
         # Pop the target from the stack
-        last_trg = self.__target_stack.pop()
+        self.__context.set(self.__context.get().without(sender))
 
         if self.options['pure'] is False:
             printing.print_target_foot(target=sender)
 
-            # Only print the summary, if there are no more targets left!
-            if len(self.__target_stack) == 0:
-                printing.print_summary(last_trg, self.__steps)
+            # Only print the summary, if there are no more targets left! The summary of the
+            # scheduled targets is printed by make_multiple().
+            if len(self.__target_stack) == 0 and not self.__scheduling and sender.exception is None:
+                printing.print_summary(sender, self.__records, self.options['summary'])
         else:
             pass # Print a middle-summary
     
     def get_curr_step_nr(self):
-        return len(self.__steps)
+        return self.__records.count
     
     def __get_step_prefix_trg(self) -> str:
         """
@@ -251,12 +463,15 @@ class Garden(metaclass=SingletonMeta):
         return self.__get_step_prefix_trg() + self.__get_step_prefix_step() +  name
 
     def delegate_OnStepActivate(self, sender: Step) -> None:
-        """Add the step to the list of executed steps, when it is activated"""
-        self.__steps.append(sender)
-        self.__step_stack.append(sender)
+        """Add the step to the records of executed steps, when it is activated"""
+        context = self.__context.get()
+        parent = context.steps[-1].record if len(context.steps) > 0 else NO_PARENT
+        self.__context.set(context._replace(steps=context.steps + (sender,)))
 
         # Name prefix is added ONLY for the full name! DON'T INHERIT IT
+        # The label is not part of the name, so that the calls of a step are aggregated by name
         sender.fullname = self.__add_step_name_prefix(sender.name)
+        sender.record = self.__records.begin(sender.fullname, time.perf_counter(), parent)
 
         if self.options['pure'] is False:
             printing.print_step_head(step=sender, number=self.get_curr_step_nr())
@@ -267,15 +482,21 @@ class Garden(metaclass=SingletonMeta):
     def delegate_OnStepFailed(self, sender: Step, exception: FailStepSignal) -> None:
         printing.print_step_fail(step=sender, reason=str(exception))
     
+    def delegate_OnStepCached(self, sender: Step) -> None:
+        if self.options['pure'] is False:
+            printing.print_step_cached(step=sender)
+
     def delegate_OnStepAborted(self, sender: Step, exception: AbortStepSignal) -> None:
-        pass
+        # The abort signal propagates through the calling steps, each of them is finished
+        self.delegate_OnStepDeactivate(sender)
     
     def delegate_OnStepDeactivate(self, sender: Step) -> None:
-        __ = self.__step_stack.pop()
+        # Nested steps, that did not finish (e.g. aborted ones), are removed as well
+        self.__context.set(self.__context.get().without(sender))
+        self.__records.end(sender.record, sender.status, sender.time, sender.usage)
 
     def get_targets(self):
-        for each_target in self.__targets:
-            yield each_target
+        yield from self.__targets.values()
 
     @property
     def returncode(self) -> int:
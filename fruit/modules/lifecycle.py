@@ -0,0 +1,260 @@
+"""
+Lifecycle event bus of fruit.
+
+Targets and steps publish their lifecycle events to the topics of the bus. Listeners
+subscribe once to a topic instead of subscribing to the events of every target and step::
+
+    from fruit.modules import lifecycle
+
+    def report(sender):
+        print(sender.fullname, sender.time)
+
+    lifecycle.subscribe(lifecycle.STEP_END, report)
+
+The listeners are called with the keyword arguments of the topic (see `TOPICS`) in the
+order of their priority. Synchronous listeners are called by the thread publishing the
+event, asynchronous listeners by a shared worker thread. Listeners may be referenced
+weakly, so that subscribing a method does not keep its object alive.
+"""
+
+import os
+import bisect
+import atexit
+import queue
+import weakref
+import itertools
+import threading
+from types import MethodType
+from typing import Callable, Dict, List, Tuple
+
+import fruit.modules.console as console
+
+TARGET_START = 'target-start'
+TARGET_END   = 'target-end'
+STEP_START   = 'step-start'
+STEP_SKIP    = 'step-skip'
+STEP_FAIL    = 'step-fail'
+STEP_ABORT   = 'step-abort'
+STEP_CACHED  = 'step-cached'
+STEP_END     = 'step-end'
+
+# Keyword arguments of the listeners of each topic
+TOPICS: Dict[str, Tuple[str, ...]] = {
+    TARGET_START: ('sender',),
+    TARGET_END:   ('sender',),
+    STEP_START:   ('sender',),
+    STEP_SKIP:    ('sender', 'exception'),
+    STEP_FAIL:    ('sender', 'exception'),
+    STEP_ABORT:   ('sender', 'exception'),
+    STEP_CACHED:  ('sender',),
+    STEP_END:     ('sender',),
+}
+
+
+class _Listener(object):
+    """Subscription of a listener to a topic."""
+
+    __slots__ = ('callback', 'asynchronous')
+
+    def __init__(self, callback: Callable, asynchronous: bool):
+        self.callback = callback
+        self.asynchronous = asynchronous
+
+
+class LifecycleBus(object):
+    """
+    Publish-subscribe bus of the lifecycle events.
+
+    The listeners of each topic are kept in a sorted list. Publishing an event only
+    iterates over an immutable snapshot of the listeners, so the dispatch does not lock
+    and its cost only depends on the number of synchronous listeners of the topic.
+    Asynchronous listeners cost a single queue operation per event.
+    """
+
+    def __init__(self):
+        # Reentrant, as collected weak listeners are removed from inside of the garbage collector
+        self.__lock = threading.RLock()
+        self.__order = itertools.count()
+        self.__listeners: Dict[str, List[_Listener]] = {topic: [] for topic in TOPICS}
+
+        # Snapshots of the callbacks used for the dispatch
+        self.__sync: Dict[str, tuple] = {topic: () for topic in TOPICS}
+        self.__async: Dict[str, tuple] = {topic: () for topic in TOPICS}
+
+        self.__queue: queue.Queue = None
+        self.__worker: threading.Thread = None
+
+        if hasattr(os, 'register_at_fork'):
+            # The worker thread does not exist in a forked child
+            os.register_at_fork(after_in_child=self.__reset)
+
+    def subscribe(self, topic: str, listener: Callable, priority: int = 0, weak: bool = False,
+                  asynchronous: bool = False) -> Callable:
+        """
+        Subscribe a listener to a topic.
+
+        Parameters
+        ----------
+        `topic` : str
+            Topic of the events, one of `TOPICS`
+        `listener` : Callable
+            Function called with the keyword arguments of the topic
+        `priority` : int, optional
+            Listeners with higher priority are called first, by default 0. Listeners with
+            the same priority are called in the order of their subscription.
+        `weak` : bool, optional
+            Reference the listener weakly, by default False. The listener is unsubscribed,
+            when it is garbage collected.
+        `asynchronous` : bool, optional
+            Call the listener from the worker thread of the bus, by default False
+
+        Returns
+        -------
+        Callable
+            The subscribed listener
+
+        Raises
+        ------
+        ValueError
+            Unknown topic or the listener is already subscribed to the topic
+        TypeError
+            The listener cannot be called with the arguments of the topic
+        """
+        self.__verify(topic, listener)
+
+        if weak:
+            ref = (weakref.WeakMethod if isinstance(listener, MethodType) else weakref.ref)(
+                listener, lambda __: self.__remove(topic, lambda each: each.callback is callback))
+
+            def callback(**payload):
+                func = ref()
+                if func is not None:
+                    func(**payload)
+            callback.listener = ref
+        else:
+            callback = listener
+
+        with self.__lock:
+            if self.__find(topic, listener) is not None:
+                raise ValueError("The listener is already subscribed to the topic!")
+
+            bisect.insort(self.__listeners[topic], (-priority, next(self.__order), _Listener(
+                callback, asynchronous)))
+            self.__update(topic)
+        return listener
+
+    def unsubscribe(self, topic: str, listener: Callable) -> None:
+        """
+        Remove a listener from a topic. Listeners, that are not subscribed are ignored.
+
+        Parameters
+        ----------
+        `topic` : str
+            Topic of the events
+        `listener` : Callable
+            Subscribed listener
+        """
+        with self.__lock:
+            entry = self.__find(topic, listener)
+            if entry is not None:
+                self.__listeners[topic].remove(entry)
+                self.__update(topic)
+
+    def publish(self, topic: str, **payload) -> None:
+        """
+        Call the listeners of a topic with the given keyword arguments.
+
+        Parameters
+        ----------
+        `topic` : str
+            Topic of the event
+        `**payload`
+            Keyword arguments of the topic
+        """
+        for each_callback in self.__sync[topic]:
+            each_callback(**payload)
+
+        listeners = self.__async[topic]
+        if listeners:
+            self.__queue.put((listeners, payload))
+
+    def flush(self) -> None:
+        """Wait until the asynchronous listeners processed every published event."""
+        if self.__queue is not None and threading.current_thread() is not self.__worker:
+            self.__queue.join()
+
+    def __find(self, topic: str, listener: Callable) -> tuple:
+        """Find the subscription of a listener."""
+        for each_entry in self.__listeners[topic]:
+            callback = each_entry[2].callback
+            ref = getattr(callback, 'listener', None)
+            if callback == listener or (ref is not None and ref() == listener):
+                return each_entry
+        return None
+
+    def __remove(self, topic: str, predicate: Callable[[_Listener], bool]) -> None:
+        """Remove the subscriptions matching a predicate, e.g. collected weak listeners."""
+        with self.__lock:
+            self.__listeners[topic] = [e for e in self.__listeners[topic] if not predicate(e[2])]
+            self.__update(topic)
+
+    def __update(self, topic: str) -> None:
+        """Update the dispatch snapshots of a topic. The lock has to be held."""
+        entries = [each[2] for each in self.__listeners[topic]]
+        self.__sync[topic] = tuple(e.callback for e in entries if not e.asynchronous)
+        self.__async[topic] = tuple(e.callback for e in entries if e.asynchronous)
+
+        if self.__async[topic] and self.__worker is None:
+            self.__queue = queue.Queue()
+            self.__worker = threading.Thread(target=self.__work, name='fruit-lifecycle', daemon=True)
+            self.__worker.start()
+            atexit.register(self.flush)
+
+    def __reset(self) -> None:
+        """Forget the worker thread of the parent process. The events of a forked child are only
+        dispatched to the synchronous listeners."""
+        self.__lock = threading.RLock()
+        self.__queue = None
+        self.__worker = None
+        self.__async = {topic: () for topic in TOPICS}
+
+    def __work(self) -> None:
+        """Dispatch the events to the asynchronous listeners."""
+        while True:
+            listeners, payload = self.__queue.get()
+            for each_callback in listeners:
+                try:
+                    each_callback(**payload)
+                except Exception as exc:
+                    # The publisher cannot handle the error anymore
+                    console.error(f"Asynchronous lifecycle listener failed! Reason: {exc!r}")
+            self.__queue.task_done()
+
+    @staticmethod
+    def __verify(topic: str, listener: Callable) -> None:
+        """Check the topic and the signature of a listener."""
+        if topic not in TOPICS:
+            raise ValueError(f"Unknown lifecycle topic '{topic}'!")
+        if not callable(listener):
+            raise TypeError("The listener must be a callable!")
+
+        from inspect import signature # Imported on demand, as it is slow to import
+
+        try:
+            sig = signature(listener)
+        except ValueError:
+            return # Builtins without signature information
+        try:
+            sig.bind(**{each: None for each in TOPICS[topic]})
+        except TypeError as te:
+            raise TypeError(f"The signature of '{getattr(listener, '__name__', listener)}' is invalid "
+                            f"for the topic '{topic}'. Reason: {str(te)}")
+
+
+# Bus of the fruit process
+BUS = LifecycleBus()
+
+subscribe = BUS.subscribe
+unsubscribe = BUS.unsubscribe
+publish = BUS.publish
+flush = BUS.flush
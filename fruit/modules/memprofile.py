@@ -0,0 +1,225 @@
+"""
+Memory profiling of the steps with `tracemalloc`.
+
+The memory profiler traces the Python memory allocations during the steps and reports for
+every step:
+
+peak
+    The highest traced memory during the step above the memory at its start
+live
+    The memory allocated by the step, that is still referenced after the step returned
+top lines
+    The source lines, that allocated the most live memory
+
+The live memory of a step is measured again after a garbage collection, so only the memory
+still referenced (e.g. by a global cache or the returned value) is reported as leaked.
+
+The traced memory is process wide: with `fruit make -j N` the steps running at the same time
+share their peaks and allocations. Tracing slows the allocations down and the snapshots
+taken around every step cost time proportional to the number of live allocations, so the
+memory profiler is meant for diagnosing single targets.
+"""
+
+import gc
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Dict, List
+
+from . import lifecycle
+
+# Live memory after a step, above which it is reported as leaked
+LEAK_THRESHOLD = 1024**2
+
+# Number of source lines reported for each step
+TOP_LINES = 5
+
+# Allocations of the profiler itself are ignored. The snapshots are not filtered, as filtering
+# matches every trace, only the reported lines are.
+_IGNORED = {tracemalloc.__file__, __file__}
+
+
+class StepMemory(object):
+    """
+    Traced memory of the executions of a step.
+
+    Attributes
+    ----------
+    fullname : str
+        Full name of the step
+    count : int
+        Number of executions
+    peak : int
+        Highest peak of the executions in bytes
+    live : int
+        Total memory in bytes, that the executions left allocated
+    lines : Counter
+        Live memory in bytes by the allocating source line (`file:line`)
+    """
+
+    __slots__ = ('fullname', 'count', 'peak', 'live', 'lines')
+
+    def __init__(self, fullname: str):
+        self.fullname = fullname
+        self.count = 0
+        self.peak = 0
+        self.live = 0
+        self.lines = Counter()
+
+    @property
+    def leaked(self) -> bool:
+        """True, if the executions left more memory allocated than the `LEAK_THRESHOLD`"""
+        return self.live >= LEAK_THRESHOLD
+
+    def top(self, number: int = TOP_LINES) -> List[tuple]:
+        """
+        Get the source lines, that allocated the most live memory.
+
+        Parameters
+        ----------
+        `number` : int, optional
+            Maximum number of lines, by default `TOP_LINES`
+
+        Returns
+        -------
+        List[tuple]
+            Source lines (`file:line`) and their live memory in bytes
+        """
+        return self.lines.most_common(number)
+
+
+class _Frame(object):
+    """Running step and the traced memory at its start."""
+
+    __slots__ = ('sender', 'start', 'peak', 'snapshot')
+
+    def __init__(self, sender: object, start: int, snapshot: tracemalloc.Snapshot):
+        self.sender = sender
+        self.start = start
+        self.peak = start
+        self.snapshot = snapshot
+
+
+class MemoryProfiler(object):
+    """
+    Lifecycle listener tracing the memory allocations of the steps.
+
+    Example::
+
+        with MemoryProfiler() as profiler:
+            Garden().make_multiple("release")
+        printing.print_memory_report(profiler.results())
+    """
+
+    def __init__(self):
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__started = False
+        self.__steps: Dict[str, StepMemory] = {}
+
+    @property
+    def __stack(self) -> List[_Frame]:
+        try:
+            return self.__local.stack
+        except AttributeError:
+            self.__local.stack = []
+            return self.__local.stack
+
+    def start(self) -> None:
+        """Start tracing the memory allocations."""
+        # Tracing may have been started already, e.g. with PYTHONTRACEMALLOC
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__started = True
+
+        # The memory is measured after the garden started and before it finishes the steps
+        lifecycle.subscribe(lifecycle.STEP_START, self.on_step_start, priority=-100)
+        lifecycle.subscribe(lifecycle.STEP_END, self.on_step_end, priority=100)
+        lifecycle.subscribe(lifecycle.STEP_ABORT, self.on_step_abort, priority=100)
+
+    def stop(self) -> None:
+        """Stop tracing the memory allocations."""
+        lifecycle.unsubscribe(lifecycle.STEP_START, self.on_step_start)
+        lifecycle.unsubscribe(lifecycle.STEP_END, self.on_step_end)
+        lifecycle.unsubscribe(lifecycle.STEP_ABORT, self.on_step_abort)
+
+        if self.__started:
+            tracemalloc.stop()
+            self.__started = False
+
+    def __enter__(self) -> 'MemoryProfiler':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def results(self) -> List[StepMemory]:
+        """
+        Get the traced memory of the steps in the order of their first execution.
+
+        Returns
+        -------
+        List[StepMemory]
+            Traced memory by full name of the steps
+        """
+        with self.__lock:
+            return list(self.__steps.values())
+
+    def on_step_start(self, sender) -> None:
+        stack = self.__stack
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+
+        # The peak is reset for every step, the callers keep their peak so far
+        if len(stack) > 0:
+            stack[-1].peak = max(stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+
+        stack.append(_Frame(sender, current, snapshot))
+
+    def on_step_end(self, sender) -> None:
+        stack = self.__stack
+        if not any(each.sender is sender for each in stack):
+            return # Started before the profiling
+
+        frame = stack.pop()
+        while frame.sender is not sender:
+            frame = stack.pop() # Steps interrupted by an exception
+
+        current, peak = tracemalloc.get_traced_memory()
+        frame.peak = max(frame.peak, peak)
+        if len(stack) > 0:
+            stack[-1].peak = max(stack[-1].peak, frame.peak)
+
+        live = current - frame.start
+        if live >= LEAK_THRESHOLD:
+            # Only memory, that is still referenced counts as leaked
+            gc.collect()
+            live = tracemalloc.get_traced_memory()[0] - frame.start
+
+        lines = []
+        if live > 0:
+            for each_diff in tracemalloc.take_snapshot().compare_to(frame.snapshot, 'lineno'):
+                origin = each_diff.traceback[0]
+                if each_diff.size_diff <= 0 or len(lines) == TOP_LINES:
+                    break
+                if origin.filename not in _IGNORED:
+                    lines.append((f"{origin.filename}:{origin.lineno}", each_diff.size_diff))
+
+        with self.__lock:
+            name = sender.fullname or sender.name
+            step = self.__steps.get(name)
+            if step is None:
+                step = self.__steps[name] = StepMemory(name)
+            step.count += 1
+            step.peak = max(step.peak, frame.peak - frame.start)
+            step.live += live
+            step.lines.update(dict(lines))
+
+            # Only the top lines of a step are kept
+            if len(step.lines) > TOP_LINES:
+                step.lines = Counter(dict(step.lines.most_common(TOP_LINES)))
+
+    def on_step_abort(self, sender, exception) -> None:
+        self.on_step_end(sender)
@@ -22,8 +22,9 @@ def load_fruit_env() -> List[str]:
     """
     try:
         with open(DOT_FRUITPATH, 'r') as fp:
-            pathlist = fp.readlines()
-        return pathlist
+            return [line.strip() for line in fp if line.strip() != ""]
+    except FileNotFoundError:
+        return [] # Nothing is picked up yet
     except Exception as exc:
         console.error(f"The environmental variable FRUITPATH cannot be loaded!")
         console.error(f"Reason {str(exc)}")
@@ -41,7 +42,7 @@ def save_fruit_env(paths: List[str]) -> None:
     """
     try:
         with open(DOT_FRUITPATH, 'w') as fp:
-            fp.writelines(paths)
+            fp.writelines(path + "\n" for path in paths)
     except Exception as exc:
         console.error("The environmental variable FRUITPATH cannot be modified!")
         console.error(f"Reason: {str(exc)}")
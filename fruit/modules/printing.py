@@ -4,22 +4,34 @@ Printing module to print logs and results
 
 from .target import Target
 from .provider import Provider
-from .step import Step, STATUS_ERR, STATUS_OK, STATUS_SKIPPED, STATUS_UNKNOWN
+from .step import Step, STATUS_ERR, STATUS_OK, STATUS_SKIPPED, STATUS_UNKNOWN, STATUS_CACHED
+from .records import StepRecords
+from .resources import ResourceUsage
+from .memprofile import StepMemory
 import fruit.modules.console as console
-import click
-import tabulate
-from typing import List
+from fruit.globals import terminal_width
+from typing import List, Union
 import time
 
-WIDTH = (click.get_terminal_size()[0] - 10)
-
 # Define ICONS
 ICON_TARGET = "🌳🍎"
 ICON_STEP   = "🥝"
 ICON_OK     = "✅"
 ICON_SKIP   = "⏩"
 ICON_ERR    = "❌"
+ICON_CACHED = "💾"
 ICON_UNKNOWN = "❔"
+ICON_LEAK   = "⚠️"
+
+# Formats of the target summary. The automatic format prints the table of the executions
+# for small runs and the aggregates for large ones.
+SUMMARY_TABLE = 'table'
+SUMMARY_AGGREGATE = 'aggregate'
+SUMMARY_AUTO = 'auto'
+SUMMARY_TABLE_LIMIT = 100
+
+# Order of the statuses, when a single status represents multiple executions
+STATUS_SEVERITY = {STATUS_CACHED: 0, STATUS_OK: 1, STATUS_UNKNOWN: 2, STATUS_SKIPPED: 3, STATUS_ERR: 4}
 
 def print_target_list(targets: List[Target]) -> None:
     """
@@ -31,10 +43,16 @@ def print_target_list(targets: List[Target]) -> None:
         List of target objects
     """
     table = [(t.name, t.help) for t in targets]
+    headers = ['Target', 'Description']
+    if any(t.tags for t in targets):
+        table = [row + (", ".join(t.tags),) for row, t in zip(table, targets)]
+        headers.append('Tags')
+
     if len(table) > 0:
         console.echo()
         console.echo("List of available targets:")
-        console.echo(tabulate.tabulate(table, headers=['Target', 'Description']))
+        import tabulate # Imported on demand, as it is slow to import
+        console.echo(tabulate.tabulate(table, headers=headers))
     else:
         console.echo()
         console.echo("No targets found!")
@@ -52,6 +70,7 @@ def print_provider_list(providers: List[Provider]) -> None:
     if len(table) > 0:
         console.echo()
         console.echo("List of available providers:")
+        import tabulate # Imported on demand, as it is slow to import
         console.echo(tabulate.tabulate(table, headers=['Provider', 'Description']))
     else:
         console.echo()
@@ -68,7 +87,7 @@ def print_target_head(target: Target) -> None:
     """
     console.echo()
     console.echo(f"{ICON_TARGET} Making '{target.name}' ...")
-    console.echo("="*WIDTH)
+    console.echo("="*terminal_width())
 
 def print_target_foot(target: Target) -> None:
     """
@@ -79,7 +98,7 @@ def print_target_foot(target: Target) -> None:
     target : Target
         Target object
     """
-    console.echo("="*WIDTH)
+    console.echo("="*terminal_width())
 
 def print_step_head(step: Step, number: int) -> None:
     """
@@ -90,9 +109,10 @@ def print_step_head(step: Step, number: int) -> None:
     step : Step
         Step object
     """
-    mstring = f"{ICON_STEP} Step {number} : {step.fullname}"
-    if len(mstring) < WIDTH:
-        mstring += " " + "-"*(WIDTH -len(mstring)-2)
+    width = terminal_width()
+    mstring = f"{ICON_STEP} Step {number} : {step.fullname}{step.label}"
+    if len(mstring) < width:
+        mstring += " " + "-"*(width -len(mstring)-2)
     console.echo()
     console.echo(mstring)
     console.echo()
@@ -112,7 +132,7 @@ def print_step_fail(step: Step, reason: str) -> None:
     if reason is None or reason is "":
         reason = ""
 
-    console.error(f"{ICON_ERR} Step '{step.name}' failed! {reason}")
+    console.error(f"{ICON_ERR} Step '{step.name}{step.label}' failed! {reason}")
 
 def print_step_skip(step: Step, reason: str) -> None:
     """
@@ -126,49 +146,137 @@ def print_step_skip(step: Step, reason: str) -> None:
     if reason is None or reason is "":
         reason = ""
 
-    console.warning(f"{ICON_SKIP} Step '{step.name}' was skipped! {reason}")
+    console.warning(f"{ICON_SKIP} Step '{step.name}{step.label}' was skipped! {reason}")
 
-def print_summary(last_target:Target, steps:List[Step]) -> None:
+def print_step_cached(step: Step) -> None:
     """
-    Print the summarized results as a table to the console. All run steps & substeps and targets
-    will be summarized.
-    
+    Print a diagnostic message to the console when a step was skipped, because it is up to date
+    or its outputs were restored from the artifact cache.
+
     Parameters
     ----------
-    last_target : Target
-        Target that the summary belonds to
-
-    steps : List[Step]
-        List of executed steps
+    step : Step
+        Step that was skipped.
     """
+    if step.restored:
+        console.echo(f"{ICON_CACHED} Step '{step.name}{step.label}' was restored from the artifact cache.")
+    else:
+        console.echo(f"{ICON_CACHED} Step '{step.name}{step.label}' is up to date.")
+
+def _step_status(status: int) -> tuple:
+    """Get the icon and the text of a step status."""
+    if status == STATUS_OK:
+        return ICON_OK, "OK"
+    elif status == STATUS_SKIPPED:
+        return ICON_SKIP, "Skipped"
+    elif status == STATUS_ERR:
+        return ICON_ERR, "Failed"
+    elif status == STATUS_CACHED:
+        return ICON_CACHED, "Cached"
+    else:
+        return ICON_UNKNOWN, "Unknown"
+
+def _format_size(size: int) -> str:
+    """Format a memory size in MiB."""
+    return "%.1f MiB" % (size / 1024**2)
+
+def _usage_headers(records: StepRecords) -> tuple:
+    """Get the headers of the resource usage columns."""
+    return ('CPU', 'Max RSS', 'Read/Write') if records.resources else ()
+
+def _usage_columns(records: StepRecords, usage: ResourceUsage) -> tuple:
+    """Get the resource usage columns of a step or an aggregate."""
+    if not records.resources:
+        return ()
+    if usage is None:
+        return ("", "", "")
+    return ("%.3f" % usage.cpu, _format_size(usage.max_rss), f"{usage.read_blocks}/{usage.write_blocks}")
+
+def _print_step_table(records: StepRecords) -> None:
+    """Print the table of the recorded step executions."""
     table = []
-    for each_step in steps:
-        # Determine the status icon
-        if each_step.status == STATUS_OK:
-            icon = ICON_OK
-            status = "OK"
-        elif each_step.status == STATUS_SKIPPED:
-            icon = ICON_SKIP
-            status = "Skipped"
-        elif  each_step.status == STATUS_ERR:
-            icon = ICON_ERR
-            status = "Failed"
-        else:
-            icon = ICON_UNKNOWN
-            status = "Unknown"
-        
+    for each_step in records.rows():
+        icon, status = _step_status(each_step.status)
         name = each_step.fullname
         xtime = "%.3f" % each_step.time
-        table.append((icon, status, xtime, name))
+        table.append((icon, status, xtime) + _usage_columns(records, each_step.usage) + (name,))
+
+    import tabulate # Imported on demand, as it is slow to import
+    console.echo(tabulate.tabulate(
+        table, headers=('', 'Status', 'Time') + _usage_headers(records) + ('Name',), disable_numparse=True))
 
+    if records.dropped > 0:
+        console.echo(f"... {records.dropped} earlier step executions are not retained.")
+
+def _print_step_aggregates(records: StepRecords) -> None:
+    """Print the statistics of the step executions grouped by the full names of the steps."""
+    table = []
+    for each_aggr in records.aggregates():
+        # The icon of a group is the one of its worst status
+        icon, __ = _step_status(max(each_aggr.statuses, key=STATUS_SEVERITY.get))
+        statuses = "  ".join(f"{_step_status(st)[1]}: {nr}" for st, nr in sorted(
+            each_aggr.statuses.items(), key=lambda item: STATUS_SEVERITY.get(item[0])))
+        table.append((
+            icon, each_aggr.fullname, each_aggr.count,
+            "%.3f" % each_aggr.total, "%.3f" % each_aggr.min, "%.3f" % each_aggr.percentile(50),
+            "%.3f" % each_aggr.percentile(95), "%.3f" % each_aggr.max)
+            + _usage_columns(records, each_aggr.usage) + (statuses,))
+
+    import tabulate # Imported on demand, as it is slow to import
+    console.echo(tabulate.tabulate(
+        table, headers=('', 'Name', 'Count', 'Total', 'Min', 'p50', 'p95', 'Max') + _usage_headers(records) + ('Statuses',),
+        disable_numparse=True))
+
+def _print_steps(records: StepRecords, summary: str) -> None:
+    """Print the step executions in the selected summary format."""
+    if summary == SUMMARY_AUTO:
+        summary = SUMMARY_TABLE if records.count <= SUMMARY_TABLE_LIMIT else SUMMARY_AGGREGATE
+
+    # Without stored rows only the aggregates are available
+    if summary == SUMMARY_TABLE and (records.stored > 0 or records.count == 0):
+        _print_step_table(records)
+    else:
+        _print_step_aggregates(records)
+
+def _target_names(targets: List[Target]) -> str:
+    """Quoted names of the targets, e.g. "'lint', 'test'"."""
+    return ", ".join(f"'{trg.name}'" for trg in targets)
+
+def _summary_title(targets: List[Target]) -> str:
+    """Title of the summary of one or more targets."""
+    if len(targets) == 1:
+        return f"Summary of target {_target_names(targets)}:"
+    return f"Summary of targets {_target_names(targets)}:"
+
+def print_summary(last_target:Union[Target, List[Target]], records:StepRecords, summary:str=SUMMARY_AUTO) -> None:
+    """
+    Print the summarized results as a table to the console. All run steps & substeps and targets
+    will be summarized.
+    
+    Parameters
+    ----------
+    last_target : Target or List[Target]
+        Target that the summary belonds to, or every target made by the run
+
+    records : StepRecords
+        Records of the executed steps
+
+    summary : str, optional
+        Format of the summary: 'table', 'aggregate' or 'auto', by default 'auto'
+    """
+    targets = last_target if isinstance(last_target, list) else [last_target]
     console.echo()
-    console.echo(f"Summary of target '{last_target.name}':")
+    console.echo(_summary_title(targets))
     console.echo()
-    console.echo(tabulate.tabulate(table, headers=('', 'Status', 'Time', 'Name')))
+    _print_steps(records, summary)
     console.echo()
-    console.echo_green(f"{ICON_OK} Target '{last_target.name}' was succesful!")
+    if len(targets) == 1:
+        console.echo_green(f"{ICON_OK} Target '{targets[0].name}' was succesful!")
+    else:
+        console.echo_green(f"{ICON_OK} Targets {_target_names(targets)} were successful!")
 
-def print_summary_abort(last_target:Target, steps:List[Step]) -> None:
+def print_summary_abort(last_target:Target, records:StepRecords, summary:str=SUMMARY_AUTO,
+                        targets:List[Target]=None) -> None:
     """
     Print the summarized results of an aborted target as a table to the console. 
     All run steps & substeps and targets will be summarized.
@@ -179,32 +287,47 @@ def print_summary_abort(last_target:Target, steps:List[Step]) -> None:
     last_target : Target
         Target that the summary belonds to
 
-    steps : List[Step]
-        List of executed steps
+    records : StepRecords
+        Records of the executed steps
+
+    summary : str, optional
+        Format of the summary: 'table', 'aggregate' or 'auto', by default 'auto'
+
+    targets : List[Target], optional
+        Every target of the aborted run, by default only `last_target`
+    """
+    console.echo()
+    console.echo(_summary_title(targets or [last_target]))
+    console.echo()
+    _print_steps(records, summary)
+
+    console.error(f"{ICON_ERR} Target '{last_target.name}' was unsuccessful!")
+
+def print_memory_report(memory: List[StepMemory]) -> None:
+    """
+    Print the traced memory of the steps to the console. The source lines allocating the
+    memory, that is still referenced after the steps returned, are listed below the table.
+
+    Parameters
+    ----------
+    memory : List[StepMemory]
+        Traced memory of the steps
     """
     table = []
-    for each_step in steps:
-        # Determine the status icon
-        if each_step.status == STATUS_OK:
-            icon = ICON_OK
-            status = "OK"
-        elif each_step.status == STATUS_SKIPPED:
-            icon = ICON_SKIP
-            status = "Skipped"
-        elif  each_step.status == STATUS_ERR:
-            icon = ICON_ERR
-            status = "Failed"
-        else:
-            icon = ICON_UNKNOWN
-            status = "Unknown"
-        
-        name = each_step.fullname
-        xtime = "%.3f" % each_step.time
-        table.append((icon, status, xtime, name))
+    for each_step in memory:
+        icon = ICON_LEAK if each_step.leaked else ""
+        table.append((icon, each_step.fullname, each_step.count, _format_size(each_step.peak), _format_size(each_step.live)))
 
     console.echo()
-    console.echo(f"Summary of target '{last_target.name}':")
+    console.echo("Memory of the steps:")
     console.echo()
-    console.echo(tabulate.tabulate(table, headers=('', 'Status', 'Time', 'Name')))
+    import tabulate # Imported on demand, as it is slow to import
+    console.echo(tabulate.tabulate(table, headers=('', 'Name', 'Count', 'Peak', 'Live'), disable_numparse=True))
 
-    console.error(f"{ICON_ERR} Target '{last_target.name}' was unsuccessful!")
\ No newline at end of file
+    for each_step in memory:
+        if each_step.leaked:
+            console.echo()
+            console.warning(f"{ICON_LEAK} Step '{each_step.fullname}' left {_format_size(each_step.live)} allocated:")
+            for each_line, each_size in each_step.top():
+                if each_size >= each_step.live / 100: # Omit the noise
+                    console.echo(f"    {_format_size(each_size):>12}  {each_line}")
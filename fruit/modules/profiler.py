@@ -0,0 +1,293 @@
+"""
+Profiling of the targets and steps.
+
+The profiler has two modes:
+
+deterministic (default)
+    Every target and step execution is profiled with `cProfile`. The profile of a step
+    includes the profiles of its nested steps, but not the overhead of fruit itself. The
+    profiles are aggregated by the (full) name of the targets and steps and written as
+    pstats files, e.g. `step-build.prof`, together with `merged.prof` of the whole run.
+sampling
+    A sampler thread records the call stacks of the threads running steps in a fixed
+    interval. The overhead does not depend on the number of function calls, which suits
+    long running steps. The stacks are written to `samples.folded` in the collapsed stack
+    format of `flamegraph.pl` and https://www.speedscope.app.
+
+The pstats files can be inspected with `python -m pstats step-build.prof` or `snakeviz`.
+
+NOTE: Python 3.12 and newer only allow a single active profiler, the deterministic mode
+cannot profile the targets made in parallel (`-j N`). Use the sampling mode instead.
+"""
+
+import os
+import re
+import sys
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from typing import Dict, List
+
+from . import lifecycle
+from .step import Step
+from .target import Target
+import fruit.modules.console as console
+
+# Files written to the profile directory
+MERGED_PROFILE = 'merged.prof'
+SAMPLES_FILE = 'samples.folded'
+
+# The sampled stacks start below the outermost call of a target or a step
+_ROOT_CODES = (Target.__call__.__code__, Step.__call__.__code__)
+
+
+class _Frame(object):
+    """Running target or step and its profile."""
+
+    __slots__ = ('sender', 'name', 'file', 'profile', 'children')
+
+    def __init__(self, sender: object, name: str, file: str, profile: cProfile.Profile):
+        self.sender = sender
+        self.name = name
+        self.file = file
+        self.profile = profile
+        # Profiles of the finished nested steps
+        self.children: List[pstats.Stats] = []
+
+
+def _file_name(name: str) -> str:
+    """Get the file name of a target or step profile."""
+    return re.sub(r'[^\w.-]+', '_', name).strip('_') + '.prof'
+
+
+def _frame_label(code) -> str:
+    """Get the label of a function in the collapsed stack format."""
+    label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label.replace(';', ':')
+
+
+class StepProfiler(object):
+    """
+    Lifecycle listener profiling the targets and steps.
+
+    Example::
+
+        with StepProfiler("profile"):
+            Garden().make_multiple("release")
+
+    Attributes
+    ----------
+    directory : str
+        Directory of the written profiles
+    interval : float
+        Sampling interval in seconds or None for the deterministic mode
+    """
+
+    directory: str = ""
+    interval: float = None
+
+    def __init__(self, directory: str, interval: float = None):
+        if interval is not None and interval <= 0:
+            raise ValueError("The sampling interval must be positive!")
+
+        self.directory = directory
+        self.interval = interval
+
+        # Running targets and steps of each thread by thread id
+        self.__stacks: Dict[int, List[_Frame]] = {}
+        self.__lock = threading.Lock()
+        self.__warned = False
+
+        # Aggregated profiles by file name and the profile of the whole run
+        self.__stats: Dict[str, pstats.Stats] = {}
+        self.__merged: pstats.Stats = None
+
+        # Sampled stacks and their number of samples
+        self.__samples = Counter()
+        self.__sampler: threading.Thread = None
+        self.__stopped = threading.Event()
+
+        self.__listeners = [
+            (lifecycle.TARGET_START, self.on_target_start, -100),
+            (lifecycle.TARGET_END,   self.on_target_end,    100),
+            (lifecycle.STEP_START,   self.on_step_start,   -100),
+            (lifecycle.STEP_END,     self.on_step_end,      100),
+            (lifecycle.STEP_ABORT,   self.on_step_abort,    100),
+        ]
+
+    @property
+    def sampling(self) -> bool:
+        """True, if the stacks are sampled instead of profiling every call"""
+        return self.interval is not None
+
+    def start(self) -> None:
+        """Start profiling."""
+        # The profile starts after and stops before the other listeners, e.g. the printing of the garden
+        for each_topic, each_listener, each_priority in self.__listeners:
+            lifecycle.subscribe(each_topic, each_listener, priority=each_priority)
+
+        if self.sampling:
+            self.__stopped.clear()
+            self.__sampler = threading.Thread(target=self.__sample, name='fruit-profiler', daemon=True)
+            self.__sampler.start()
+
+    def stop(self) -> None:
+        """Stop profiling and write the profiles to the directory."""
+        for each_topic, each_listener, __ in self.__listeners:
+            lifecycle.unsubscribe(each_topic, each_listener)
+
+        if self.__sampler is not None:
+            self.__stopped.set()
+            self.__sampler.join()
+            self.__sampler = None
+
+        # Targets interrupted by an error
+        with self.__lock:
+            stacks = list(self.__stacks.values())
+            self.__stacks.clear()
+        for each_stack in stacks:
+            if len(each_stack) > 0:
+                self.__finish(each_stack, each_stack[0].sender)
+
+        self.write()
+
+    def __enter__(self) -> 'StepProfiler':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def write(self) -> None:
+        """Write the recorded profiles to the directory."""
+        os.makedirs(self.directory, exist_ok=True)
+
+        if self.sampling:
+            with open(os.path.join(self.directory, SAMPLES_FILE), 'w') as fp:
+                for each_stack, each_count in self.__samples.most_common():
+                    fp.write(f"{each_stack} {each_count}\n")
+            return
+
+        for each_name, each_stats in self.__stats.items():
+            each_stats.dump_stats(os.path.join(self.directory, each_name))
+        if self.__merged is not None:
+            self.__merged.dump_stats(os.path.join(self.directory, MERGED_PROFILE))
+
+    @property
+    def __stack(self) -> List[_Frame]:
+        """Running targets and steps of the current thread"""
+        ident = threading.get_ident()
+        stack = self.__stacks.get(ident)
+        if stack is None:
+            with self.__lock:
+                stack = self.__stacks[ident] = []
+        return stack
+
+    def __begin(self, sender: object, name: str, file: str) -> None:
+        stack = self.__stack
+        if self.sampling:
+            stack.append(_Frame(sender, name, file, None))
+            return
+
+        # The profile of the caller is paused, the nested profile is added to it at the end
+        if len(stack) > 0 and stack[-1].profile is not None:
+            stack[-1].profile.disable()
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active (Python 3.12+), e.g. of a target made in parallel
+            profile = None
+            if not self.__warned:
+                self.__warned = True
+                console.warning("Targets made in parallel cannot be profiled! Use the sampling mode instead.")
+        stack.append(_Frame(sender, name, file, profile))
+
+    def __end(self, sender: object) -> None:
+        stack = self.__stack
+        if not any(each.sender is sender for each in stack):
+            return # Started before the profiling
+
+        self.__finish(stack, sender)
+        if len(stack) > 0 and stack[-1].profile is not None:
+            stack[-1].profile.enable()
+
+    def __finish(self, stack: List[_Frame], sender: object) -> None:
+        """Finish the frames of a stack down to the frame of the sender."""
+        while len(stack) > 0:
+            frame = stack.pop()
+            if not self.sampling:
+                self.__collect(frame, stack[-1] if len(stack) > 0 else None)
+            if frame.sender is sender:
+                break
+
+    def __collect(self, frame: _Frame, parent: _Frame) -> None:
+        """Add the profile of a finished frame to the aggregated profiles and its caller."""
+        stats = None
+        if frame.profile is not None:
+            frame.profile.disable()
+            try:
+                stats = pstats.Stats(frame.profile)
+            except TypeError:
+                pass # Nothing was profiled
+        if len(frame.children) > 0:
+            if stats is None:
+                stats = frame.children.pop()
+            stats.add(*frame.children)
+        if stats is None:
+            return
+
+        with self.__lock:
+            if frame.file in self.__stats:
+                self.__stats[frame.file].add(stats)
+            else:
+                self.__stats[frame.file] = pstats.Stats().add(stats)
+
+            if parent is None:
+                if self.__merged is None:
+                    self.__merged = pstats.Stats().add(stats)
+                else:
+                    self.__merged.add(stats)
+
+        if parent is not None:
+            parent.children.append(stats)
+
+    def __sample(self) -> None:
+        """Sample the stacks of the threads running steps until the profiler is stopped."""
+        while not self.__stopped.wait(self.interval):
+            frames = sys._current_frames()
+            with self.__lock:
+                running = [(ident, [each.name for each in stack]) for ident, stack in self.__stacks.items()]
+
+            for each_ident, each_names in running:
+                frame = frames.get(each_ident)
+                if len(each_names) == 0 or frame is None:
+                    continue
+
+                # Walk from the innermost frame up to the outermost target or step
+                labels, root = [], 0
+                while frame is not None:
+                    if frame.f_code in _ROOT_CODES:
+                        root = len(labels)
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels = labels[root - 1::-1] if root > 0 else []
+                self.__samples[";".join([each.replace(';', ':') for each in each_names] + labels)] += 1
+
+    def on_target_start(self, sender) -> None:
+        self.__begin(sender, sender.name, _file_name("target-" + sender.name))
+
+    def on_target_end(self, sender) -> None:
+        self.__end(sender)
+
+    def on_step_start(self, sender) -> None:
+        name = sender.fullname or sender.name
+        self.__begin(sender, name, _file_name("step-" + name))
+
+    def on_step_end(self, sender) -> None:
+        self.__end(sender)
+
+    def on_step_abort(self, sender, exception) -> None:
+        self.__end(sender)
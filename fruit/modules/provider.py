@@ -1,7 +1,19 @@
 """
 Fruit provider module to declare information provider functions.
+
+The values of providers can be memoized for the current run of fruit (`cache='run'`) or
+persistently in the user cache directory (`cache='disk'`). Memoized values expire after
+their time to live or when one of the files the provider depends on changes.
 """
-from typing import Callable, Any
+import os
+import time
+from typing import Callable, Dict, List
+
+from fruit.globals import PROVIDER_CACHE_FILE
+from .fingerprint import StateFile, expand, fingerprint_files, code_digest, call_digest
+
+# Valid caching modes of the providers
+CACHE_MODES = (None, 'run', 'disk')
 
 class Provider(object):
     """
@@ -16,13 +28,25 @@ class Provider(object):
         Name of the provider
     `help`: str
         Help text of the provider
+    `cache` : str
+        Caching mode of the provided values: None, 'run' or 'disk'
+    `ttl` : float
+        Time to live of the cached values in seconds, None for no expiry
+    `depends_on` : List[str]
+        Glob patterns of the files, whose changes invalidate the cached values
     """
 
     __name: str = ""
     __help: str = ""
     __func: Callable[[any], str] = None
+    __memo: Dict[str, dict] = None
+
+    cache: str = None
+    ttl: float = None
+    depends_on: List[str] = None
 
-    def __init__(self, name: str, help: str, func: Callable[[any], str]):
+    def __init__(self, name: str, help: str, func: Callable[[any], str], cache: str = None, ttl: float = None,
+                 depends_on: List[str] = None):
         """
         Create a new information provider object
         
@@ -34,6 +58,14 @@ class Provider(object):
             Help text (description) of the information
         `func` : Callable[[any], str]:
             Information provider function, that returns the information as a string.
+        `cache` : str, optional
+            Memoize the values for the current run ('run') or persistently ('disk'), by
+            default None (no caching)
+        `ttl` : float, optional
+            Time to live of the cached values in seconds, by default None (no expiry)
+        `depends_on` : List[str], optional
+            Glob patterns of the files, whose changes invalidate the cached values, by
+            default None
         """
         
         if type(name) is str:
@@ -56,16 +88,115 @@ class Provider(object):
             self.__func = func
         else:
             raise TypeError("The provider function must be a callable!")
-    
+
+        if cache not in CACHE_MODES:
+            raise ValueError("The provider cache must be 'run', 'disk' or None!")
+        self.cache = cache
+
+        if ttl is not None and (type(ttl) not in (int, float) or ttl <= 0):
+            raise ValueError("The provider ttl must be a positive number of seconds!")
+        self.ttl = ttl
+
+        if depends_on is None:
+            self.depends_on = []
+        elif isinstance(depends_on, (list, tuple)) and all(type(dep) is str for dep in depends_on):
+            self.depends_on = list(depends_on)
+        else:
+            raise TypeError("The provider dependencies must be a list of glob patterns!")
+
+        self.__memo = {}
+
     def __call__(self, *args, **kwargs) -> str:
         """
-        Call the provider function with the provided arguments. 
+        Call the provider function with the provided arguments. The value is returned from
+        the cache, when the provider is cached and the cached value is still valid.
         
         Returns
         -------
         str
             Original return value of the provider function
         """
+        if self.cache is None:
+            return self.__provide(*args, **kwargs)
+
+        key = self.__cache_key(args, kwargs)
+        entry = self.__lookup(key)
+
+        # Only the files, whose modification time or size changed, are hashed again
+        known = entry.get('files') if isinstance(entry, dict) else None
+        files = fingerprint_files(expand(self.depends_on), known=known if isinstance(known, dict) else None) \
+            if self.depends_on else {}
+
+        if entry is not None and self.__is_valid(entry, files):
+            return entry['value']
+
+        value = self.__provide(*args, **kwargs)
+        self.__store(key, {
+            'value': value,
+            'time': time.time(),
+            'code': code_digest(self.__func),
+            'files': files,
+        })
+        return value
+
+    def __cache_key(self, args: tuple, kwargs: dict) -> str:
+        """Key of the cached value of a call in the current directory."""
+        key = os.getcwd() + "\0" + self.__name
+        if len(args) > 0 or len(kwargs) > 0:
+            key += "#" + call_digest(args, kwargs)[:16]
+        return key
+
+    def __lookup(self, key: str) -> dict:
+        """Get the cached entry of a key."""
+        if self.cache == 'disk':
+            return StateFile.open(PROVIDER_CACHE_FILE).get(key)
+        return self.__memo.get(key)
+
+    def __store(self, key: str, entry: dict) -> None:
+        """Store the entry of a key in the cache."""
+        if self.cache == 'disk':
+            state = StateFile.open(PROVIDER_CACHE_FILE)
+            state.set(key, entry)
+            try:
+                state.save()
+            except OSError:
+                pass # The cache is optional, e.g. for read-only home directories
+        else:
+            self.__memo[key] = entry
+
+    def __is_valid(self, entry: dict, files: Dict[str, list]) -> bool:
+        """Check, whether a cached entry is still valid."""
+        if not isinstance(entry, dict):
+            return False
+        if self.ttl is not None and time.time() - entry.get('time', 0) > self.ttl:
+            return False
+        if entry.get('code') != code_digest(self.__func):
+            return False
+        stored = entry.get('files')
+        if not isinstance(stored, dict) or not all(isinstance(fpr, list) and len(fpr) == 3 for fpr in stored.values()):
+            return False # E.g. an entry of an older fruit version
+        return self.__digests(stored) == self.__digests(files)
+
+    @staticmethod
+    def __digests(fingerprints: dict) -> dict:
+        """Get the content digests of file fingerprints."""
+        return {path: fpr[2] for path, fpr in fingerprints.items()}
+
+    def reset(self) -> None:
+        """Forget the values cached for the current run (`cache='run'`)."""
+        self.__memo.clear()
+
+    def invalidate(self) -> None:
+        """Remove every cached value of the provider."""
+        self.__memo.clear()
+        if self.cache == 'disk':
+            state = StateFile.open(PROVIDER_CACHE_FILE)
+            prefix = os.getcwd() + "\0" + self.__name
+            for each_key in [k for k in state.data if k == prefix or k.startswith(prefix + "#")]:
+                state.remove(each_key)
+
+    def __provide(self, *args, **kwargs) -> str:
+        """Call the provider function and convert its value to a string."""
         return_str = self.__func(*args, **kwargs)
 
         if type(return_str) is not str:
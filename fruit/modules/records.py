@@ -0,0 +1,361 @@
+"""
+Compact store of the step executions of a fruit run.
+
+The executions are stored column-wise in typed arrays (struct of arrays) instead of keeping
+the `Step` objects alive. Step names are interned and stored as ids. The retention policy
+limits the stored rows:
+
+full
+    Every execution is stored (default)
+aggregate
+    Only the aggregates of the steps are kept, no rows are stored
+last:N
+    The last N executions are stored in a ring buffer
+
+The aggregates of the steps (count, durations, statuses) are kept with every policy. The
+percentiles of the durations are calculated from a bounded reservoir sample of each step,
+so they are exact for up to `RESERVOIR_SIZE` executions.
+"""
+
+import math
+import random
+import threading
+from array import array
+from collections import namedtuple
+from typing import Dict, Iterator, List
+
+from .step import STATUS_UNKNOWN, STATUS_NAMES
+from .resources import ResourceUsage
+
+RETENTION_FULL = 'full'
+RETENTION_AGGREGATE = 'aggregate'
+RETENTION_LAST = 'last'
+
+# Parent id of the steps called directly from a target
+NO_PARENT = -1
+
+# Maximum number of durations sampled for the percentiles of each step
+RESERVOIR_SIZE = 1024
+
+# Stored execution of a step. The usage is only stored, when the resources are recorded.
+StepRow = namedtuple('StepRow', ['id', 'fullname', 'status', 'start', 'time', 'parent', 'usage'], defaults=[None])
+
+
+def parse_retention(retention: str) -> tuple:
+    """
+    Parse a retention policy.
+
+    Parameters
+    ----------
+    `retention` : str
+        'full', 'aggregate' or 'last:N'
+
+    Returns
+    -------
+    tuple
+        Policy name and the maximum number of stored rows (None for no limit)
+
+    Raises
+    ------
+    ValueError
+        Invalid retention policy
+    """
+    if retention == RETENTION_FULL:
+        return RETENTION_FULL, None
+    if retention == RETENTION_AGGREGATE:
+        return RETENTION_AGGREGATE, 0
+
+    policy, __, limit = retention.partition(':')
+    if policy == RETENTION_LAST and limit.isdigit() and int(limit) > 0:
+        return RETENTION_LAST, int(limit)
+
+    raise ValueError(f"Invalid retention '{retention}'! Use 'full', 'aggregate' or 'last:N'.")
+
+
+class StepAggregate(object):
+    """
+    Aggregated executions of the steps with the same full name.
+
+    Attributes
+    ----------
+    fullname : str
+        Full name of the step
+    count : int
+        Number of executions
+    total : float
+        Sum of the execution times in seconds
+    min : float
+        Shortest execution time in seconds
+    max : float
+        Longest execution time in seconds
+    statuses : Dict[int, int]
+        Number of executions by status
+    samples : array
+        Uniform random sample of the execution times (reservoir sampling)
+    usage : ResourceUsage
+        Total CPU time and block I/O and the peak RSS of the executions, when the resources
+        are recorded
+    """
+
+    __slots__ = ('fullname', 'count', 'total', 'min', 'max', 'statuses', 'samples', 'usage')
+
+    def __init__(self, fullname: str):
+        self.fullname = fullname
+        self.count = 0
+        self.total = .0
+        self.min = float('inf')
+        self.max = .0
+        self.statuses = {}
+        self.samples = array('d')
+        self.usage = None
+
+    def add(self, status: int, duration: float, rng: random.Random, usage: ResourceUsage = None) -> None:
+        """Add an execution to the aggregate."""
+        if usage is not None:
+            if self.usage is None:
+                self.usage = ResourceUsage()
+            self.usage.cpu_user += usage.cpu_user
+            self.usage.cpu_sys += usage.cpu_sys
+            self.usage.max_rss = max(self.usage.max_rss, usage.max_rss)
+            self.usage.read_blocks += usage.read_blocks
+            self.usage.write_blocks += usage.write_blocks
+
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(duration)
+        else:
+            index = rng.randrange(self.count + 1)
+            if index < RESERVOIR_SIZE:
+                self.samples[index] = duration
+
+        self.count += 1
+        self.total += duration
+        if duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def percentile(self, percent: float) -> float:
+        """
+        Get a percentile of the execution times (nearest rank).
+
+        Parameters
+        ----------
+        `percent` : float
+            Percentile between 0 and 100
+
+        Returns
+        -------
+        float
+            Execution time in seconds
+        """
+        samples = sorted(self.samples)
+        if len(samples) == 0:
+            return .0
+        rank = max(math.ceil(percent / 100 * len(samples)), 1)
+        return samples[rank - 1]
+
+    def to_dict(self) -> dict:
+        return {
+            'fullname': self.fullname, 'count': self.count, 'total': self.total,
+            'min': self.min if self.count > 0 else .0, 'p50': self.percentile(50),
+            'p95': self.percentile(95), 'max': self.max,
+            'statuses': {STATUS_NAMES.get(st, str(st)): nr for st, nr in self.statuses.items()},
+            'usage': self.usage.to_dict() if self.usage is not None else None,
+        }
+
+
+class StepRecords(object):
+    """
+    Store of the step executions with a retention policy.
+
+    Attributes
+    ----------
+    retention : str
+        Retention policy: 'full', 'aggregate' or 'last:N'
+    count : int
+        Number of recorded executions
+    resources : bool
+        True, if the resource usage of the executions is stored
+    """
+
+    retention: str = RETENTION_FULL
+    count: int = 0
+    resources: bool = False
+
+    def __init__(self, retention: str = RETENTION_FULL, resources: bool = False):
+        __, self.__limit = parse_retention(retention)
+        self.retention = retention
+        self.resources = resources
+        self.count = 0
+
+        self.__lock = threading.Lock()
+
+        # Interned step names
+        self.__names: List[str] = []
+        self.__name_ids: Dict[str, int] = {}
+
+        # Columns of the stored rows
+        self.__name_col = array('I')
+        self.__status_col = array('b')
+        self.__start_col = array('d')
+        self.__time_col = array('d')
+        self.__parent_col = array('q')
+
+        # Columns of the resource usage: CPU user and system time, max RSS, read and written blocks
+        self.__usage_cols = (array('d'), array('d'), array('Q'), array('Q'), array('Q')) if resources else ()
+
+        # Name ids of the running steps, needed by the aggregates
+        self.__running: Dict[int, int] = {}
+        self.__aggregates: Dict[int, StepAggregate] = {}
+        self.__rng = random.Random()
+
+    @property
+    def stored(self) -> int:
+        """Number of stored rows"""
+        return len(self.__name_col)
+
+    @property
+    def dropped(self) -> int:
+        """Number of executions, whose rows are not stored anymore"""
+        return self.count - len(self.__name_col)
+
+    def __slot(self, record: int) -> int:
+        """Get the row index of a record or -1, if the row is not stored."""
+        if record < self.dropped:
+            return -1
+        return record % self.__limit if self.__limit else record
+
+    def begin(self, fullname: str, start: float, parent: int = NO_PARENT) -> int:
+        """
+        Record the start of a step execution.
+
+        Parameters
+        ----------
+        `fullname` : str
+            Full name of the step
+        `start` : float
+            Start time of the execution
+        `parent` : int, optional
+            Record id of the calling step, by default `NO_PARENT`
+
+        Returns
+        -------
+        int
+            Record id of the execution
+        """
+        with self.__lock:
+            name_id = self.__name_ids.get(fullname)
+            if name_id is None:
+                name_id = self.__name_ids[fullname] = len(self.__names)
+                self.__names.append(fullname)
+
+            record = self.count
+            self.count += 1
+            self.__running[record] = name_id
+
+            if self.__limit is None or len(self.__name_col) < self.__limit:
+                self.__name_col.append(name_id)
+                self.__status_col.append(STATUS_UNKNOWN)
+                self.__start_col.append(start)
+                self.__time_col.append(.0)
+                self.__parent_col.append(parent)
+                for each_col in self.__usage_cols:
+                    each_col.append(0)
+            elif self.__limit > 0:
+                slot = record % self.__limit
+                self.__name_col[slot] = name_id
+                self.__status_col[slot] = STATUS_UNKNOWN
+                self.__start_col[slot] = start
+                self.__time_col[slot] = .0
+                self.__parent_col[slot] = parent
+                for each_col in self.__usage_cols:
+                    each_col[slot] = 0
+            return record
+
+    def end(self, record: int, status: int, duration: float, usage: ResourceUsage = None) -> None:
+        """
+        Record the result of a step execution.
+
+        Parameters
+        ----------
+        `record` : int
+            Record id returned by `begin()`
+        `status` : int
+            Status of the step
+        `duration` : float
+            Execution time in seconds
+        `usage` : ResourceUsage, optional
+            Resources used by the execution, by default None
+        """
+        with self.__lock:
+            name_id = self.__running.pop(record, None)
+            if name_id is None:
+                return # Already finished
+
+            slot = self.__slot(record)
+            if slot >= 0:
+                self.__status_col[slot] = status
+                self.__time_col[slot] = duration
+                if usage is not None and self.resources:
+                    for each_col, each_value in zip(self.__usage_cols, (
+                            usage.cpu_user, usage.cpu_sys, usage.max_rss, usage.read_blocks, usage.write_blocks)):
+                        each_col[slot] = each_value
+
+            aggregate = self.__aggregates.get(name_id)
+            if aggregate is None:
+                aggregate = self.__aggregates[name_id] = StepAggregate(self.__names[name_id])
+            aggregate.add(status, duration, self.__rng, usage)
+
+    def rows(self) -> Iterator[StepRow]:
+        """
+        Iterate over the stored executions in the order of their start.
+
+        Yields
+        -------
+        StepRow
+            Stored execution
+        """
+        with self.__lock:
+            stored = len(self.__name_col)
+            first = self.count - stored
+            slots = [(record, self.__slot(record)) for record in range(first, self.count)]
+            rows = [StepRow(record, self.__names[self.__name_col[slot]], self.__status_col[slot],
+                            self.__start_col[slot], self.__time_col[slot], self.__parent_col[slot],
+                            ResourceUsage(*(col[slot] for col in self.__usage_cols)) if self.resources else None)
+                    for record, slot in slots]
+        yield from rows
+
+    def aggregates(self) -> List[StepAggregate]:
+        """
+        Get the aggregates of the finished executions in the order of the first execution
+        of each step.
+
+        Returns
+        -------
+        List[StepAggregate]
+            Aggregated executions by full name
+        """
+        with self.__lock:
+            return [self.__aggregates[name_id] for name_id in sorted(self.__aggregates)]
+
+    def to_dict(self) -> dict:
+        """
+        Get the stored executions and the aggregates as JSON serializable data.
+
+        Returns
+        -------
+        dict
+            Report of the executions
+        """
+        rows = []
+        for each_row in self.rows():
+            row = each_row._asdict()
+            row['status'] = STATUS_NAMES.get(each_row.status, str(each_row.status))
+            row['usage'] = each_row.usage.to_dict() if each_row.usage is not None else None
+            rows.append(row)
+
+        return {
+            'retention': self.retention, 'count': self.count, 'dropped': self.dropped,
+            'rows': rows, 'aggregates': [each.to_dict() for each in self.aggregates()],
+        }
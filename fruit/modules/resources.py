@@ -0,0 +1,143 @@
+"""
+Resource accounting of the step executions.
+
+The resource monitor measures the CPU time, the peak resident set size and the block I/O
+of every step with `getrusage()`. The usage of the step is the usage of the thread executing
+it (or of the whole process, where per-thread accounting is not available) plus the usage
+of the child processes, that finished during the step (e.g. `fruit.shell` commands).
+
+The usage of nested steps is included in the usage of their callers. Child processes are
+accounted process wide, so with `fruit make -j N` steps running at the same time share the
+usage of their child processes. Async steps awaited at the same time on one thread (e.g. with
+`asyncio.gather()`) share the usage of the thread as well.
+
+The monitor requires the `resource` module, which is not available on Windows.
+"""
+
+import sys
+from typing import Dict
+
+from . import lifecycle
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+# Usage of the calling thread, if supported by the platform
+RUSAGE_STEP = getattr(resource, 'RUSAGE_THREAD', getattr(resource, 'RUSAGE_SELF', None))
+
+# Unit of ru_maxrss: bytes on macOS, kilobytes everywhere else
+MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+class ResourceUsage(object):
+    """
+    Resources used by a step execution.
+
+    Attributes
+    ----------
+    cpu_user : float
+        CPU time spent in user mode in seconds
+    cpu_sys : float
+        CPU time spent in system mode in seconds
+    max_rss : int
+        Peak resident set size in bytes of fruit or a child process finished during the step
+    read_blocks : int
+        Number of blocks read from the file systems
+    write_blocks : int
+        Number of blocks written to the file systems
+    """
+
+    __slots__ = ('cpu_user', 'cpu_sys', 'max_rss', 'read_blocks', 'write_blocks')
+
+    def __init__(self, cpu_user: float = .0, cpu_sys: float = .0, max_rss: int = 0, read_blocks: int = 0,
+                 write_blocks: int = 0):
+        self.cpu_user = cpu_user
+        self.cpu_sys = cpu_sys
+        self.max_rss = max_rss
+        self.read_blocks = read_blocks
+        self.write_blocks = write_blocks
+
+    @property
+    def cpu(self) -> float:
+        """Total CPU time in seconds"""
+        return self.cpu_user + self.cpu_sys
+
+    def to_dict(self) -> dict:
+        return {each: getattr(self, each) for each in self.__slots__}
+
+
+def is_supported() -> bool:
+    """Check, whether the resource accounting is supported by the platform."""
+    return resource is not None
+
+
+class ResourceMonitor(object):
+    """
+    Lifecycle listener measuring the resource usage of the steps. The usage is stored in the
+    `usage` attribute of the `Step` records.
+
+    Example::
+
+        with ResourceMonitor():
+            Garden().make_multiple("release")
+    """
+
+    def __init__(self):
+        if resource is None:
+            raise RuntimeError("The resource accounting is not supported on this platform!")
+
+        # Usage snapshots of the running steps by the id of the step. Async steps running on the
+        # same thread, e.g. with asyncio.gather(), do not finish in the order they started.
+        self.__snapshots: Dict[int, tuple] = {}
+
+    def start(self) -> None:
+        """Start measuring the steps."""
+        # Measure the steps after the garden started them and before it finishes them
+        lifecycle.subscribe(lifecycle.STEP_START, self.on_step_start, priority=-100)
+        lifecycle.subscribe(lifecycle.STEP_END, self.on_step_end, priority=100)
+        lifecycle.subscribe(lifecycle.STEP_ABORT, self.on_step_abort, priority=100)
+
+    def stop(self) -> None:
+        """Stop measuring the steps."""
+        lifecycle.unsubscribe(lifecycle.STEP_START, self.on_step_start)
+        lifecycle.unsubscribe(lifecycle.STEP_END, self.on_step_end)
+        lifecycle.unsubscribe(lifecycle.STEP_ABORT, self.on_step_abort)
+
+    def __enter__(self) -> 'ResourceMonitor':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @staticmethod
+    def __snapshot() -> tuple:
+        return resource.getrusage(RUSAGE_STEP), resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    def on_step_start(self, sender) -> None:
+        self.__snapshots[id(sender)] = self.__snapshot()
+
+    def on_step_end(self, sender) -> None:
+        started = self.__snapshots.pop(id(sender), None)
+        if started is None:
+            return # Started before the monitor
+
+        (own_0, child_0), (own_1, child_1) = started, self.__snapshot()
+
+        # The maximum RSS values are high-water marks, the children one only counts, if a
+        # child process with a new maximum finished during the step
+        max_rss = own_1.ru_maxrss
+        if child_1.ru_maxrss > child_0.ru_maxrss:
+            max_rss = max(max_rss, child_1.ru_maxrss)
+
+        sender.usage = ResourceUsage(
+            cpu_user=(own_1.ru_utime - own_0.ru_utime) + (child_1.ru_utime - child_0.ru_utime),
+            cpu_sys=(own_1.ru_stime - own_0.ru_stime) + (child_1.ru_stime - child_0.ru_stime),
+            max_rss=max_rss * MAXRSS_UNIT,
+            read_blocks=(own_1.ru_inblock - own_0.ru_inblock) + (child_1.ru_inblock - child_0.ru_inblock),
+            write_blocks=(own_1.ru_oublock - own_0.ru_oublock) + (child_1.ru_oublock - child_0.ru_oublock))
+
+    def on_step_abort(self, sender, exception) -> None:
+        self.on_step_end(sender)
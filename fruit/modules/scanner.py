@@ -0,0 +1,390 @@
+"""
+Static scanner of fruit configurations.
+
+The scanner finds the targets, steps and providers of a fruit configuration by parsing its
+source code with the `ast` module instead of executing it. Helper modules, that are imported
+from the directory of the configuration (or from directories added with literal
+`sys.path.append()` calls) are scanned as well.
+
+Configurations, that register their objects dynamically (e.g. decorators with computed
+arguments, decorators inside of functions and loops, star imports of fruit or imports of
+fruit modules outside of the api) are marked as dynamic. Such configurations have to be
+executed to obtain their objects.
+"""
+
+import os
+import ast
+import json
+import hashlib
+from typing import Dict, List
+
+import fruit
+from fruit.globals import INDEX_CACHE_DIR
+
+# Keyword names of the positional arguments of the decorators
+DECORATOR_ARGS = {
+    'target': ('name', 'help', 'depends', 'tags'),
+    'step': ('name', 'help', 'inputs', 'outputs', 'cache'),
+    'provider': ('name', 'help', 'cache', 'ttl', 'depends_on'),
+}
+
+# Fruit modules, whose attributes are the decorators
+DECORATOR_MODULES = ('fruit', 'fruit.api.decorators')
+
+# Fruit modules of the public api. Other fruit modules (e.g. the `Garden`) may register
+# objects in a way the scanner cannot follow.
+API_MODULES = ('fruit', 'fruit.api', 'fruit.api.api', 'fruit.api.decorators', 'fruit.api.shell',
+               'fruit.api.parallel')
+
+# Calls, that may import modules or register objects in a way the scanner cannot follow
+DYNAMIC_CALLS = ('exec', 'eval', '__import__', 'import_module')
+
+# Version of the index format stored in the cache
+INDEX_VERSION = 3
+
+
+class IndexEntry(object):
+    """
+    Statically found target, step or provider.
+
+    Attributes
+    ----------
+    kind : str
+        Decorator type: 'target', 'step' or 'provider'
+    name : str
+        Name of the object
+    help : str
+        Help text of the object
+    origin : str
+        Path of the file, that defines the object
+    options : Dict
+        Literal arguments of the decorator
+    """
+
+    kind: str = ""
+    name: str = ""
+    help: str = ""
+    origin: str = ""
+    options: Dict = None
+
+    def __init__(self, kind: str, name: str, help: str, origin: str, options: Dict = None):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.origin = origin
+        self.options = options if options is not None else {}
+
+    @property
+    def tags(self) -> List[str]:
+        """Tags of a target"""
+        return list(self.options.get('tags') or [])
+
+    def to_dict(self) -> Dict:
+        return {'kind': self.kind, 'name': self.name, 'help': self.help,
+                'origin': self.origin, 'options': self.options}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'IndexEntry':
+        return cls(data['kind'], data['name'], data['help'], data['origin'], data['options'])
+
+
+class ConfigIndex(object):
+    """
+    Index of a fruit configuration and the helper modules it imports.
+
+    Attributes
+    ----------
+    entries : List[IndexEntry]
+        Found targets, steps and providers in definition order
+    dynamic : bool
+        True, if the configuration has to be executed to find all of its objects
+    files : Dict[str, list]
+        `[mtime_ns, size]` of every scanned file
+    """
+
+    entries: List[IndexEntry] = None
+    dynamic: bool = False
+    files: Dict[str, list] = None
+
+    def __init__(self):
+        self.entries = []
+        self.files = {}
+
+    @property
+    def targets(self) -> List[IndexEntry]:
+        return [e for e in self.entries if e.kind == 'target']
+
+    @property
+    def steps(self) -> List[IndexEntry]:
+        return [e for e in self.entries if e.kind == 'step']
+
+    @property
+    def providers(self) -> List[IndexEntry]:
+        return [e for e in self.entries if e.kind == 'provider']
+
+    def is_current(self) -> bool:
+        """Check, whether none of the scanned files changed since the scan."""
+        for each_path, (mtime, size) in self.files.items():
+            try:
+                stat = os.stat(each_path)
+            except OSError:
+                return False
+            if stat.st_mtime_ns != mtime or stat.st_size != size:
+                return False
+        return True
+
+    def to_dict(self) -> Dict:
+        return {'version': INDEX_VERSION, 'dynamic': self.dynamic, 'files': self.files,
+                'entries': [e.to_dict() for e in self.entries]}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ConfigIndex':
+        if data.get('version') != INDEX_VERSION:
+            raise ValueError("Unsupported index version")
+        index = cls()
+        index.dynamic = data['dynamic']
+        index.files = data['files']
+        index.entries = [IndexEntry.from_dict(e) for e in data['entries']]
+        return index
+
+
+class DynamicConfig(Exception):
+    """Signal to indicate, that a configuration cannot be scanned statically."""
+    pass
+
+
+class _ModuleScanner(object):
+    """Scanner of a single python module."""
+
+    def __init__(self, path: str, index: ConfigIndex, search_path: List[str]):
+        self.path = path
+        self.index = index
+        self.search_path = search_path
+
+        # Local names of the fruit modules with their module names and of the imported decorators
+        self.modules = {}
+        self.decorators = {}
+
+        # Number of references to the decorators and the ones used as decorators
+        self.references = 0
+        self.used = 0
+
+    def scan(self) -> None:
+        with open(self.path, 'rb') as fp:
+            tree = ast.parse(fp.read(), filename=self.path)
+
+        stat = os.stat(self.path)
+        self.index.files[self.path] = [stat.st_mtime_ns, stat.st_size]
+
+        # Path manipulations have to be known before the imports and the imports before
+        # the decorators
+        for each_node in ast.walk(tree):
+            if isinstance(each_node, ast.Call):
+                self.visit_call(each_node)
+
+        for each_node in ast.walk(tree):
+            if isinstance(each_node, (ast.Import, ast.ImportFrom)):
+                self.visit_import(each_node)
+
+        for each_node in ast.walk(tree):
+            if isinstance(each_node, (ast.Attribute, ast.Name)) and self.decorator_kind(each_node):
+                self.references += 1
+
+        for each_node in ast.walk(tree):
+            if isinstance(each_node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.visit_function(each_node, top_level=each_node in tree.body)
+
+        if self.references != self.used:
+            raise DynamicConfig("The decorators are used outside of function definitions")
+
+    def decorator_kind(self, node: ast.AST) -> str:
+        """Get the decorator type referenced by a node, or None."""
+        if isinstance(node, ast.Attribute) and node.attr in DECORATOR_ARGS:
+            # Attribute chains of an imported fruit module, e.g. `fruit.api.decorators.target`
+            attributes = []
+            value = node.value
+            while isinstance(value, ast.Attribute):
+                attributes.insert(0, value.attr)
+                value = value.value
+            if isinstance(value, ast.Name) and value.id in self.modules:
+                if ".".join([self.modules[value.id]] + attributes) in DECORATOR_MODULES:
+                    return node.attr
+        elif isinstance(node, ast.Name):
+            return self.decorators.get(node.id)
+        return None
+
+    def visit_import(self, node: ast.AST) -> None:
+        if isinstance(node, ast.Import):
+            for each_alias in node.names:
+                if each_alias.name.split('.')[0] == 'fruit':
+                    self.visit_fruit_import(each_alias.name, None, each_alias.asname)
+                else:
+                    self.scan_module(each_alias.name)
+        elif node.module is not None and node.level == 0:
+            if node.module.split('.')[0] == 'fruit':
+                for each_alias in node.names:
+                    self.visit_fruit_import(node.module, each_alias.name, each_alias.asname)
+            else:
+                self.scan_module(node.module)
+                # The imported names may be submodules of a package
+                for each_alias in node.names:
+                    self.scan_module(node.module + "." + each_alias.name)
+
+    def visit_fruit_import(self, module: str, name: str, asname: str) -> None:
+        """Track the fruit modules and the decorators bound by an import of fruit."""
+        if name == '*':
+            raise DynamicConfig(f"Star import of '{module}'")
+        fullname = module if name is None else module + "." + name
+
+        if name is None:
+            # import fruit.api.decorators [as ...]
+            if module not in API_MODULES:
+                raise DynamicConfig(f"Import of '{module}'")
+            self.modules[asname or 'fruit'] = module if asname else 'fruit'
+        elif module == 'fruit.api' or (module == 'fruit' and name not in fruit.__all__):
+            # from fruit.api import decorators [as ...]
+            if fullname not in API_MODULES:
+                raise DynamicConfig(f"Import of '{fullname}'")
+            self.modules[asname or name] = fullname
+        else:
+            # from fruit import target [as ...]
+            if module not in API_MODULES:
+                raise DynamicConfig(f"Import of '{fullname}'")
+            if name in DECORATOR_ARGS and module in DECORATOR_MODULES:
+                self.decorators[asname or name] = name
+
+    def visit_call(self, node: ast.Call) -> None:
+        func = node.func
+        name = func.attr if isinstance(func, ast.Attribute) else getattr(func, 'id', None)
+
+        if name in DYNAMIC_CALLS:
+            raise DynamicConfig(f"Call of '{name}()'")
+
+        # Literal modifications of the python path
+        if isinstance(func, ast.Attribute) and name in ('append', 'insert') and \
+                isinstance(func.value, ast.Attribute) and func.value.attr == 'path' and \
+                isinstance(func.value.value, ast.Name) and func.value.value.id == 'sys':
+            try:
+                directory = ast.literal_eval(node.args[-1])
+            except (ValueError, IndexError, SyntaxError):
+                raise DynamicConfig("Non-literal modification of sys.path")
+            self.search_path.append(os.path.abspath(directory))
+
+    def visit_function(self, node: ast.AST, top_level: bool) -> None:
+        for each_decorator in node.decorator_list:
+            if not isinstance(each_decorator, ast.Call):
+                continue
+            kind = self.decorator_kind(each_decorator.func)
+            if kind is None:
+                continue
+
+            self.used += 1
+            if not top_level:
+                raise DynamicConfig(f"The {kind} '{node.name}' is not defined on module level")
+
+            options = {}
+            try:
+                if len(each_decorator.args) > len(DECORATOR_ARGS[kind]):
+                    raise ValueError("Too many arguments")
+                for each_name, each_arg in zip(DECORATOR_ARGS[kind], each_decorator.args):
+                    options[each_name] = ast.literal_eval(each_arg)
+                for each_keyword in each_decorator.keywords:
+                    if each_keyword.arg is None:
+                        raise ValueError("Keyword argument unpacking")
+                    options[each_keyword.arg] = ast.literal_eval(each_keyword.value)
+            except (ValueError, SyntaxError):
+                raise DynamicConfig(f"The arguments of the {kind} '{node.name}' are not literals")
+
+            name = options.get('name')
+            if name is None:
+                name = node.name
+            help = options.get('help')
+            if help is None:
+                # Providers use their docstring as default help text
+                help = (ast.get_docstring(node) or "") if kind == 'provider' else ""
+
+            self.index.entries.append(IndexEntry(kind, name, help, self.path, options))
+
+    def scan_module(self, module: str) -> None:
+        """Scan an imported module, if it is found in the search path of the configuration."""
+        parts = module.split('.')
+        for each_dir in self.search_path:
+            base = os.path.join(each_dir, *parts)
+            for each_path in (base + ".py", os.path.join(base, "__init__.py")):
+                if os.path.isfile(each_path):
+                    each_path = os.path.abspath(each_path)
+                    if each_path not in self.index.files:
+                        _ModuleScanner(each_path, self.index, self.search_path).scan()
+                    return
+        # Modules outside of the configuration directories (standard library, installed
+        # packages) are expected not to define fruit objects
+
+
+def scan_config(path: str) -> ConfigIndex:
+    """
+    Scan a fruit configuration file without executing it.
+
+    Parameters
+    ----------
+    `path` : str
+        Path of the fruit configuration file
+
+    Returns
+    -------
+    ConfigIndex
+        Index of the found objects. When `ConfigIndex.dynamic` is set, the configuration
+        has to be executed to find its objects.
+    """
+    path = os.path.abspath(path)
+    index = ConfigIndex()
+    search_path = [os.path.dirname(path)]
+
+    try:
+        _ModuleScanner(path, index, search_path).scan()
+    except (DynamicConfig, SyntaxError, RecursionError):
+        index.dynamic = True
+        index.entries = []
+    return index
+
+
+def index_cache_path(path: str) -> str:
+    """Get the path of the cached index of a configuration file."""
+    key = hashlib.sha1((os.path.abspath(path) + "\0" + os.getcwd()).encode()).hexdigest()
+    return os.path.join(INDEX_CACHE_DIR, key + ".json")
+
+
+def load_index(path: str) -> ConfigIndex:
+    """
+    Get the index of a fruit configuration from the cache or scan it, when it changed.
+
+    Parameters
+    ----------
+    `path` : str
+        Path of the fruit configuration file
+
+    Returns
+    -------
+    ConfigIndex
+        Index of the configuration
+    """
+    cache_file = index_cache_path(path)
+    try:
+        with open(cache_file, 'r') as fp:
+            index = ConfigIndex.from_dict(json.load(fp))
+        if index.is_current():
+            return index
+    except (OSError, ValueError, KeyError, TypeError):
+        pass # Missing or outdated cache file
+
+    index = scan_config(path)
+
+    try:
+        os.makedirs(INDEX_CACHE_DIR, exist_ok=True)
+        tmp_path = "{}.{}.tmp".format(cache_file, os.getpid())
+        with open(tmp_path, 'w') as fp:
+            json.dump(index.to_dict(), fp)
+        os.replace(tmp_path, cache_file)
+    except OSError:
+        pass # The cache is optional
+
+    return index
@@ -0,0 +1,143 @@
+"""
+Module for scheduling fruit targets based on their declared dependencies.
+"""
+from .target import Target
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List
+
+
+class Scheduler(object):
+    """
+    Dependency graph of the targets requested by `fruit make`.
+
+    The graph is built from the `depends` lists of the registered targets. Every target
+    is made exactly once, after all of its dependencies were made successfully.
+
+    Attributes
+    ----------
+    order : List[Target]
+        Targets in a valid (topological) execution order
+    failed : Target
+        Target, that raised an exception during `Scheduler.run()`, by default None
+    """
+
+    failed: Target = None
+    __order: List[Target] = None
+    __dependencies: Dict[str, List[str]] = None
+
+    def __init__(self, lookup: Callable[[str], Target], *names: str):
+        """
+        Create the dependency graph of the given target names.
+
+        Parameters
+        ----------
+        `lookup` : Callable[[str], Target]
+            Function to find a target by its name
+        `*names` : str
+            Names of the targets to make
+
+        Raises
+        ------
+        ValueError
+            A target has a circular dependency
+        """
+        self.__order = []
+        self.__dependencies = {}
+
+        # Name of the targets, that are still being visited by the depth-first search
+        visiting = []
+
+        def visit(name: str) -> None:
+            if name in self.__dependencies:
+                return
+            if name in visiting:
+                cycle = visiting[visiting.index(name):] + [name]
+                raise ValueError("Circular target dependency: {}".format(" -> ".join(cycle)))
+
+            trg = lookup(name)
+            visiting.append(name)
+            for each_dep in trg.depends:
+                visit(each_dep)
+            visiting.pop()
+
+            self.__dependencies[name] = list(trg.depends)
+            self.__order.append(trg)
+
+        for each_name in names:
+            visit(each_name)
+
+    @property
+    def order(self) -> List[Target]:
+        """Targets in execution order, dependencies first."""
+        return list(self.__order)
+
+    def run(self, func: Callable[[Target], None], jobs: int = 1) -> None:
+        """
+        Execute `func` for every target of the graph.
+
+        With `jobs` greater than one, independent targets are executed at the same time on
+        a pool of worker threads. When a target raises an exception, no further targets will
+        be started, the running ones are waited for and the first exception is re-raised.
+
+        Parameters
+        ----------
+        `func` : Callable[[Target], None]
+            Function to call with each target
+        `jobs` : int, optional
+            Maximum number of targets to execute at the same time, by default 1
+        """
+        if jobs < 1:
+            raise ValueError("The number of jobs must be at least 1!")
+
+        if jobs == 1:
+            for each_target in self.__order:
+                self.failed = each_target
+                func(each_target)
+            self.failed = None
+            return
+
+        # Number of unfinished dependencies of each target
+        pending = {trg.name: len(self.__dependencies[trg.name]) for trg in self.__order}
+        ready = [trg for trg in self.__order if pending[trg.name] == 0]
+
+        # Targets waiting for each target
+        dependents = {trg.name: [] for trg in self.__order}
+        for each_target in self.__order:
+            for each_dep in self.__dependencies[each_target.name]:
+                dependents[each_dep].append(each_target)
+
+        running = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix='fruit-make') as pool:
+            while ready or running:
+                # Fill up the worker pool, as long as nothing went wrong
+                while ready and len(running) < jobs and error is None:
+                    trg = ready.pop(0)
+                    running[pool.submit(func, trg)] = trg
+
+                if not running:
+                    break
+
+                done, __ = wait(running, return_when=FIRST_COMPLETED)
+                for each_future in done:
+                    trg = running.pop(each_future)
+                    exc = each_future.exception()
+                    if exc is not None:
+                        if error is None:
+                            error = exc
+                            self.failed = trg
+                        continue
+
+                    # Release the targets, that were waiting for this one
+                    for each_target in dependents[trg.name]:
+                        pending[each_target.name] -= 1
+                        if pending[each_target.name] == 0:
+                            ready.append(each_target)
+
+                if error is not None:
+                    ready.clear()
+
+        if error is not None:
+            raise error
@@ -2,17 +2,29 @@
 Module for implementing the inner steps of a target
 """
 import fruit.modules.console as console
-from fruit.globals import FMT_STEPHEADER, FMT_SKIPMESSAGE, FMT_FAILMESSAGE
+import os
+import sys
+import copy
 import time
-from typing import Callable, Any
-from .event import Event
+import inspect
+import contextvars
+from typing import Callable, Any, Coroutine, List, Union
+from . import lifecycle
+from .fingerprint import StateFile, expand, fingerprint_files, code_digest, call_digest, combine
+from .cas import ArtifactCache
+from .fruitloader import state_file
 
 
 STATUS_OK = 0
 STATUS_ERR = 1
+STATUS_CACHED = 2
 STATUS_SKIPPED = -1
 STATUS_UNKNOWN = -2
 
+# Printable names of the statuses
+STATUS_NAMES = {STATUS_OK: "OK", STATUS_ERR: "Failed", STATUS_CACHED: "Cached", STATUS_SKIPPED: "Skipped",
+                STATUS_UNKNOWN: "Unknown"}
+
 class SkipStepSignal(Exception):
     """Signal to indicate, whenever a step shall be skipped"""
     pass
@@ -27,62 +39,130 @@ class FailStepSignal(Exception):
     may continue."""
     pass
 
-class Step(object):
+# Directories of the fruit modules calling the step and target functions on behalf of the user
+_INTERNAL_DIRS = tuple(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), each, "")
+                       for each in ("modules", "api"))
+
+
+# Frames of expressions, that are evaluated on behalf of the function containing them
+_COMPREHENSIONS = ('<genexpr>', '<listcomp>', '<setcomp>', '<dictcomp>')
+
+
+def _called_by_coroutine() -> bool:
+    """Check, whether the user code calling fruit is a coroutine function, that may await the result."""
+    frame = sys._getframe(1)
+    while frame is not None and (frame.f_code.co_filename.startswith(_INTERNAL_DIRS)
+                                 or frame.f_code.co_name in _COMPREHENSIONS):
+        frame = frame.f_back
+    return frame is not None and bool(frame.f_code.co_flags & (inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR))
+
+
+def run_sync(coroutine: Coroutine) -> Any:
     """
-    Step object for handling and registering make steps.
+    Execute a coroutine to completion from synchronous code.
+
+    Outside of an event loop the coroutine is executed by a new one. Inside of a running event
+    loop (e.g. a plain step called by an async target) the coroutine is executed by a new
+    event loop in a helper thread with a copy of the current context, while the caller waits.
+
+    Parameters
+    ----------
+    `coroutine` : Coroutine
+        Coroutine to execute
+
+    Returns
+    -------
+    Any
+        Return value of the coroutine
+    """
+    import asyncio # Only needed by async steps, targets and shell commands
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    import concurrent.futures as futures
+    context = contextvars.copy_context()
+    with futures.ThreadPoolExecutor(1, thread_name_prefix='fruit-loop') as executor:
+        return executor.submit(context.run, asyncio.run, coroutine).result()
+
+
+def run_coroutine(coroutine: Coroutine) -> Any:
+    """
+    Execute the coroutine of an async step or target.
+
+    When the step or target is called by a coroutine function inside of a running event loop
+    (e.g. an async target), the coroutine is returned to be awaited by the caller. Otherwise it
+    is executed with `run_sync()`, so that async steps and targets can be called like plain
+    functions, also by plain steps inside of async targets.
+
+    Parameters
+    ----------
+    `coroutine` : Coroutine
+        Coroutine of the step or target execution
+
+    Returns
+    -------
+    Any
+        The coroutine, when it is awaited by the caller, otherwise its return value
+    """
+    import asyncio # Only needed by async steps and targets
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return run_sync(coroutine)
+    return coroutine if _called_by_coroutine() else run_sync(coroutine)
+
+class StepDescriptor(object):
+    """
+    Definition of a step, that is created once when the step function is decorated.
+
+    Calling the descriptor executes the step function and records the execution in a new
+    `Step` object. The lifecycle events of the execution are published on the lifecycle bus
+    (`fruit.modules.lifecycle`) with the `Step` record as `sender`.
 
     Attributes
     ----------
     name : str
         Step name
-    fullname : str
-        Full name of the step indicating its execution place
     help : str
         Help text (description) of the step
-    status : int
-        Status code of the current step. Possible values: `STATUS_UNKNOWN`, `STATUS_SKIPPED`,
-        `STATUS_OK`, `STATUS_ERR`.
-    time : float
-        Measured execution time in seconds
-
-    Events
-    ------
-    OnActivate : Event(sender=self)
-        Called when the step execution begins
-    OnDeactivate: Event(sender=self)
-        Called whe the step execution finished
-    OnSkipped : Event(sender=self, exception=SkipStepSignal())
-        Called when `fruit.skip()` is called inside of the step
-    OnFailed : Event(sender=self, exception=FailStepSignal())
-        Called when `fruit.fail()` is called inside of the step
-    OnAborted : Event(sender=self, exception=AbortStepSignal())
-        Called when `fruit.abort()` is called inside of the step
+    inputs : List[str]
+        Glob patterns of the files, that the step reads
+    outputs : List[str]
+        Glob patterns of the files, that the step creates
+    cache : bool
+        Store the outputs in the artifact cache and restore them from it
+    incremental : bool
+        True, if the step declares inputs or outputs
+    asynchronous : bool
+        True, if the step function is a coroutine function (`async def`)
     """
 
     name: str = ""
-    fullname: str = ""
     help: str = ""
-    status: int = STATUS_UNKNOWN
-    time: float = .0
+    inputs: List[str] = None
+    outputs: List[str] = None
+    cache: bool = True
+    incremental: bool = False
+    asynchronous: bool = False
+    func: Callable[[any], any] = None
 
-    OnActivate: Event = None
-    OnDeactivate: Event = None
-    OnSkipped: Event = None
-    OnFailed: Event = None
-    OnAborted: Event = None
-    __func: Callable[[any], any] = None
+    __code: str = None
+
+    def __init__(self, func: Callable[[any], any], name:str, help:str="", inputs:List[str]=None, outputs:List[str]=None, cache:bool=True):
 
-    def __init__(self, func: Callable[[any], any], name:str, help:str=""):
-        
         if callable(func):
-            self.__func = func
+            self.func = func
+            self.asynchronous = inspect.iscoroutinefunction(func)
         else:
             raise TypeError("The given function is not callable!")
         
         if type(name) is str:
             if len(name) > 0:
                 self.name = name
-                self.fullname = name
             else:
                 raise ValueError("The given name cannot be empty!")
         else:
@@ -93,46 +173,386 @@ class Step(object):
         else:
             raise TypeError("The step help must be a string!")
 
-        # Create the class events (with an example call)
-        self.OnActivate   = Event(sender=self)
-        self.OnDeactivate = Event(sender=self)
+        self.inputs = self.__patterns(inputs, "inputs")
+        self.outputs = self.__patterns(outputs, "outputs")
+        self.incremental = len(self.inputs) > 0 or len(self.outputs) > 0
+
+        if type(cache) is bool:
+            self.cache = cache
+        else:
+            raise TypeError("The step cache option must be a boolean!")
+
+    @staticmethod
+    def __patterns(patterns: List[str], kind: str) -> List[str]:
+        """Validate a list of glob patterns."""
+        if patterns is None:
+            return []
+        elif isinstance(patterns, (list, tuple)) and all(type(pat) is str for pat in patterns):
+            return list(patterns)
+        else:
+            raise TypeError(f"The step {kind} must be a list of glob patterns!")
+
+    @property
+    def code(self) -> str:
+        """Digest of the step function. It is calculated on first use."""
+        if self.__code is None:
+            self.__code = code_digest(self.func)
+        return self.__code
+
+    def replace(self, func: Callable[[any], any]) -> 'StepDescriptor':
+        """
+        Copy the definition of the step for another function executing it, e.g. in a worker
+        process. The code digest of the original step function is kept.
 
-        # Create event handlers for the exception based status changes
-        self.OnSkipped    = Event(sender=self, exception=None)
-        self.OnFailed     = Event(sender=self, exception=None)
-        self.OnAborted    = Event(sender=self, exception=None)
+        Parameters
+        ----------
+        `func` : Callable[[any], any]
+            Function executing the step
+
+        Returns
+        -------
+        StepDescriptor
+            Step definition calling the function
+        """
+        if self.incremental:
+            self.code # Digest of the original function
+        clone = copy.copy(self)
+        clone.func = func
+        clone.asynchronous = inspect.iscoroutinefunction(func)
+        return clone
 
     def __call__(self, *args, **kwargs) -> Any:
         """
-        Function encapsulation of the step call with added event triggers.
-        
+        Execute the step function as a new step.
+
         Returns
         -------
         Any
-            Original return value of the function
+            Original return value of the function. Steps skipped as up to date return None.
+        """
+        return Step(self)(*args, **kwargs)
+
+
+class Step(object):
+    """
+    Record of a single step execution.
+
+    The definition of the step (name, help, inputs, outputs and cache) is shared with the
+    `StepDescriptor` of the step function.
+
+    Attributes
+    ----------
+    descriptor : StepDescriptor
+        Definition of the executed step
+    name : str
+        Step name
+    fullname : str
+        Full name of the step indicating its execution place
+    label : str
+        Suffix distinguishing the calls of a step in the console messages, e.g. `[3]` for the
+        calls of `fruit.map()`. It is not part of the full name, the calls are recorded under
+        the name of the step.
+    help : str
+        Help text (description) of the step
+    inputs : List[str]
+        Glob patterns of the files, that the step reads
+    outputs : List[str]
+        Glob patterns of the files, that the step creates
+    cache : bool
+        Store the outputs in the artifact cache and restore them from it
+    restored : bool
+        True, if the outputs were restored from the artifact cache
+    status : int
+        Status code of the current step. Possible values: `STATUS_UNKNOWN`, `STATUS_SKIPPED`,
+        `STATUS_OK`, `STATUS_ERR`, `STATUS_CACHED`.
+    time : float
+        Measured execution time in seconds
+    record : int
+        Id of the execution in the step records of the garden
+    usage : ResourceUsage
+        Resources used by the execution, when they are measured by a `ResourceMonitor`
+
+    Events
+    ------
+    The step publishes the following topics of the lifecycle bus:
+
+    STEP_START(sender)
+        The step execution begins
+    STEP_END(sender)
+        The step execution finished, also when the step function raised an exception
+    STEP_SKIP(sender, exception)
+        `fruit.skip()` is called inside of the step
+    STEP_FAIL(sender, exception)
+        `fruit.fail()` is called inside of the step
+    STEP_ABORT(sender, exception)
+        `fruit.abort()` is called inside of the step
+    STEP_CACHED(sender)
+        The step is skipped, because its outputs are up to date
+
+    Incremental steps
+    -----------------
+    Steps with declared `inputs` or `outputs` are only executed, when the content of their
+    input files, their output files, their code or their call arguments changed since their
+    last successful execution. The fingerprints are stored in `.fruit/state.json` of the
+    current directory.
+
+    Steps with both inputs and outputs store their outputs in the local artifact cache. When
+    the step is executed with inputs, that were already built before, the outputs are restored
+    from the cache instead of executing the step again.
+    """
+
+    # Steps may be executed thousands of times per target, keep the records small
+    __slots__ = ('descriptor', 'fullname', 'label', 'restored', 'status', 'time', 'record', 'usage', '__key', '__fingerprint')
+
+    def __init__(self, func: Union[StepDescriptor, Callable[[any], any]], name:str=None, help:str="",
+                 inputs:List[str]=None, outputs:List[str]=None, cache:bool=True, label:str=""):
+        """
+        Create a new step record.
+
+        Parameters
+        ----------
+        `func` : Union[StepDescriptor, Callable[[any], any]]
+            Descriptor of the step or step function. For functions a new descriptor is
+            created with the other parameters.
+        `label` : str, optional
+            Suffix distinguishing the call in the console messages, by default empty
         """
-        self.OnActivate(sender=self)
-        tic = time.time()
-        retval = None
+        if not isinstance(func, StepDescriptor):
+            func = StepDescriptor(func, name=name, help=help, inputs=inputs, outputs=outputs, cache=cache)
+
+        self.descriptor = func
+        self.fullname = func.name
+        self.label = label
+        self.restored = False
+        self.status = STATUS_UNKNOWN
+        self.time = .0
+        self.record = -1
+        self.usage = None
+        self.__key = None
+        self.__fingerprint = None
+
+    @property
+    def name(self) -> str:
+        return self.descriptor.name
+
+    @property
+    def help(self) -> str:
+        return self.descriptor.help
+
+    @property
+    def inputs(self) -> List[str]:
+        return self.descriptor.inputs
+
+    @property
+    def outputs(self) -> List[str]:
+        return self.descriptor.outputs
+
+    @property
+    def cache(self) -> bool:
+        return self.descriptor.cache
+
+    @property
+    def incremental(self) -> bool:
+        """True, if the step declares inputs or outputs."""
+        return self.descriptor.incremental
+
+    def is_uptodate(self, *args, **kwargs) -> bool:
+        """
+        Check, whether the last successful execution of the step with the same arguments
+        is still valid.
+
+        Returns
+        -------
+        bool
+            True, if the inputs, the outputs and the code of the step are unchanged
+        """
+        state = StateFile.open(state_file())
+        self.__key = self.name
+        if len(args) > 0 or len(kwargs) > 0:
+            self.__key += "#" + call_digest(args, kwargs)[:16]
+
+        stored = state.get(self.__key)
+        if not isinstance(stored, dict):
+            stored = {'code': None, 'inputs': {}, 'outputs': {}}
+
+        self.__fingerprint = {
+            'code': self.descriptor.code,
+            'inputs': fingerprint_files(expand(self.inputs), known=stored['inputs']),
+        }
+
+        if stored['code'] != self.__fingerprint['code']:
+            return False
+        if self.__digests(stored['inputs']) != self.__digests(self.__fingerprint['inputs']):
+            return False
+
+        outputs = expand(self.outputs)
+        if len(self.outputs) > 0 and len(outputs) == 0:
+            return False # The outputs were removed
+        if set(outputs) != set(stored['outputs']):
+            return False
+
+        current = fingerprint_files(outputs, known=stored['outputs'])
+        return self.__digests(stored['outputs']) == self.__digests(current)
+
+    @staticmethod
+    def __digests(fingerprints: dict) -> dict:
+        """Get the content digests of file fingerprints."""
+        return {path: fpr[2] for path, fpr in fingerprints.items()}
+
+    def __store_fingerprint(self) -> None:
+        """Store the fingerprint of a successful execution."""
+        self.__fingerprint['outputs'] = fingerprint_files(expand(self.outputs))
+        StateFile.open(state_file()).set(self.__key, self.__fingerprint)
+
+    @property
+    def __cacheable(self) -> bool:
+        """True, if the outputs of the step can be stored in the artifact cache."""
+        return self.cache and len(self.inputs) > 0 and len(self.outputs) > 0
+
+    def __cache_key(self) -> str:
+        """Key of the current execution in the artifact cache."""
+        return combine(
+            self.__key,
+            self.__fingerprint['code'],
+            self.__digests(self.__fingerprint['inputs']),
+            self.outputs)
+
+    def __restore_outputs(self) -> bool:
+        """
+        Restore the outputs of the step from the artifact cache.
+
+        Returns
+        -------
+        bool
+            True, if the outputs were restored
+        """
+        if not self.__cacheable:
+            return False
+
+        if ArtifactCache.default().restore(self.__cache_key()) is None:
+            return False
+
+        self.restored = True
+        self.__store_fingerprint()
+        return True
+
+    def __store_outputs(self) -> None:
+        """Store the outputs of a successful execution in the artifact cache."""
+        if not self.__cacheable:
+            return
+
         try:
-            retval = self.__func(*args, **kwargs)
-            self.status = STATUS_OK
-            self.time = time.time() - tic
-            self.OnDeactivate(sender=self)
-            return retval
-        except SkipStepSignal as serr:
+            ArtifactCache.default().store(self.__cache_key(), self.__fingerprint['outputs'])
+        except OSError as exc:
+            # The cache is an optimization only, it shall never break the make
+            console.warning(f"The outputs of step '{self.name}' cannot be cached! Reason: {str(exc)}")
+
+    def __begin(self, args: tuple, kwargs: dict) -> float:
+        """
+        Publish the start of the execution.
+
+        Returns
+        -------
+        float
+            Start time of the execution, or None if the step is finished as up to date
+        """
+        lifecycle.publish(lifecycle.STEP_START, sender=self)
+        # The step function writes directly to stdout, after the queued header of the step
+        console.flush()
+        tic = time.perf_counter()
+
+        if self.descriptor.incremental and (self.is_uptodate(*args, **kwargs) or self.__restore_outputs()):
+            self.status = STATUS_CACHED
+            lifecycle.publish(lifecycle.STEP_CACHED, sender=self)
+            self.time = time.perf_counter() - tic
+            lifecycle.publish(lifecycle.STEP_END, sender=self)
+            return None
+        return tic
+
+    def __finish(self, tic: float) -> None:
+        """Publish the end of a successful execution."""
+        self.status = STATUS_OK
+        if self.descriptor.incremental:
+            self.__store_fingerprint()
+            self.__store_outputs()
+        self.time = time.perf_counter() - tic
+        lifecycle.publish(lifecycle.STEP_END, sender=self)
+
+    def __handle(self, exc: BaseException, tic: float) -> bool:
+        """
+        Publish the end of an execution, that raised an exception.
+
+        Returns
+        -------
+        bool
+            True, if the exception is handled by the step (skipped or failed step)
+        """
+        publish = lifecycle.publish
+        if isinstance(exc, SkipStepSignal):
             self.status = STATUS_SKIPPED
-            self.OnSkipped(sender=self, exception=serr)
-            self.time = time.time() - tic
-            self.OnDeactivate(sender=self)
-        except FailStepSignal as ferr:
+            publish(lifecycle.STEP_SKIP, sender=self, exception=exc)
+            self.time = time.perf_counter() - tic
+            publish(lifecycle.STEP_END, sender=self)
+            return True
+        elif isinstance(exc, FailStepSignal):
             self.status = STATUS_ERR
-            self.OnFailed(sender=self, exception=ferr)
-            self.time = time.time() - tic
-            self.OnDeactivate(sender=self)
-        except AbortStepSignal:
+            publish(lifecycle.STEP_FAIL, sender=self, exception=exc)
+            self.time = time.perf_counter() - tic
+            publish(lifecycle.STEP_END, sender=self)
+            return True
+        elif isinstance(exc, AbortStepSignal):
             self.status = STATUS_ERR
-            self.time = time.time() - tic
-            raise
+            self.time = time.perf_counter() - tic
+            publish(lifecycle.STEP_ABORT, sender=self, exception=exc)
+            return False
+        else:
+            # The step is finished as failed, e.g. the caller may catch the exception
+            self.status = STATUS_ERR
+            self.time = time.perf_counter() - tic
+            publish(lifecycle.STEP_END, sender=self)
+            return False
+
+    async def __call_async(self, args: tuple, kwargs: dict) -> Any:
+        """Execute an async step function. The awaited time is included in the step time."""
+        tic = self.__begin(args, kwargs)
+        if tic is None:
+            return None
+
+        try:
+            retval = await self.descriptor.func(*args, **kwargs)
+            self.__finish(tic)
+            return retval
+        except BaseException as exc:
+            if not self.__handle(exc, tic):
+                raise
+        return None
+
+    def __call__(self, *args, **kwargs) -> Any:
+        """
+        Function encapsulation of the step call with added event triggers.
 
-        # NOTE: The fianlly: cannot be used as AbortStepSignal has to propagate
+        Async step functions (`async def`) are awaited. Inside of a running event loop the
+        coroutine of the step is returned to be awaited by the caller, otherwise the step is
+        executed by a new event loop (see `run_coroutine()`).
+        
+        Returns
+        -------
+        Any
+            Original return value of the function. Steps skipped as up to date return None.
+        """
+        if self.descriptor.asynchronous:
+            return run_coroutine(self.__call_async(args, kwargs))
+
+        tic = self.__begin(args, kwargs)
+        if tic is None:
+            return None
+
+        try:
+            retval = self.descriptor.func(*args, **kwargs)
+            self.__finish(tic)
+            return retval
+        except BaseException as exc:
+            # NOTE: The exception is re-raised here, AbortStepSignal has to propagate
+            if not self.__handle(exc, tic):
+                raise
+        return None
@@ -1,11 +1,10 @@
-from fruit.modules.step import Step, STATUS_ERR, STATUS_OK, STATUS_SKIPPED
+from fruit.modules.step import run_coroutine
 import fruit.modules.console as console
-import tabulate
-import fruit.globals as glb
 
-from .event import Event
+from . import lifecycle
 
-from typing import Callable
+import inspect
+from typing import Callable, List
 
 class FruitError(Exception):
     """Error class for aborting the target make"""
@@ -23,23 +22,34 @@ class Target(object):
         Help text of the target
     origin : str
         Origin of the target
+    depends : List[str]
+        Names of the targets, that have to be made before this target
+    tags : List[str]
+        Tags for selecting the target with `fruit make @tag:<tag>`
+    asynchronous : bool
+        True, if the target function is a coroutine function (`async def`)
+    exception : BaseException
+        Exception, that interrupted the last execution of the target, or None
 
     Events
     ------
-    OnActivate : Event(sender=self)
-        Called when the target is activate via `fruit make <name>` or a function call.
-    OnDeactivate: Event(sender=self)
-        Called when the execution of the event finishes.
+    The target publishes the following topics of the lifecycle bus:
+
+    TARGET_START(sender)
+        The target is activated via `fruit make <name>` or a function call.
+    TARGET_END(sender)
+        The execution of the target finished, also when it was interrupted by an exception.
     """
     name: str = ""
     help: str = ""
     origin: str = ""
+    depends: List[str] = None
+    tags: List[str] = None
+    asynchronous: bool = False
+    exception: BaseException = None
     __func: Callable[[], None] = None
 
-    OnActivate: Event = None  # Event to call when a target is activated
-    OnDeactivate: Event = None  # Event to call when a target finished executing
-
-    def __init__(self, func:Callable[[], None], name: str, help:str=""):
+    def __init__(self, func:Callable[[], None], name: str, help:str="", depends:List[str]=None, tags:List[str]=None):
         """
         Create a target object with the given target name and target function.
 
@@ -51,6 +61,10 @@ class Target(object):
             Target name
         `help` : str, optional
             Target help (description), by default ""
+        `depends` : List[str], optional
+            Names of the targets to make before this target, by default None
+        `tags` : List[str], optional
+            Tags of the target, by default None
 
         Raises
         ------
@@ -62,12 +76,17 @@ class Target(object):
             Invalid target name length
         TypeError
             Invalid target help
+        TypeError
+            Invalid target dependencies
+        TypeError
+            Invalid target tags
         """
         # Parameter validation
         if not callable(func):
             raise TypeError('The given target function is not callable!')
         else:
             self.__func = func
+            self.asynchronous = inspect.iscoroutinefunction(func)
 
         if type(name) is not str:
             raise TypeError('Target name must be a string!')
@@ -81,13 +100,52 @@ class Target(object):
         else:
             self.help = help
 
-        # Create the class events with an example call signature
-        self.OnActivate = Event(sender=self)
-        self.OnDeactivate = Event(sender=self)
+        if depends is None:
+            self.depends = []
+        elif isinstance(depends, (list, tuple)) and all(type(dep) is str for dep in depends):
+            self.depends = list(depends)
+        else:
+            raise TypeError('Target dependencies must be a list of target names!')
+
+        if tags is None:
+            self.tags = []
+        elif isinstance(tags, (list, tuple)) and all(type(tag) is str and len(tag) > 0 for tag in tags):
+            self.tags = list(tags)
+        else:
+            raise TypeError('Target tags must be a list of non-empty strings!')
+
+    async def __call_async(self):
+        """Await the async target function and publish the additional events."""
+        lifecycle.publish(lifecycle.TARGET_START, sender=self)
+        console.flush()
+        self.exception = None
+        try:
+            await self.__func()
+        except BaseException as exc:
+            self.exception = exc
+            raise
+        finally:
+            lifecycle.publish(lifecycle.TARGET_END, sender=self)
 
     def __call__(self):
-        """Call the target function and additional events."""
-        self.OnActivate(sender=self)
-        self.__func()
-        self.OnDeactivate(sender=self)
+        """
+        Call the target function and additional events.
+
+        Async target functions (`async def`) are executed by a new event loop. Inside of a
+        running event loop the coroutine of the target is returned to be awaited.
+        """
+        if self.asynchronous:
+            return run_coroutine(self.__call_async())
+
+        lifecycle.publish(lifecycle.TARGET_START, sender=self)
+        # The target function writes directly to stdout, after the queued header of the target
+        console.flush()
+        self.exception = None
+        try:
+            self.__func()
+        except BaseException as exc:
+            self.exception = exc
+            raise
+        finally:
+            lifecycle.publish(lifecycle.TARGET_END, sender=self)
 
@@ -0,0 +1,178 @@
+"""
+Timeline export of the target and step executions in the Chrome Trace Event Format.
+
+The trace can be opened with `chrome://tracing` or https://ui.perfetto.dev. Targets and
+steps are written as begin/end events, so nested steps are shown inside of their callers.
+Every thread executing targets (e.g. with `fruit make -j N`) gets its own lane.
+
+Async steps running at the same time on one thread (e.g. with `asyncio.gather()`) cannot
+share a lane, as their begin and end events interleave. Each execution context (thread or
+asyncio task) continues the lane of its caller, as long as no other context opened a span in
+that lane since. Otherwise it gets another lane of the thread. Lanes are reused, when their
+spans are closed.
+
+The events are streamed to the trace file during the run, the memory use of the recorder
+does not depend on the number of steps.
+"""
+
+import os
+import json
+import time
+import heapq
+import threading
+import contextvars
+from typing import Dict, List, TextIO, Tuple
+
+from . import lifecycle
+from .step import STATUS_NAMES
+
+
+class TraceRecorder(object):
+    """
+    Recorder of the lifecycle events into a trace file.
+
+    Example::
+
+        with TraceRecorder("trace.json"):
+            Garden().make_multiple("release")
+
+    Attributes
+    ----------
+    path : str
+        Path of the trace file
+    """
+
+    path: str = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__file: TextIO = None
+        self.__empty = True
+        self.__lock = threading.Lock()
+        self.__origin = 0
+        self.__pid = os.getpid()
+
+        # Number of open spans in each lane, the names of the lanes, the free lanes and the
+        # number of lanes of each thread
+        self.__depth: Dict[int, int] = {}
+        self.__names: Dict[int, str] = {}
+        self.__free: Dict[int, List[int]] = {}
+        self.__count: Dict[int, int] = {}
+        # Open spans of the execution context: thread, lane and depth of the lane
+        self.__spans = contextvars.ContextVar('fruit_trace_spans', default=())
+
+        self.__listeners = [
+            (lifecycle.TARGET_START, self.on_target_start),
+            (lifecycle.TARGET_END,   self.on_target_end),
+            (lifecycle.STEP_START,   self.on_step_start),
+            (lifecycle.STEP_END,     self.on_step_end),
+            (lifecycle.STEP_ABORT,   self.on_step_abort),
+        ]
+
+    def start(self) -> None:
+        """Open the trace file and start recording."""
+        self.__file = open(self.path, 'w')
+        self.__file.write("[\n")
+        self.__origin = time.perf_counter_ns()
+
+        # The steps are named after the garden determined their full name
+        for each_topic, each_listener in self.__listeners:
+            lifecycle.subscribe(each_topic, each_listener, priority=-100)
+
+    def stop(self) -> None:
+        """Stop recording, close the open spans and write the trace file."""
+        for each_topic, each_listener in self.__listeners:
+            lifecycle.unsubscribe(each_topic, each_listener)
+
+        with self.__lock:
+            # Spans of targets interrupted by an error
+            for each_lane, each_depth in self.__depth.items():
+                for __ in range(each_depth):
+                    self.__write({'ph': 'E', 'ts': self.__now(), 'pid': self.__pid, 'tid': each_lane})
+
+            self.__write({'ph': 'M', 'name': 'process_name', 'pid': self.__pid, 'args': {'name': 'fruit'}})
+            for each_lane, each_name in self.__names.items():
+                self.__write({'ph': 'M', 'name': 'thread_name', 'pid': self.__pid, 'tid': each_lane,
+                              'args': {'name': each_name}})
+                self.__write({'ph': 'M', 'name': 'thread_sort_index', 'pid': self.__pid, 'tid': each_lane,
+                              'args': {'sort_index': each_lane}})
+
+            self.__file.write("\n]\n")
+            self.__file.close()
+
+    def __enter__(self) -> 'TraceRecorder':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def __now(self) -> float:
+        """Microseconds since the start of the recording."""
+        return (time.perf_counter_ns() - self.__origin) / 1000
+
+    def __lane(self, spans: Tuple[tuple, ...]) -> int:
+        """Get the lane for a new span of the current context. The lock has to be held."""
+        ident = threading.get_ident()
+        if len(spans) > 0 and spans[-1][0] == ident and self.__depth[spans[-1][1]] == spans[-1][2]:
+            # No other context opened a span in the lane since the caller's span
+            return spans[-1][1]
+
+        free = self.__free.setdefault(ident, [])
+        if len(free) > 0:
+            return heapq.heappop(free)
+
+        lane = len(self.__depth) + 1
+        name = threading.current_thread().name
+        count = self.__count[ident] = self.__count.get(ident, 0) + 1
+        self.__names[lane] = name if count == 1 else f"{name} ({count})"
+        self.__depth[lane] = 0
+        return lane
+
+    def __write(self, event: dict) -> None:
+        """Write an event to the trace file. The lock has to be held."""
+        if not self.__empty:
+            self.__file.write(",\n")
+        self.__file.write(json.dumps(event, separators=(',', ':')))
+        self.__empty = False
+
+    def __begin(self, name: str, category: str) -> None:
+        ts = self.__now()
+        with self.__lock:
+            spans = self.__spans.get()
+            lane = self.__lane(spans)
+            self.__depth[lane] += 1
+            self.__spans.set(spans + ((threading.get_ident(), lane, self.__depth[lane]),))
+            self.__write({'name': name, 'cat': category, 'ph': 'B', 'ts': ts, 'pid': self.__pid, 'tid': lane})
+
+    def __end(self, args: dict = None) -> None:
+        ts = self.__now()
+        with self.__lock:
+            spans = self.__spans.get()
+            if len(spans) == 0:
+                return # Started before the recording
+            ident, lane, __ = spans[-1]
+            self.__spans.set(spans[:-1])
+            self.__depth[lane] -= 1
+            if self.__depth[lane] == 0:
+                heapq.heappush(self.__free[ident], lane)
+
+            event = {'ph': 'E', 'ts': ts, 'pid': self.__pid, 'tid': lane}
+            if args:
+                event['args'] = args
+            self.__write(event)
+
+    def on_target_start(self, sender) -> None:
+        self.__begin(sender.name, 'target')
+
+    def on_target_end(self, sender) -> None:
+        self.__end()
+
+    def on_step_start(self, sender) -> None:
+        self.__begin(sender.fullname, 'step')
+
+    def on_step_end(self, sender) -> None:
+        self.__end({'status': STATUS_NAMES.get(sender.status, "Unknown")})
+
+    def on_step_abort(self, sender, exception) -> None:
+        self.__end({'status': "Aborted", 'reason': str(exception)})
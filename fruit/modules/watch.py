@@ -0,0 +1,532 @@
+"""
+Watch mode of fruit: the targets are made again, when the files they depend on change.
+
+The files of a target are the `inputs` of the steps it executed, including the steps of its
+dependencies, and the fruit configuration itself. The process stays alive between the runs,
+so only the configuration is loaded again, when it changed. Unchanged incremental steps are
+skipped as up to date.
+
+The files are watched with inotify on Linux. Other platforms, or file systems without inotify
+support, are polled.
+"""
+
+import os
+import re
+import sys
+import time
+import errno
+import contextvars
+import select
+import struct
+import threading
+from typing import Dict, Iterable, List, Set
+
+from . import lifecycle
+from .scheduler import Scheduler
+import fruit.modules.console as console
+
+# Interval of the polling watcher in seconds
+POLL_INTERVAL = 0.5
+
+
+def translate_pattern(pattern: str) -> str:
+    """
+    Translate a glob pattern of files into a regular expression. `*`, `?` and `[...]` do not
+    match the path separator, `**/` matches any number of directories (like `glob` with
+    `recursive=True`).
+
+    Parameters
+    ----------
+    `pattern` : str
+        Glob pattern with `/` as separator
+
+    Returns
+    -------
+    str
+        Regular expression matching the whole path
+    """
+    parts, i, n = [], 0, len(pattern)
+    while i < n:
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+            continue
+
+        if char == '*':
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '[' and pattern.find(']', i + 2) > 0:
+            end = pattern.find(']', i + 2)
+            content = pattern[i + 1:end].replace('\\', '\\\\')
+            parts.append('[' + ('^' + content[1:] if content.startswith('!') else content) + ']')
+            i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return '(?s:' + ''.join(parts) + r')\Z'
+
+
+def _static_base(pattern: str) -> tuple:
+    """
+    Get the directory, that contains every match of an absolute pattern.
+
+    Returns
+    -------
+    tuple
+        Directory and True, if the matches may be in its subdirectories
+    """
+    parts = pattern.split('/')
+    for index, each_part in enumerate(parts[:-1]):
+        if any(char in each_part for char in '*?['):
+            return '/'.join(parts[:index]) or '/', True
+    return '/'.join(parts[:-1]) or '/', False
+
+
+class PatternSet(object):
+    """
+    Set of absolute glob patterns, that matches paths.
+
+    Attributes
+    ----------
+    patterns : Set[str]
+        Absolute glob patterns
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        self.patterns: Set[str] = set()
+        self.__regex = None
+        self.update(patterns)
+
+    def update(self, patterns: Iterable[str]) -> None:
+        """Add glob patterns relative to the current working directory."""
+        for each in patterns:
+            self.patterns.add(os.path.abspath(each).replace(os.sep, '/'))
+        self.__regex = None
+
+    def match(self, path: str) -> bool:
+        """Check, whether an absolute path matches one of the patterns."""
+        if len(self.patterns) == 0:
+            return False
+        if self.__regex is None:
+            self.__regex = re.compile('|'.join(translate_pattern(each) for each in sorted(self.patterns)))
+        return self.__regex.match(path.replace(os.sep, '/')) is not None
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+
+class PollingWatcher(object):
+    """Watcher comparing the modification times and sizes of the matching files."""
+
+    def __init__(self, interval: float = POLL_INTERVAL):
+        self.interval = interval
+        self.__patterns = PatternSet()
+        self.__stats: Dict[str, tuple] = {}
+
+    def watch(self, patterns: PatternSet) -> None:
+        """Replace the watched patterns."""
+        self.__patterns = patterns
+        self.__stats = self.__scan()
+
+    def __scan(self) -> Dict[str, tuple]:
+        from .fingerprint import expand
+
+        stats = {}
+        for each_path in expand(self.__patterns.patterns):
+            try:
+                stat = os.stat(each_path)
+            except OSError:
+                continue
+            stats[each_path] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    def wait(self, timeout: float = None) -> Set[str]:
+        """
+        Wait for changes of the watched files.
+
+        Parameters
+        ----------
+        `timeout` : float, optional
+            Maximum time to wait in seconds, by default None (until a file changed)
+
+        Returns
+        -------
+        Set[str]
+            Absolute paths of the created, modified or removed files; empty after the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            stats = self.__scan()
+            changed = {path for path in stats.keys() | self.__stats.keys()
+                       if stats.get(path) != self.__stats.get(path)}
+            self.__stats = stats
+            if changed:
+                return changed
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return set()
+                time.sleep(min(self.interval, remaining))
+            else:
+                time.sleep(self.interval)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher(object):
+    """
+    Watcher using the inotify API of Linux via ctypes. The directories containing the
+    matches of the patterns are watched, recursive patterns (`**`) watch the subdirectories.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM  = 0x00000040
+    IN_MOVED_TO    = 0x00000080
+    IN_CREATE      = 0x00000100
+    IN_DELETE      = 0x00000200
+    IN_IGNORED     = 0x00008000
+    IN_ISDIR       = 0x40000000
+
+    # File changes, a file may be written with multiple IN_MODIFY, but is closed once
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self):
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, "inotify is not supported")
+
+        self.__libc = libc
+        self.__fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.__fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1() failed")
+
+        self.__patterns = PatternSet()
+        self.__directories: Dict[int, str] = {}
+        self.__recursive: Set[str] = set()
+
+    def __add(self, directory: str, recursive: bool) -> None:
+        """Watch a directory and with `recursive` its subdirectories."""
+        import ctypes
+
+        for each_dir, __, __ in os.walk(directory) if recursive else [(directory, [], [])]:
+            wd = self.__libc.inotify_add_watch(self.__fd, os.fsencode(each_dir), self.MASK)
+            if wd < 0:
+                code = ctypes.get_errno()
+                if code in (errno.ENOENT, errno.ENOTDIR):
+                    continue
+                raise OSError(code, f"Cannot watch '{each_dir}'")
+            self.__directories[wd] = each_dir
+            if recursive:
+                self.__recursive.add(each_dir)
+
+    def watch(self, patterns: PatternSet) -> None:
+        """Replace the watched patterns."""
+        for each_wd in list(self.__directories):
+            self.__libc.inotify_rm_watch(self.__fd, each_wd)
+        self.__directories.clear()
+        self.__recursive.clear()
+        self.__patterns = patterns
+
+        bases = {}
+        for each_pattern in patterns.patterns:
+            base, recursive = _static_base(each_pattern)
+            # Missing directories are watched by their closest existing parent
+            while not os.path.isdir(base) and base != os.path.dirname(base):
+                base, recursive = os.path.dirname(base), True
+            bases[base] = bases.get(base, False) or recursive
+
+        for each_base, each_recursive in bases.items():
+            self.__add(each_base, each_recursive)
+
+    def wait(self, timeout: float = None) -> Set[str]:
+        """
+        Wait for changes of the watched files.
+
+        Parameters
+        ----------
+        `timeout` : float, optional
+            Maximum time to wait in seconds, by default None (until a file changed)
+
+        Returns
+        -------
+        Set[str]
+            Absolute paths of the created, modified or removed files; empty after the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            readable, __, __ = select.select([self.__fd], [], [], remaining)
+            if not readable:
+                return set()
+
+            changed = self.__read()
+            if changed:
+                return changed
+
+    def __read(self) -> Set[str]:
+        """Read the pending events and get the matching paths."""
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.__fd, 1 << 16)
+            except BlockingIOError:
+                return changed
+            self.__parse(data, changed)
+
+    def __parse(self, data: bytes, changed: Set[str]) -> None:
+        """Parse the events read from inotify and add the matching paths to `changed`."""
+        offset = 0
+        while offset + self.EVENT.size <= len(data):
+            wd, mask, __, length = self.EVENT.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + self.EVENT.size:offset + self.EVENT.size + length].rstrip(b'\0'))
+            offset += self.EVENT.size + length
+
+            directory = self.__directories.get(wd)
+            if mask & self.IN_IGNORED:
+                self.__directories.pop(wd, None)
+                continue
+            if directory is None:
+                continue
+
+            path = os.path.join(directory, name)
+            if mask & self.IN_ISDIR:
+                # New subdirectories of recursive patterns are watched too
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO) and directory in self.__recursive:
+                    self.__add(path, True)
+            elif self.__patterns.match(path):
+                changed.add(path)
+
+    def close(self) -> None:
+        os.close(self.__fd)
+
+
+def create_watcher(poll: bool = False):
+    """
+    Create the file watcher of the platform.
+
+    Parameters
+    ----------
+    `poll` : bool, optional
+        Poll the files, even if inotify is available, by default False
+
+    Returns
+    -------
+    InotifyWatcher or PollingWatcher
+        File watcher
+    """
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher()
+        except OSError as exc:
+            console.warning(f"inotify is not available, the files are polled! Reason: {str(exc)}")
+    return PollingWatcher()
+
+
+class InputTracker(object):
+    """
+    Lifecycle listener collecting the input and output patterns of the steps executed by each
+    target. The patterns of a step are added to every active target of its context, including
+    the targets of the caller for the calls of `fruit.map()`.
+    """
+
+    def __init__(self):
+        self.__targets = contextvars.ContextVar('fruit_watch_targets', default=())
+        self.__lock = threading.Lock()
+        self.inputs: Dict[str, PatternSet] = {}
+        self.outputs: Dict[str, PatternSet] = {}
+
+    def start(self) -> None:
+        lifecycle.subscribe(lifecycle.TARGET_START, self.on_target_start)
+        lifecycle.subscribe(lifecycle.TARGET_END, self.on_target_end)
+        lifecycle.subscribe(lifecycle.STEP_START, self.on_step_start)
+
+    def stop(self) -> None:
+        lifecycle.unsubscribe(lifecycle.TARGET_START, self.on_target_start)
+        lifecycle.unsubscribe(lifecycle.TARGET_END, self.on_target_end)
+        lifecycle.unsubscribe(lifecycle.STEP_START, self.on_step_start)
+
+    def on_target_start(self, sender) -> None:
+        targets = self.__targets.get()
+        with self.__lock:
+            # The patterns of the previous run are replaced
+            if len(targets) == 0:
+                self.inputs[sender.name] = PatternSet()
+                self.outputs[sender.name] = PatternSet()
+            else:
+                self.inputs.setdefault(sender.name, PatternSet())
+                self.outputs.setdefault(sender.name, PatternSet())
+        self.__targets.set(targets + (sender.name,))
+
+    def on_target_end(self, sender) -> None:
+        self.__targets.set(self.__targets.get()[:-1])
+
+    def on_step_start(self, sender) -> None:
+        with self.__lock:
+            for each_target in self.__targets.get():
+                self.inputs[each_target].update(sender.inputs)
+                self.outputs[each_target].update(sender.outputs)
+
+
+class WatchSession(object):
+    """
+    Session of `fruit watch`: makes the selected targets and makes them again, when their
+    files change.
+
+    Attributes
+    ----------
+    directory : str
+        Directory of the fruit configuration
+    selectors : List[str]
+        Names, glob patterns or tags of the targets
+    jobs : int
+        Number of targets made in parallel
+    debounce : float
+        Time in seconds without further changes, before the targets are made again
+    """
+
+    def __init__(self, directory: str, selectors: List[str], jobs: int = 1, debounce: float = 0.1,
+                 poll: bool = False):
+        self.directory = directory
+        self.selectors = list(selectors)
+        self.jobs = jobs
+        self.debounce = debounce
+        self.__poll = poll
+        self.__tracker = InputTracker()
+        self.__config = PatternSet()
+
+    def load(self) -> None:
+        """Load the fruit configuration, forgetting the previously loaded one."""
+        from .garden import Garden
+        from .fruitloader import load, obtain_config, unload_modules
+
+        config = os.path.abspath(obtain_config(self.directory))
+        # The configuration and the modules next to it. They are watched before loading, so
+        # that fixing a configuration, that fails to load, loads it again.
+        self.__config = PatternSet([config, os.path.join(os.path.dirname(config), '*.py')])
+
+        Garden().clear()
+        unload_modules(os.path.dirname(config))
+        load(self.directory)
+
+    def targets(self) -> List[str]:
+        """Names of the selected targets and their dependencies"""
+        from .garden import Garden
+
+        garden = Garden()
+        return [trg.name for trg in Scheduler(garden.get_target, *garden.select_targets(*self.selectors)).order]
+
+    def affected(self, changed: Set[str]) -> List[str]:
+        """
+        Get the selected targets, whose inputs or whose dependencies' inputs changed.
+
+        Parameters
+        ----------
+        `changed` : Set[str]
+            Absolute paths of the changed files
+
+        Returns
+        -------
+        List[str]
+            Names of the selected targets to make again
+        """
+        from .garden import Garden
+
+        garden = Garden()
+        touched = {name for name, inputs in self.__tracker.inputs.items()
+                   if any(inputs.match(path) for path in changed)}
+
+        affected = []
+        for each_name in garden.select_targets(*self.selectors):
+            closure = [trg.name for trg in Scheduler(garden.get_target, each_name).order]
+            if touched.intersection(closure):
+                affected.append(each_name)
+        return affected
+
+    def make(self, *targets: str) -> None:
+        """Make the targets, the errors are printed and do not end the session."""
+        from .garden import Garden
+
+        try:
+            # The summary only shows the current make
+            Garden().reset_records(Garden().records.retention, resources=Garden().records.resources)
+            Garden().make_multiple(*targets, jobs=self.jobs)
+        except Exception as exc:
+            console.error(str(exc))
+
+    def patterns(self) -> PatternSet:
+        """Patterns of the watched files"""
+        patterns = PatternSet()
+        patterns.patterns.update(self.__config.patterns)
+        for each_name in self.__tracker.inputs:
+            patterns.patterns.update(self.__tracker.inputs[each_name].patterns)
+        return patterns
+
+    def own_outputs(self, changed: Set[str]) -> Set[str]:
+        """Get the changed paths, that were written as outputs of the steps."""
+        outputs = [each for each in self.__tracker.outputs.values()]
+        return {path for path in changed if any(each.match(path) for each in outputs)}
+
+    def run(self) -> None:
+        """Make the targets and watch their files until the session is interrupted (Ctrl+C)."""
+        watcher = create_watcher(self.__poll)
+        self.__tracker.start()
+        try:
+            try:
+                self.load()
+                self.make(*self.selectors)
+            except Exception as exc:
+                console.error(str(exc))
+
+            # Files changed during the previous make
+            pending = set()
+            while True:
+                patterns = self.patterns()
+                watcher.watch(patterns)
+
+                if pending:
+                    changed, pending = pending, set()
+                else:
+                    console.echo(f"Watching {len(patterns)} file patterns. Press Ctrl+C to stop.")
+                    changed = watcher.wait()
+                # Bursts of changes (e.g. saving multiple files) start a single make
+                while True:
+                    more = watcher.wait(self.debounce)
+                    if not more:
+                        break
+                    changed |= more
+
+                try:
+                    if any(self.__config.match(path) for path in changed):
+                        console.echo("The fruit configuration changed, loading it again.")
+                        self.load()
+                        targets = self.selectors
+                    else:
+                        targets = self.affected(changed)
+                except Exception as exc:
+                    console.error(str(exc))
+                    continue
+                if len(targets) < 1:
+                    continue
+
+                self.make(*targets)
+
+                # The outputs written by the make do not trigger the next one
+                pending = watcher.wait(0)
+                pending -= self.own_outputs(pending)
+        except KeyboardInterrupt:
+            console.echo("Stopped watching.")
+        finally:
+            self.__tracker.stop()
+            watcher.close()
@@ -0,0 +1,219 @@
+"""
+Global workspace of the picked-up fruit configurations.
+
+The targets of the configurations picked up with `fruit path --pickup <path>` are made from
+any directory with `fruit make <project>:<target>`. The project name is the name of the
+picked-up directory, or the name of the picked-up python file without its extension.
+
+The workspace index maps the targets to the configurations defining them. It is built with
+the static scanner and cached in `WORKSPACE_INDEX_FILE`, so that resolving a target neither
+executes nor scans the other configurations again. Only the configuration of the made
+targets is loaded. Configurations, that register their targets dynamically, are indexed
+without targets and are loaded to find them.
+"""
+
+import os
+import json
+import fruit.modules.console as console
+from typing import Dict, List, Tuple
+
+from fruit.globals import WORKSPACE_INDEX_FILE, FRUITCONFIG_NAME, FRUIT_DIR_NAME
+from .scanner import ConfigIndex, IndexEntry, scan_config
+from .pickup import load_fruit_env
+from .fruitloader import obtain_config
+
+# Separator of the project name and the target selector
+PROJECT_SEPARATOR = ":"
+
+# Version of the cached workspace index
+WORKSPACE_VERSION = 1
+
+
+def project_name(path: str) -> str:
+    """
+    Get the project name of a picked-up path.
+
+    Parameters
+    ----------
+    `path` : str
+        Picked-up directory or python file
+
+    Returns
+    -------
+    str
+        Name of the directory or of the python file without its extension
+    """
+    path = os.path.abspath(path)
+    if os.path.isfile(path):
+        name = os.path.basename(path)[:-len('.py')]
+        if name not in (FRUITCONFIG_NAME[:-len('.py')], '__init__'):
+            return name
+        path = os.path.dirname(path)
+    if os.path.basename(path) == FRUIT_DIR_NAME:
+        path = os.path.dirname(path)
+    return os.path.basename(path)
+
+
+class WorkspaceIndex(object):
+    """
+    Index of the picked-up fruit configurations.
+
+    Attributes
+    ----------
+    configs : Dict[str, str]
+        Path of the configuration file by the project name
+    indexes : Dict[str, ConfigIndex]
+        Index of the configuration by the project name
+    """
+
+    configs: Dict[str, str] = None
+    indexes: Dict[str, ConfigIndex] = None
+
+    def __init__(self):
+        self.configs = {}
+        self.indexes = {}
+
+    def targets(self) -> List[IndexEntry]:
+        """
+        Get the targets of every project with their global names (`<project>:<target>`).
+
+        Returns
+        -------
+        List[IndexEntry]
+            Targets of the projects. A dynamic project is listed as `<project>:*`.
+        """
+        targets = []
+        for each_project, each_index in self.indexes.items():
+            if each_index.dynamic:
+                targets.append(IndexEntry('target', each_project + PROJECT_SEPARATOR + '*',
+                                          "Dynamic configuration, the targets are found by loading it",
+                                          self.configs[each_project]))
+            for each_target in each_index.targets:
+                targets.append(IndexEntry('target', each_project + PROJECT_SEPARATOR + each_target.name,
+                                          each_target.help, each_target.origin, each_target.options))
+        return targets
+
+    def resolve(self, selectors: List[str]) -> Tuple[str, List[str]]:
+        """
+        Find the configuration of global target selectors (`<project>:<selector>`).
+
+        Parameters
+        ----------
+        `selectors` : List[str]
+            Target selectors. Selectors without a known project name are local selectors.
+
+        Returns
+        -------
+        Tuple[str, List[str]]
+            Path of the configuration (None for local selectors) and the selectors of the
+            targets in the configuration
+
+        Raises
+        ------
+        ValueError
+            The selectors refer to multiple configurations or to an unknown target
+        """
+        configs, local = set(), []
+        for each_selector in selectors:
+            project, __, selector = each_selector.partition(PROJECT_SEPARATOR)
+            if selector == "" or project not in self.configs:
+                configs.add(None)
+                local.append(each_selector)
+                continue
+
+            configs.add(self.configs[project])
+            local.append(selector)
+
+            index = self.indexes[project]
+            plain = not selector.startswith('@') and not any(char in selector for char in "*?[")
+            if plain and not index.dynamic and selector not in (t.name for t in index.targets):
+                raise ValueError(f"The project '{project}' has no target '{selector}'!")
+
+        if len(configs) > 1:
+            raise ValueError("The targets of multiple fruit configurations cannot be made at once!")
+        return configs.pop(), local
+
+
+def _load_cache() -> Dict:
+    try:
+        with open(WORKSPACE_INDEX_FILE, 'r') as fp:
+            data = json.load(fp)
+        if data.get('version') == WORKSPACE_VERSION:
+            return data['projects']
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass # Missing or outdated cache file
+    return {}
+
+
+def _save_cache(workspace: WorkspaceIndex) -> None:
+    data = {'version': WORKSPACE_VERSION, 'projects': {
+        name: {'config': workspace.configs[name], 'index': workspace.indexes[name].to_dict()}
+        for name in workspace.configs}}
+    try:
+        os.makedirs(os.path.dirname(WORKSPACE_INDEX_FILE), exist_ok=True)
+        tmp_path = "{}.{}.tmp".format(WORKSPACE_INDEX_FILE, os.getpid())
+        with open(tmp_path, 'w') as fp:
+            json.dump(data, fp)
+        os.replace(tmp_path, WORKSPACE_INDEX_FILE)
+    except OSError:
+        pass # The cache is optional
+
+
+def load_workspace(paths: List[str] = None) -> WorkspaceIndex:
+    """
+    Get the index of the picked-up configurations. Only the configurations, that changed since
+    the index was cached, are scanned again.
+
+    Parameters
+    ----------
+    `paths` : List[str], optional
+        Picked-up paths, by default the paths of `fruit path`
+
+    Returns
+    -------
+    WorkspaceIndex
+        Index of the configurations by their project names
+    """
+    if paths is None:
+        paths = load_fruit_env()
+
+    cached = _load_cache()
+    workspace = WorkspaceIndex()
+    changed = False
+
+    for each_path in paths:
+        name = project_name(each_path)
+        if name in workspace.configs:
+            console.warning(f"The project name '{name}' of '{each_path}' is already used, the path is ignored!")
+            continue
+        try:
+            config = os.path.abspath(obtain_config(each_path))
+        except FileNotFoundError:
+            console.debug(f"There is no fruit configuration in the picked-up path '{each_path}'")
+            continue
+
+        index = None
+        entry = cached.get(name)
+        if entry is not None and entry['config'] == config:
+            try:
+                index = ConfigIndex.from_dict(entry['index'])
+                if not index.is_current():
+                    index = None
+            except (ValueError, KeyError, TypeError):
+                index = None
+        if index is None:
+            index = scan_config(config)
+            changed = True
+
+        workspace.configs[name] = config
+        workspace.indexes[name] = index
+
+    if changed or set(cached) != set(workspace.configs):
+        _save_cache(workspace)
+    return workspace
+
+
+def is_global(selector: str) -> bool:
+    """Check, whether a target selector may refer to a picked-up project (`<project>:<selector>`)."""
+    project, __, selector = selector.partition(PROJECT_SEPARATOR)
+    return project != "" and selector != "" and not project.startswith('@')
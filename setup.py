@@ -12,7 +12,7 @@ setup(
     packages=find_packages(),
     install_requires=['click', 'colorama', 'tabulate', 'questionary'],
     entry_points={
-        'console_scripts': ['fruit=fruit.fruit:main','fmake=fruit.fruit:make','fcoll=fruit.fruit:collect'],
+        'console_scripts': ['fruit=fruit.fruit:main','fmake=fruit.fruit:make','fcoll=fruit.fruit:collect','fruitc=fruit.client:main'],
     },
     author="Marcell Pigniczki",
     author_email="marcip97@gmail.com",
@@ -30,5 +30,5 @@ setup(
         ],
     zip_safe=False,
     package_data={"fruit": ["__init__.py"]},
-    python_requires='>=3.6',
+    python_requires='>=3.9',
 )
@@ -0,0 +1,166 @@
+from fruit.modules.garden import Garden
+from fruit.modules.target import Target
+from fruit.modules.step import StepDescriptor, AbortStepSignal, STATUS_OK, STATUS_SKIPPED, STATUS_ERR
+from fruit.api.api import skip, fail, abort
+from fruit.api.shell import ashell, shell, shell_many
+import fruit.modules.lifecycle as lifecycle
+import unittest
+import asyncio
+import sys
+
+def create_garden() -> Garden:
+    """Create a garden independent of the singleton instance"""
+    garden = object.__new__(Garden)
+    garden.__init__()
+    return garden
+
+async def wait(seconds: float) -> float:
+    await asyncio.sleep(seconds)
+    return seconds
+
+class TestAsyncSteps(unittest.TestCase):
+    """Test the execution of async step functions"""
+
+    def setUp(self):
+        self.garden = create_garden()
+        self.garden.options['pure'] = True
+
+    def rows(self) -> dict:
+        return {row.fullname: row for row in self.garden.records.rows()}
+
+    def test_awaited_time(self):
+        """Test that the status and the time of a step include the awaited work"""
+        step = StepDescriptor(wait, "wait")
+        self.assertTrue(step.asynchronous)
+
+        # Outside of an event loop the step runs in its own loop
+        self.assertEqual(step(0.05), 0.05)
+        row = self.rows()["wait"]
+        self.assertEqual(row.status, STATUS_OK)
+        self.assertGreaterEqual(row.time, 0.05)
+
+    def test_gather(self):
+        """Test that steps gathered in an async step are nested in it and overlap"""
+        inner = StepDescriptor(wait, "inner")
+
+        async def outer():
+            return await asyncio.gather(inner(0.1), *(inner(each) for each in [0.1]), *[inner(each) for each in [0.1]])
+
+        self.assertEqual(StepDescriptor(outer, "outer")(), [0.1, 0.1, 0.1])
+        rows = list(self.garden.records.rows())
+        outer_row = [row for row in rows if row.fullname == "outer"][0]
+        inner_rows = [row for row in rows if row.fullname == "outer :: inner"]
+
+        self.assertEqual(len(inner_rows), 3)
+        self.assertTrue(all(row.parent == outer_row.id and row.status == STATUS_OK for row in inner_rows))
+        self.assertTrue(all(row.time >= 0.1 for row in inner_rows))
+        # The steps were awaited at the same time
+        self.assertLess(outer_row.time, 0.25)
+
+    def test_signals(self):
+        """Test the skipped, failed and aborted async steps"""
+        async def signal(kind: str):
+            await asyncio.sleep(0)
+            {'skip': skip, 'fail': fail, 'abort': abort}[kind](kind)
+
+        step = StepDescriptor(signal, "signal")
+        self.assertIsNone(step('skip'))
+        self.assertIsNone(step('fail'))
+        with self.assertRaises(AbortStepSignal):
+            step('abort')
+        self.assertEqual([row.status for row in self.garden.records.rows()], [STATUS_SKIPPED, STATUS_ERR, STATUS_ERR])
+
+        async def caught():
+            try:
+                await step('abort')
+            except AbortStepSignal:
+                pass
+            await StepDescriptor(wait, "after")(0)
+
+        StepDescriptor(caught, "caught")()
+        self.assertEqual(self.rows()["caught :: after"].parent, self.rows()["caught"].id)
+
+    @unittest.skipIf(sys.platform.startswith("win"), "The shell commands require a posix shell")
+    def test_ashell(self):
+        """Test the shell commands awaited in async steps"""
+        async def commands():
+            return await asyncio.gather(ashell("exit 3", echo=False), ashell(["echo", "fruit"], capture=True, echo=False))
+
+        returncode, result = StepDescriptor(commands, "commands")()
+        self.assertEqual(returncode, 3)
+        self.assertEqual(result.stdout, "fruit")
+
+
+class TestAsyncTargets(unittest.TestCase):
+    """Test the execution of async target functions"""
+
+    def setUp(self):
+        self.garden = create_garden()
+        self.garden.options['pure'] = True
+        self.events = []
+        lifecycle.subscribe(lifecycle.TARGET_START, self.started)
+        lifecycle.subscribe(lifecycle.TARGET_END, self.ended)
+
+    def tearDown(self):
+        lifecycle.unsubscribe(lifecycle.TARGET_START, self.started)
+        lifecycle.unsubscribe(lifecycle.TARGET_END, self.ended)
+
+    def started(self, sender):
+        self.events.append(("start", sender.name))
+
+    def ended(self, sender):
+        self.events.append(("end", sender.name))
+
+    def test_target(self):
+        """Test that an async target runs its own event loop and awaits other async targets"""
+        step = StepDescriptor(wait, "wait")
+
+        async def inner_func():
+            await step(0)
+
+        inner = Target(inner_func, "inner")
+
+        async def outer():
+            await inner()
+            await step(0)
+
+        target = Target(outer, "outer")
+        self.assertTrue(target.asynchronous)
+        self.assertFalse(Target(lambda: None, "plain").asynchronous)
+
+        target()
+        self.assertEqual(self.events, [("start", "outer"), ("start", "inner"), ("end", "inner"), ("end", "outer")])
+        self.assertEqual(sorted(row.fullname for row in self.garden.records.rows()),
+                         ["inner / wait", "wait"])
+
+    @unittest.skipIf(sys.platform.startswith("win"), "The shell commands require a posix shell")
+    def test_plain_shell(self):
+        """Test that plain steps execute shell commands inside of an async target"""
+        def commands():
+            return shell(["echo", "fruit"], capture=True, echo=False).stdout, shell_many(["exit 2", "true"], echo=False)
+
+        step = StepDescriptor(commands, "commands")
+        results = []
+
+        async def release():
+            results.append(step())
+
+        Target(release, "release")()
+        self.assertEqual(results, [("fruit", [2, 0])])
+        self.assertEqual(self.events, [("start", "release"), ("end", "release")])
+
+    def test_plain_step(self):
+        """Test that a plain step calling an async step inside of an async target gets its result"""
+        inner = StepDescriptor(wait, "wait")
+        outer = StepDescriptor(lambda: inner(0.01), "outer")
+        results = []
+
+        async def release():
+            results.append(outer())
+
+        Target(release, "release")()
+        self.assertEqual(results, [0.01])
+        rows = {row.fullname: row for row in self.garden.records.rows()}
+        self.assertEqual(sorted(rows), ["outer", "outer :: wait"])
+        self.assertEqual(rows["outer :: wait"].parent, rows["outer"].id)
+        self.assertEqual(rows["outer :: wait"].status, STATUS_OK)
@@ -0,0 +1,103 @@
+from fruit.modules.cas import ArtifactCache
+from fruit.modules.fingerprint import fingerprint_files
+from fruit.modules.step import Step, STATUS_OK, STATUS_CACHED
+import tempfile
+from unittest import mock
+import unittest
+import os
+
+def write(path: str, content: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as fp:
+        fp.write(content)
+
+def read(path: str) -> str:
+    with open(path, 'r') as fp:
+        return fp.read()
+
+class TestArtifactCache(unittest.TestCase):
+    """Test the content addressed store of step outputs"""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+        self.cache = ArtifactCache(os.path.join(self.tmp.name, "cas"), max_size=1024**2)
+        self.default = ArtifactCache.default()
+        ArtifactCache.set_default(self.cache)
+
+    def tearDown(self):
+        ArtifactCache.set_default(self.default)
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_store_restore(self):
+        """Test the roundtrip of output files"""
+        write("out/a.txt", "content")
+        self.cache.store("key", fingerprint_files(["out/a.txt"]))
+
+        os.remove("out/a.txt")
+        self.assertEqual(self.cache.restore("key"), ["out/a.txt"])
+        self.assertEqual(read("out/a.txt"), "content")
+
+        self.assertIsNone(self.cache.restore("unknown"))
+
+    def test_evict(self):
+        """Test that the least recently used entries are evicted"""
+        self.cache.max_size = 600
+
+        write("a.bin", "a" * 1000 + os.urandom(400).hex())
+        self.cache.store("old", fingerprint_files(["a.bin"]))
+        os.utime(os.path.join(self.cache.root, "entries", "old.json"), (0, 0))
+
+        write("b.bin", "b" * 1000 + os.urandom(400).hex())
+        self.cache.store("new", fingerprint_files(["b.bin"]))
+
+        self.cache.evict()
+        self.assertIsNone(self.cache.restore("old"))
+        self.assertIsNotNone(self.cache.restore("new"))
+
+    def test_concurrent_evict(self):
+        """Test that files evicted by another process at the same time are ignored"""
+        self.cache.max_size = 0
+        write("a.bin", "a")
+        self.cache.store("old", fingerprint_files(["a.bin"]))
+        remove = os.remove
+
+        def evicted_by_other(path: str):
+            remove(path)
+            raise FileNotFoundError(path)
+
+        with mock.patch('os.remove', side_effect=evicted_by_other) as removed:
+            self.cache.evict()
+        self.assertEqual(removed.call_count, 2)
+        self.assertIsNone(self.cache.restore("old"))
+
+    def test_step_restore(self):
+        """Test that switching back to known inputs restores the outputs"""
+        calls = []
+
+        def build():
+            calls.append(1)
+            write("out/result.txt", read("src/input.txt").upper())
+
+        def run():
+            stp = Step(build, "build", inputs=["src/*.txt"], outputs=["out/*.txt"])
+            stp()
+            return stp
+
+        write("src/input.txt", "first")
+        self.assertEqual(run().status, STATUS_OK)
+
+        write("src/input.txt", "second")
+        self.assertEqual(run().status, STATUS_OK)
+        self.assertEqual(read("out/result.txt"), "SECOND")
+
+        # Back to the first version
+        write("src/input.txt", "first")
+        stp = run()
+        self.assertEqual(stp.status, STATUS_CACHED)
+        self.assertTrue(stp.restored)
+        self.assertEqual(read("out/result.txt"), "FIRST")
+        self.assertEqual(len(calls), 2)
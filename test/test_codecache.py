@@ -0,0 +1,62 @@
+from fruit.modules import codecache
+import tempfile
+import unittest
+import sys
+import os
+
+class TestCodeCache(unittest.TestCase):
+    """Test the bytecode cache of fruit configurations"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = codecache.CODE_CACHE_DIR
+        codecache.CODE_CACHE_DIR = os.path.join(self.tmp.name, "cache")
+
+    def tearDown(self):
+        codecache.CODE_CACHE_DIR = self.cache_dir
+        self.tmp.cleanup()
+
+    def write(self, name: str, content: str) -> str:
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as fp:
+            fp.write(content)
+        return path
+
+    def test_compile_cached(self):
+        """Test that the cached code object is reused until the source changes"""
+        path = self.write("config.py", "value = 1\n")
+
+        namespace = {}
+        exec(codecache.compile_cached(path), namespace)
+        self.assertEqual(namespace['value'], 1)
+        self.assertTrue(os.path.exists(codecache.cache_path(path, path)))
+
+        # A cached code object with the same header is used instead of the source
+        with open(codecache.cache_path(path, path), 'rb') as fp:
+            header = fp.read(codecache.HEADER.size)
+        with open(codecache.cache_path(path, path), 'wb') as fp:
+            fp.write(header + codecache.marshal.dumps(compile("value = 2", path, 'exec')))
+
+        namespace = {}
+        exec(codecache.compile_cached(path), namespace)
+        self.assertEqual(namespace['value'], 2)
+
+        # Changed sources are compiled again
+        self.write("config.py", "value = 333\n")
+        namespace = {}
+        exec(codecache.compile_cached(path), namespace)
+        self.assertEqual(namespace['value'], 333)
+
+    def test_register_directory(self):
+        """Test that helper modules of a configuration are loaded through the cache"""
+        self.write("fruit_helper_module.py", "VALUE = 'helper'\n")
+
+        codecache.register_directory(self.tmp.name)
+        sys.path.append(self.tmp.name)
+        try:
+            import fruit_helper_module
+            self.assertEqual(fruit_helper_module.VALUE, 'helper')
+            self.assertIsInstance(fruit_helper_module.__loader__, codecache.CachedSourceLoader)
+        finally:
+            sys.path.remove(self.tmp.name)
+            sys.modules.pop('fruit_helper_module', None)
@@ -0,0 +1,88 @@
+from fruit.modules.console import Console, DEBUG, INFO, WARNING, ERROR, QUEUE_SIZE
+import contextlib
+import threading
+import tempfile
+import unittest
+import io
+import os
+
+def capture(console: Console, *messages: tuple) -> str:
+    """Write messages to a console and capture the standard output"""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        for each_level, each_text in messages:
+            console.write(each_level, each_text)
+        console.flush()
+    return out.getvalue()
+
+class TestConsole(unittest.TestCase):
+    """Test the buffered console"""
+
+    def test_order(self):
+        """Test that the messages of multiple threads are written completely and in order"""
+        console = Console()
+        out = io.StringIO()
+
+        def produce(name: str):
+            for each in range(QUEUE_SIZE * 2):
+                console.write(INFO, f"{name} {each}")
+
+        with contextlib.redirect_stdout(out):
+            threads = [threading.Thread(target=produce, args=(name,)) for name in "ab"]
+            for each_thread in threads:
+                each_thread.start()
+            for each_thread in threads:
+                each_thread.join()
+            console.flush()
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), QUEUE_SIZE * 4)
+        for each_name in "ab":
+            numbers = [int(line.split()[1]) for line in lines if line.startswith(each_name)]
+            self.assertEqual(numbers, list(range(QUEUE_SIZE * 2)))
+
+    def test_levels(self):
+        """Test that the messages below the level are dropped"""
+        console = Console(level=WARNING)
+        self.assertFalse(console.enabled(INFO))
+        self.assertTrue(console.enabled(ERROR))
+        self.assertEqual(capture(console, (INFO, "info"), (WARNING, "warning"), (ERROR, "error")), "warning\nerror\n")
+
+        console.set_level(DEBUG)
+        self.assertEqual(capture(console, (DEBUG, "debug"), (INFO, None)), "debug\n\n")
+
+    def test_logfile(self):
+        """Test that the log file receives the messages of its own level"""
+        console = Console(level=WARNING)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "fruit.log")
+            console.set_logfile(path)
+            self.assertTrue(console.enabled(DEBUG))
+            self.assertEqual(capture(console, (DEBUG, "debug"), (ERROR, "error")), "error\n")
+            console.set_logfile(None)
+
+            with open(path, 'r') as fp:
+                lines = fp.read().splitlines()
+
+        self.assertEqual([line.split(None, 2)[2] for line in lines], ["DEBUG   debug", "ERROR   error"])
+
+    def test_synchronous(self):
+        """Test the console without writer thread"""
+        console = Console(asynchronous=False)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            console.write(INFO, "now")
+            self.assertEqual(out.getvalue(), "now\n")
+
+    def test_print(self):
+        """Test that print() writes after the queued messages of an ordered console"""
+        console = Console(ordered=True)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            for each in range(100):
+                console.write(INFO, f"echo {each}")
+                print(f"print {each}")
+            console.flush()
+
+        self.assertEqual(out.getvalue().splitlines(),
+                         [f"{kind} {each}" for each in range(100) for kind in ("echo", "print")])
@@ -0,0 +1,106 @@
+from fruit.modules.daemon import FruitDaemon, is_running, stop
+from fruit.modules.garden import Garden
+from fruit.client import run
+import fruit.modules.fruitloader as fruitloader
+import contextlib
+import threading
+import tempfile
+import unittest
+import time
+import io
+import os
+
+CONFIG = '''
+import fruit
+import helper
+import lib.extra
+with open("loads.txt", "a") as fp:
+    fp.write(f"{helper.VALUE}\\n")
+
+@fruit.provider()
+def value():
+    """Value of the helper"""
+    return helper.VALUE
+'''
+
+def write(path: str, text: str) -> None:
+    with open(path, 'w') as fp:
+        fp.write(text)
+
+class TestDaemon(unittest.TestCase):
+    """Test the fruit daemon and its client"""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.socket = os.path.join(self.tmp.name, "daemon.sock")
+        self.project = os.path.join(self.tmp.name, "project")
+        os.makedirs(self.project)
+
+        write(os.path.join(self.project, "fruitconfig.py"), CONFIG)
+        write(os.path.join(self.project, "helper.py"), "VALUE = 1\n")
+        os.makedirs(os.path.join(self.project, "lib"))
+        write(os.path.join(self.project, "lib", "__init__.py"), "")
+        write(os.path.join(self.project, "lib", "extra.py"), "")
+
+        self.daemon = FruitDaemon(self.socket)
+        self.thread = threading.Thread(target=self.daemon.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.daemon.server_close()
+        self.thread.join()
+        Garden().clear()
+        fruitloader._loaded = None
+        fruitloader._project = None
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def loads(self) -> list:
+        """Values of the helper, whenever the configuration was loaded"""
+        with open(os.path.join(self.project, "loads.txt")) as fp:
+            return fp.read().split()
+
+    def call(self, *argv: str) -> tuple:
+        """Run a command in the daemon and capture its output"""
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            code = run(list(argv), path=self.socket)
+        return code, out.getvalue()
+
+    def test_reload(self):
+        """Test that the configuration is only loaded again, when it changed"""
+        # The configuration is loaded in the working directory of the client
+        os.chdir(self.project)
+        self.assertEqual(self.call("get", "value"), (0, "1\n"))
+        self.assertEqual(self.call("get", "value"), (0, "1\n"))
+        self.assertEqual(self.loads(), ["1"])
+
+        time.sleep(0.01)
+        write(os.path.join(self.project, "helper.py"), "VALUE = 22\n")
+        self.assertEqual(self.call("get", "value"), (0, "22\n"))
+        self.assertEqual(self.loads(), ["1", "22"])
+
+        # Only the imported modules count, also the ones of subpackages
+        write(os.path.join(self.project, "unused.py"), "VALUE = 3\n")
+        self.assertEqual(self.call("get", "value"), (0, "22\n"))
+        self.assertEqual(self.loads(), ["1", "22"])
+        write(os.path.join(self.project, "lib", "extra.py"), "CHANGED = True\n")
+        self.assertEqual(self.call("get", "value"), (0, "22\n"))
+        self.assertEqual(self.loads(), ["1", "22", "22"])
+
+    def test_exit_code(self):
+        """Test that the exit code of the command is returned"""
+        code, __ = self.call("no-such-command")
+        self.assertEqual(code, 2)
+
+    def test_stop(self):
+        """Test stopping the daemon"""
+        self.assertTrue(is_running(self.socket))
+        self.assertTrue(stop(self.socket))
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+        self.daemon.server_close()
+        self.assertFalse(is_running(self.socket))
+        self.assertFalse(os.path.exists(self.socket))
@@ -0,0 +1,114 @@
+from fruit.modules.fingerprint import StateFile, expand, fingerprint_files, code_digest
+from fruit.modules.step import Step, STATUS_OK, STATUS_CACHED
+from fruit.modules.garden import Garden
+import fruit.modules.fruitloader as fruitloader
+import tempfile
+import unittest
+import os
+
+def write(path: str, content: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as fp:
+        fp.write(content)
+
+class TestFingerprint(unittest.TestCase):
+    """Test the fingerprinting of files and incremental steps"""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        fruitloader._project = None
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_expand(self):
+        """Test the expansion of glob patterns"""
+        write("src/a.txt", "a")
+        write("src/sub/b.txt", "b")
+
+        self.assertEqual(expand(["src/*.txt"]), [os.path.join("src", "a.txt")])
+        self.assertEqual(len(expand(["src/**/*.txt", "src/a.txt"])), 2)
+        self.assertEqual(expand(["missing/*"]), [])
+
+    def test_fingerprint_files(self):
+        """Test that digests are only reused for unchanged files"""
+        write("a.txt", "a")
+        first = fingerprint_files(["a.txt"])
+
+        # The stored digest is reused, when the file is unchanged
+        fake = {"a.txt": first["a.txt"][:2] + ["stored"]}
+        self.assertEqual(fingerprint_files(["a.txt"], known=fake)["a.txt"][2], "stored")
+
+        write("a.txt", "changed")
+        self.assertNotEqual(fingerprint_files(["a.txt"], known=first)["a.txt"][2], first["a.txt"][2])
+
+    def test_code_digest(self):
+        """Test the digest of function code"""
+        def fun_a():
+            return 1
+
+        def fun_b():
+            return 2
+
+        self.assertEqual(code_digest(fun_a), code_digest(fun_a))
+        self.assertNotEqual(code_digest(fun_a), code_digest(fun_b))
+
+    def test_state_file(self):
+        """Test the persistence of the state file"""
+        state = StateFile(os.path.join(".fruit", "test.json"))
+        state.set("key", {"value": 1})
+        state.save()
+
+        self.assertEqual(StateFile(os.path.join(".fruit", "test.json")).get("key"), {"value": 1})
+
+    def test_incremental_step(self):
+        """Test that up to date steps are not executed"""
+        calls = []
+
+        def build():
+            calls.append(1)
+            write("out/a.txt", "built")
+
+        write("src/a.txt", "a")
+
+        def run():
+            stp = Step(build, "build", inputs=["src/*.txt"], outputs=["out/*.txt"], cache=False)
+            stp()
+            return stp.status
+
+        self.assertEqual(run(), STATUS_OK)
+        self.assertEqual(run(), STATUS_CACHED)
+        self.assertEqual(len(calls), 1)
+
+        # Changed inputs
+        write("src/a.txt", "b")
+        self.assertEqual(run(), STATUS_OK)
+
+        # Removed outputs
+        os.remove("out/a.txt")
+        self.assertEqual(run(), STATUS_OK)
+        self.assertEqual(run(), STATUS_CACHED)
+        self.assertEqual(len(calls), 3)
+
+    def test_project_state(self):
+        """Test that the state is stored in the project of the loaded configuration"""
+        write(os.path.join("project", "fruitconfig.py"), "")
+        write(os.path.join("other", ".fruit", "__init__.py"), "")
+        self.assertEqual(fruitloader.project_directory(os.path.join("other", ".fruit", "__init__.py")),
+                         os.path.abspath("other"))
+
+        try:
+            fruitloader.load("project")
+        finally:
+            Garden().clear()
+        Step(lambda: None, "build", inputs=["*.txt"], cache=False)()
+
+        self.assertEqual(fruitloader.state_file(), os.path.abspath(os.path.join("project", ".fruit", "state.json")))
+        state = StateFile.open(fruitloader.state_file())
+        self.assertIsNotNone(state.get("build"))
+        state.save()
+        self.assertTrue(os.path.isfile(os.path.join("project", ".fruit", "state.json")))
+        self.assertFalse(os.path.exists(".fruit"))
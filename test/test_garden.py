@@ -0,0 +1,180 @@
+from fruit.modules.garden import Garden
+from fruit.modules.target import Target
+from fruit.modules.provider import Provider
+from fruit.modules.step import StepDescriptor
+import fruit.modules.console as console
+import contextvars
+import contextlib
+import io
+from unittest import mock
+import threading
+import unittest
+import asyncio
+
+def fun():
+    pass
+
+def create_garden() -> Garden:
+    """Create a garden independent of the singleton instance"""
+    garden = object.__new__(Garden)
+    garden.__init__()
+    return garden
+
+class TestGarden(unittest.TestCase):
+    """Test the registry of the fruit garden"""
+
+    def test_lookup(self):
+        """Test the lookup of targets and providers by their names"""
+        garden = create_garden()
+        lint = Target(fun, "lint")
+        garden.add_target(lint)
+        garden.add_provider(Provider("version", "Version", lambda: "1.0"))
+
+        self.assertIs(garden.get_target("lint"), lint)
+        self.assertEqual(garden.run_provider("version"), "1.0")
+        self.assertEqual([trg.name for trg in garden.get_targets()], ["lint"])
+
+        with self.assertRaises(ValueError):
+            garden.get_target("test")
+        with self.assertRaises(ValueError):
+            garden.run_provider("date")
+
+    def test_duplicates(self):
+        """Test that names can only be registered once"""
+        garden = create_garden()
+        garden.add_target(Target(fun, "lint"))
+        garden.add_provider(Provider("version", "Version", lambda: "1.0"))
+
+        with self.assertRaises(ValueError):
+            garden.add_target(Target(fun, "lint"))
+        with self.assertRaises(ValueError):
+            garden.add_provider(Provider("version", "Version", lambda: "2.0"))
+
+    def test_select(self):
+        """Test the selection of targets by names, glob patterns and tags"""
+        garden = create_garden()
+        for each_name, each_tags in [("lint", []), ("test-unit", []), ("test-e2e", ["slow"]), ("docs", ["slow", "docs"])]:
+            garden.add_target(Target(fun, each_name, tags=each_tags))
+
+        self.assertEqual(garden.select_targets("lint"), ["lint"])
+        self.assertEqual(garden.select_targets("test-*"), ["test-unit", "test-e2e"])
+        self.assertEqual(garden.select_targets("@tag:slow"), ["test-e2e", "docs"])
+        self.assertEqual(garden.select_targets("docs", "@tag:slow", "test-?2?"), ["docs", "test-e2e"])
+
+        with self.assertRaises(ValueError):
+            garden.select_targets("build-*")
+        with self.assertRaises(ValueError):
+            garden.select_targets("@tag:fast")
+        with self.assertRaises(ValueError):
+            garden.select_targets("build")
+
+    def test_summary(self):
+        """Test that targets made in parallel print a single summary of every step"""
+        barrier = threading.Barrier(2)
+        step = StepDescriptor(lambda: barrier.wait(5), "wait")
+        garden = create_garden()
+        garden.add_target(Target(lambda: step(), "first"))
+        garden.add_target(Target(lambda: step(), "second"))
+        garden.add_target(Target(fun, "release", depends=["first", "second"]))
+
+        pure = Garden().options['pure']
+        Garden().options['pure'] = True
+        out = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(out):
+                garden.make_multiple("release", jobs=2)
+                console.flush()
+            output = out.getvalue()
+
+            with contextlib.redirect_stdout(io.StringIO()) as selected:
+                garden.make_multiple("first", "second", jobs=2)
+                console.flush()
+        finally:
+            Garden().options['pure'] = pure
+
+        self.assertEqual(output.count("Summary of target"), 1)
+        self.assertIn("Summary of target 'release':", output)
+        self.assertNotIn("Unknown", output)
+        # The summary of multiple selected targets is titled with all of them
+        self.assertIn("Summary of targets 'first', 'second':", selected.getvalue())
+        self.assertIn("Targets 'first', 'second' were successful!", selected.getvalue())
+
+    def test_unwritable_state(self):
+        """Test that failing to save the state or to clean up the cache only warns"""
+        garden = create_garden()
+        garden.options['pure'] = True
+        garden.add_target(Target(fun, "lint"))
+
+        with mock.patch('fruit.modules.garden.StateFile.save_all', side_effect=PermissionError("read-only")), \
+             mock.patch('fruit.modules.garden.ArtifactCache.default', side_effect=OSError("no space")), \
+             mock.patch('fruit.modules.console.warning') as warning:
+            garden.make_multiple("lint")
+
+        self.assertEqual(warning.call_count, 2)
+        self.assertIn("read-only", warning.call_args_list[0][0][0])
+        self.assertIn("no space", warning.call_args_list[1][0][0])
+
+
+class TestExecutionContext(unittest.TestCase):
+    """Test the nesting of the steps executed by threads and asyncio tasks"""
+
+    def setUp(self):
+        self.garden = create_garden()
+        self.garden.options['pure'] = True
+
+    def steps(self) -> dict:
+        """Full names of the recorded steps and the full names of their parents"""
+        rows = list(self.garden.records.rows())
+        names = {row.id: row.fullname for row in rows}
+        return {row.fullname: names.get(row.parent) for row in rows}
+
+    def test_threads(self):
+        """Test that steps running at the same time in threads do not share their nesting"""
+        barrier = threading.Barrier(2)
+        inner = StepDescriptor(lambda: barrier.wait(5), "inner")
+        outers = [StepDescriptor(lambda: inner(), name) for name in ("a", "b")]
+
+        threads = [threading.Thread(target=each) for each in outers]
+        for each in threads:
+            each.start()
+        for each in threads:
+            each.join()
+
+        self.assertEqual(self.steps(), {"a": None, "b": None, "a :: inner": "a", "b :: inner": "b"})
+
+    def test_copied_context(self):
+        """Test that threads and tasks started with a copy of the context continue the nesting"""
+        inner = StepDescriptor(lambda: None, "inner")
+
+        async def gather():
+            await asyncio.gather(asyncio.to_thread(inner), asyncio.create_task(asyncio.to_thread(inner)))
+
+        def run_thread():
+            context = contextvars.copy_context()
+            thread = threading.Thread(target=context.run, args=(inner,))
+            thread.start()
+            thread.join()
+
+        StepDescriptor(lambda: asyncio.run(gather()), "tasks")()
+        StepDescriptor(run_thread, "thread")()
+
+        rows = [(row.fullname, row.parent) for row in self.garden.records.rows()]
+        self.assertEqual(sorted(name for name, __ in rows),
+                         ["tasks", "tasks :: inner", "tasks :: inner", "thread", "thread :: inner"])
+        self.assertEqual(self.steps()["thread :: inner"], "thread")
+
+    def test_caught_exception(self):
+        """Test that a step interrupted by a caught exception does not stay active"""
+        def broken():
+            raise RuntimeError("broken")
+
+        def outer():
+            try:
+                StepDescriptor(broken, "broken")()
+            except RuntimeError:
+                pass
+            StepDescriptor(lambda: None, "after")()
+
+        StepDescriptor(outer, "outer")()
+        StepDescriptor(lambda: None, "next")()
+        self.assertEqual(self.steps(), {"outer": None, "outer :: broken": "outer", "outer :: after": "outer", "next": None})
@@ -0,0 +1,95 @@
+from fruit.modules.lifecycle import LifecycleBus, STEP_START, STEP_END, STEP_SKIP
+import threading
+import unittest
+import time
+import gc
+import os
+
+# The wall-clock measurements depend on the machine, they are only checked on request
+TIMING_TESTS = os.environ.get('FRUIT_TIMING_TESTS') == '1'
+
+class Listener(object):
+    def __init__(self, calls: list):
+        self.calls = calls
+
+    def on_start(self, sender):
+        self.calls.append(sender)
+
+class TestLifecycle(unittest.TestCase):
+    """Test the lifecycle event bus"""
+
+    def test_priority(self):
+        """Test that listeners are called by priority, then by subscription order"""
+        bus = LifecycleBus()
+        calls = []
+        bus.subscribe(STEP_START, lambda sender: calls.append("a"))
+        bus.subscribe(STEP_START, lambda sender: calls.append("high"), priority=10)
+        bus.subscribe(STEP_START, lambda sender: calls.append("b"))
+        bus.subscribe(STEP_START, lambda sender: calls.append("low"), priority=-1)
+
+        bus.publish(STEP_START, sender=None)
+        self.assertEqual(calls, ["high", "a", "b", "low"])
+
+        # Other topics are independent
+        bus.publish(STEP_END, sender=None)
+        self.assertEqual(len(calls), 4)
+
+    def test_subscription(self):
+        """Test the validation of the subscriptions"""
+        bus = LifecycleBus()
+        calls = []
+        listener = bus.subscribe(STEP_SKIP, lambda sender, exception: calls.append(exception))
+
+        with self.assertRaises(ValueError):
+            bus.subscribe(STEP_SKIP, listener)
+        with self.assertRaises(ValueError):
+            bus.subscribe("step-unknown", listener)
+        with self.assertRaises(TypeError):
+            bus.subscribe(STEP_SKIP, lambda sender: None)
+
+        bus.publish(STEP_SKIP, sender=None, exception="reason")
+        bus.unsubscribe(STEP_SKIP, listener)
+        bus.publish(STEP_SKIP, sender=None, exception="again")
+        self.assertEqual(calls, ["reason"])
+
+    def test_weak(self):
+        """Test that weakly referenced listeners are removed with their objects"""
+        bus = LifecycleBus()
+        calls = []
+        listener = Listener(calls)
+        bus.subscribe(STEP_START, listener.on_start, weak=True)
+
+        bus.publish(STEP_START, sender=1)
+        del listener
+        gc.collect()
+        bus.publish(STEP_START, sender=2)
+
+        self.assertEqual(calls, [1])
+
+    def test_asynchronous(self):
+        """Test that asynchronous listeners are called from the worker thread"""
+        bus = LifecycleBus()
+        threads = []
+        bus.subscribe(STEP_END, lambda sender: threads.append(threading.current_thread()), asynchronous=True)
+
+        for each in range(10):
+            bus.publish(STEP_END, sender=each)
+        bus.flush()
+
+        self.assertEqual(len(threads), 10)
+        self.assertNotIn(threading.current_thread(), threads)
+
+    @unittest.skipUnless(TIMING_TESTS, "The timing tests are enabled with FRUIT_TIMING_TESTS=1")
+    def test_dispatch_cost(self):
+        """Test that the dispatch cost per listener does not grow with the number of listeners"""
+        def cost(listeners: int) -> float:
+            bus = LifecycleBus()
+            for __ in range(listeners):
+                bus.subscribe(STEP_START, lambda sender: None)
+            tic = time.perf_counter()
+            for __ in range(200):
+                bus.publish(STEP_START, sender=None)
+            return (time.perf_counter() - tic) / listeners
+
+        cost(10) # Warm up
+        self.assertLess(cost(1000), cost(10) * 3)
@@ -0,0 +1,48 @@
+from fruit.modules.memprofile import MemoryProfiler, LEAK_THRESHOLD
+from fruit.modules.step import StepDescriptor
+import tracemalloc
+import unittest
+
+KEPT = []
+
+def temporary():
+    data = bytearray(8 * LEAK_THRESHOLD)
+    del data
+
+def leak():
+    KEPT.append(bytearray(4 * LEAK_THRESHOLD))
+
+class TestMemoryProfiler(unittest.TestCase):
+    """Test the memory profiling of the steps"""
+
+    def tearDown(self):
+        KEPT.clear()
+
+    def test_memory(self):
+        """Test the peak and the live memory of nested steps"""
+        temporary_step = StepDescriptor(temporary, "temporary")
+        leak_step = StepDescriptor(leak, "leak")
+        outer_step = StepDescriptor(lambda: (temporary_step(), leak_step()), "outer")
+
+        with MemoryProfiler() as profiler:
+            outer_step()
+            temporary_step()
+        self.assertFalse(tracemalloc.is_tracing())
+
+        memory = {each.fullname: each for each in profiler.results()}
+        self.assertEqual(sum(each.count for each in memory.values()), 4)
+
+        for each in memory.values():
+            if each.fullname.endswith("temporary"):
+                self.assertGreater(each.peak, 7 * LEAK_THRESHOLD)
+                self.assertFalse(each.leaked)
+            elif each.fullname.endswith("leak"):
+                self.assertGreater(each.live, 3 * LEAK_THRESHOLD)
+                self.assertTrue(each.leaked)
+                line, size = each.top()[0]
+                self.assertIn("test_memprofile.py", line)
+                self.assertGreater(size, 3 * LEAK_THRESHOLD)
+            else:
+                # The callers include the peaks and the leaks of the nested steps
+                self.assertGreater(each.peak, 7 * LEAK_THRESHOLD)
+                self.assertTrue(each.leaked)
@@ -0,0 +1,101 @@
+from fruit.api.parallel import map as fruit_map
+import fruit.api.parallel as parallel
+from fruit.api.api import skip, fail, abort
+from fruit.api.decorators import step
+from fruit.modules.garden import Garden
+from fruit.modules.step import AbortStepSignal, STATUS_OK, STATUS_SKIPPED, STATUS_ERR
+import threading
+import unittest
+import time
+import os
+
+@step()
+def square(number: int) -> int:
+    if number == 2:
+        skip("two")
+    if number == 3:
+        fail("three")
+    return number * number
+
+@step()
+def outer() -> list:
+    return fruit_map(square, range(5), workers=3)
+
+@step()
+def stop(number: int) -> int:
+    time.sleep(0.01 * number)
+    if number in (3, 1):
+        abort(f"abort {number}")
+    return number
+
+@step()
+def process_id(number: int) -> int:
+    return os.getpid()
+
+class TestMap(unittest.TestCase):
+    """Test the parallel calls of a step"""
+
+    def setUp(self):
+        self.pure = Garden().options['pure']
+        Garden().options['pure'] = True
+        Garden().reset_records()
+
+    def tearDown(self):
+        Garden().options['pure'] = self.pure
+        Garden().reset_records()
+
+    def test_threads(self):
+        """Test the results and the records of the calls"""
+        self.assertEqual(outer(), [0, 1, None, None, 16])
+
+        # The calls are recorded under the name of the step
+        rows = list(Garden().records.rows())
+        parent = [row for row in rows if row.fullname == "outer"][0]
+        calls = [row for row in rows if row is not parent]
+        self.assertEqual([row.fullname for row in calls], ["outer :: square"] * 5)
+        self.assertTrue(all(row.parent == parent.id for row in calls))
+        self.assertEqual(sorted(row.status for row in calls),
+                         sorted([STATUS_OK, STATUS_OK, STATUS_SKIPPED, STATUS_ERR, STATUS_OK]))
+
+    def test_abort(self):
+        """Test that the exception of the first failing item is raised"""
+        with self.assertRaises(AbortStepSignal) as ctx:
+            fruit_map(stop, range(20), workers=2)
+        self.assertEqual(str(ctx.exception), "abort 1")
+        # The calls, that were not started yet, are cancelled
+        self.assertLess(len(list(Garden().records.rows())), 20)
+
+    def test_functions(self):
+        """Test that plain functions are called as steps"""
+        def name(number: int) -> str:
+            return threading.current_thread().name
+
+        self.assertTrue(all(each.startswith("fruit-map") for each in fruit_map(name, range(4), workers=2)))
+        self.assertEqual({row.fullname for row in Garden().records.rows()}, {"name"})
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "The process mode requires forking")
+    def test_processes(self):
+        """Test that the calls are executed by worker processes"""
+        pids = fruit_map(process_id, range(4), workers=2, mode='process')
+        self.assertEqual(len(pids), 4)
+        self.assertNotIn(os.getpid(), pids)
+        self.assertEqual(len(list(Garden().records.rows())), 4)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "The process mode requires forking")
+    def test_forked(self):
+        """Test that the workers are forked by the calling thread and the functions are released"""
+        @step()
+        def forked_by(number: int) -> str:
+            return threading.current_thread().name
+
+        caller = threading.current_thread().name
+        self.assertEqual(fruit_map(forked_by, range(4), workers=2, mode='process'), [caller] * 4)
+        self.assertEqual(parallel._functions, {})
+
+    def test_arguments(self):
+        """Test the validation of the arguments"""
+        self.assertEqual(fruit_map(square, []), [])
+        with self.assertRaises(ValueError):
+            fruit_map(square, range(3), workers=0)
+        with self.assertRaises(ValueError):
+            fruit_map(square, range(3), mode='fiber')
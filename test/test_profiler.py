@@ -0,0 +1,75 @@
+from fruit.modules.profiler import StepProfiler, MERGED_PROFILE, SAMPLES_FILE
+from fruit.modules.target import Target
+from fruit.modules.step import StepDescriptor
+import tempfile
+import unittest
+import pstats
+import time
+import os
+
+def hot():
+    return sum(range(1000))
+
+def inner():
+    hot()
+
+def spin():
+    end = time.perf_counter() + 0.2
+    while time.perf_counter() < end:
+        hot()
+
+def functions(path: str) -> set:
+    """Names of the profiled functions"""
+    return {func for __, __, func in pstats.Stats(path).stats}
+
+class TestProfiler(unittest.TestCase):
+    """Test the profiling of the targets and steps"""
+
+    def test_deterministic(self):
+        """Test the profiles of the nested steps"""
+        inner_step = StepDescriptor(inner, "inner")
+        outer_step = StepDescriptor(lambda: inner_step(), "outer")
+        target = Target(lambda: (outer_step(), outer_step()), "target")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with StepProfiler(tmp):
+                target()
+
+            files = set(os.listdir(tmp))
+            self.assertIn(MERGED_PROFILE, files)
+            self.assertIn("target-target.prof", files)
+            outer_file = next(each for each in files if each.startswith("step-outer") and "inner" not in each)
+            inner_file = next(each for each in files if each.startswith("step-") and "inner" in each)
+
+            # The nested profiles are included in the profiles of the callers
+            self.assertIn("hot", functions(os.path.join(tmp, inner_file)))
+            self.assertIn("hot", functions(os.path.join(tmp, outer_file)))
+            self.assertIn("hot", functions(os.path.join(tmp, MERGED_PROFILE)))
+
+            # Both executions of the steps are aggregated
+            hot_calls = [stat[1] for key, stat in pstats.Stats(os.path.join(tmp, inner_file)).stats.items()
+                         if key[2] == "hot"]
+            self.assertEqual(hot_calls, [2])
+
+    def test_sampling(self):
+        """Test the sampled stacks of a long step"""
+        step = StepDescriptor(spin, "spin")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with StepProfiler(tmp, interval=0.001):
+                step()
+
+            with open(os.path.join(tmp, SAMPLES_FILE), 'r') as fp:
+                lines = fp.read().splitlines()
+
+        self.assertGreater(len(lines), 0)
+        for each in lines:
+            stack, count = each.rsplit(" ", 1)
+            self.assertTrue(stack.startswith("spin;"))
+            self.assertGreater(int(count), 0)
+        self.assertTrue(any("spin (test_profiler.py" in each for each in lines))
+
+    def test_interval(self):
+        """Test the validation of the sampling interval"""
+        with self.assertRaises(ValueError):
+            StepProfiler("profile", interval=0)
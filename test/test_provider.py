@@ -1,7 +1,7 @@
 from fruit.modules.provider import Provider
 import unittest
 
-def test_fcn(arg: str):
+def provider_fcn(arg: str):
     return arg
 
 class TestProvider(unittest.TestCase):
@@ -11,46 +11,46 @@ class TestProvider(unittest.TestCase):
         """Test the initializer of the provider class"""
 
         self.assertEqual(
-            Provider("Name", "Description", test_fcn).name,
+            Provider("Name", "Description", provider_fcn).name,
             "Name"
         )
 
         self.assertEqual(
-            Provider("Name", "Description", test_fcn).help,
+            Provider("Name", "Description", provider_fcn).help,
             "Description"
         )
 
         # Test value checking
         with self.assertRaises(ValueError):
-            Provider("name", "", test_fcn)
+            Provider("name", "", provider_fcn)
         with self.assertRaises(ValueError):
-            Provider("", "help", test_fcn)
+            Provider("", "help", provider_fcn)
         with self.assertRaises(ValueError):
-            Provider("", "", test_fcn)
+            Provider("", "", provider_fcn)
         
         # Test initializer errors for None
         with self.assertRaises(TypeError):
-            Provider(None, "x", test_fcn)
+            Provider(None, "x", provider_fcn)
         with self.assertRaises(TypeError):
-            Provider("x", None, test_fcn)
+            Provider("x", None, provider_fcn)
         with self.assertRaises(TypeError):
-            Provider(None, None, test_fcn)
+            Provider(None, None, provider_fcn)
         
         # Test initializer errors for Numbers
         with self.assertRaises(TypeError):
-            Provider(10, "x", test_fcn)
+            Provider(10, "x", provider_fcn)
         with self.assertRaises(TypeError):
-            Provider("x", 10, test_fcn)
+            Provider("x", 10, provider_fcn)
         with self.assertRaises(TypeError):
-            Provider(10, 10, test_fcn)
+            Provider(10, 10, provider_fcn)
         
         # Test initializer errors for lists
         with self.assertRaises(TypeError):
-            Provider([], "x", test_fcn)
+            Provider([], "x", provider_fcn)
         with self.assertRaises(TypeError):
-            Provider("x", [], test_fcn)
+            Provider("x", [], provider_fcn)
         with self.assertRaises(TypeError):
-            Provider([], [], test_fcn)
+            Provider([], [], provider_fcn)
 
         # Test the callable parameter
         with self.assertRaises(TypeError):
@@ -66,22 +66,82 @@ class TestProvider(unittest.TestCase):
         """Test the provider function to always return a string"""
         
         self.assertEqual(
-            Provider("name", "help", test_fcn)("FCN"),
+            Provider("name", "help", provider_fcn)("FCN"),
             "FCN"
         )
 
         self.assertEqual(
-            Provider("name", "help", test_fcn)(123),
+            Provider("name", "help", provider_fcn)(123),
             "123"
         )
 
         self.assertEqual(
-            Provider("name", "help", test_fcn)([1,2,3]),
+            Provider("name", "help", provider_fcn)([1,2,3]),
             "[1, 2, 3]"
         )
 
         self.assertEqual(
-            Provider("name", "help", test_fcn)(['1','2','3']),
+            Provider("name", "help", provider_fcn)(['1','2','3']),
             "['1', '2', '3']"
         )
 
+
+    def test_provider_cache(self):
+        """Test the memoization of the provided values"""
+        import os
+        import tempfile
+        from unittest import mock
+        import fruit.modules.provider as provider_module
+
+        calls = []
+        def counter(arg: str = "x"):
+            calls.append(arg)
+            return len(calls)
+
+        # Uncached providers are called every time
+        prov = Provider("name", "help", counter)
+        self.assertEqual([prov(), prov()], ["1", "2"])
+
+        # Run cache with arguments
+        calls.clear()
+        prov = Provider("name", "help", counter, cache='run')
+        self.assertEqual([prov(), prov(), prov("y"), prov("y")], ["1", "1", "2", "2"])
+        prov.invalidate()
+        self.assertEqual(prov(), "3")
+
+        # Time to live
+        calls.clear()
+        prov = Provider("name", "help", counter, cache='run', ttl=10)
+        self.assertEqual(prov(), "1")
+        with mock.patch('time.time', return_value=provider_module.time.time() + 20):
+            self.assertEqual(prov(), "2")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # File dependencies
+            calls.clear()
+            dep = os.path.join(tmp, "dep.txt")
+            with open(dep, 'w') as fp:
+                fp.write("a")
+            prov = Provider("name", "help", counter, cache='run', depends_on=[dep])
+            self.assertEqual([prov(), prov()], ["1", "1"])
+            # Unchanged files are not hashed again
+            with mock.patch('fruit.modules.fingerprint.hash_file', side_effect=AssertionError("hashed")):
+                self.assertEqual(prov(), "1")
+            with open(dep, 'w') as fp:
+                fp.write("bb")
+            self.assertEqual(prov(), "2")
+
+            # Persistent cache shared by the provider objects
+            calls.clear()
+            with mock.patch.object(provider_module, 'PROVIDER_CACHE_FILE', os.path.join(tmp, "providers.json")):
+                self.assertEqual(Provider("disk", "help", counter, cache='disk')(), "1")
+                self.assertTrue(os.path.isfile(os.path.join(tmp, "providers.json")))
+                self.assertEqual(Provider("disk", "help", counter, cache='disk')(), "1")
+                self.assertEqual(Provider("disk", "help", provider_fcn, cache='disk')("changed"), "changed")
+
+        with self.assertRaises(ValueError):
+            Provider("x", "x", provider_fcn, cache='always')
+        with self.assertRaises(ValueError):
+            Provider("x", "x", provider_fcn, ttl=0)
+        with self.assertRaises(TypeError):
+            Provider("x", "x", provider_fcn, depends_on="file.txt")
@@ -0,0 +1,91 @@
+from fruit.modules.records import StepRecords, parse_retention, NO_PARENT, RESERVOIR_SIZE
+from fruit.modules.step import STATUS_OK, STATUS_ERR, STATUS_UNKNOWN
+import unittest
+
+def record(records: StepRecords, name: str, status: int = STATUS_OK, duration: float = 1.0, parent: int = NO_PARENT) -> int:
+    """Record a finished step execution"""
+    rec = records.begin(name, 0.0, parent)
+    records.end(rec, status, duration)
+    return rec
+
+class TestRecords(unittest.TestCase):
+    """Test the store of the step executions"""
+
+    def test_full(self):
+        """Test that every execution is stored with the full retention"""
+        records = StepRecords()
+        outer = records.begin("outer", 10.0)
+        record(records, "outer :: inner", parent=outer)
+        records.end(outer, STATUS_ERR, 2.0)
+
+        rows = list(records.rows())
+        self.assertEqual([(r.fullname, r.status, r.time, r.parent) for r in rows], [
+            ("outer", STATUS_ERR, 2.0, NO_PARENT),
+            ("outer :: inner", STATUS_OK, 1.0, outer),
+        ])
+        self.assertEqual(rows[0].start, 10.0)
+        self.assertEqual(records.dropped, 0)
+
+    def test_last(self):
+        """Test that only the last executions are stored"""
+        records = StepRecords("last:3")
+        for each in range(10):
+            record(records, f"step{each % 4}", duration=float(each))
+
+        self.assertEqual(records.count, 10)
+        self.assertEqual(records.dropped, 7)
+        self.assertEqual([(r.id, r.fullname, r.time) for r in records.rows()], [
+            (7, "step3", 7.0), (8, "step0", 8.0), (9, "step1", 9.0)
+        ])
+
+        # Running steps are finished, even when their row was dropped
+        running = records.begin("long", 0.0)
+        for each in range(5):
+            record(records, "short")
+        records.end(running, STATUS_OK, 100.0)
+        self.assertEqual([a.max for a in records.aggregates() if a.fullname == "long"], [100.0])
+
+    def test_aggregate(self):
+        """Test the aggregates of the executions"""
+        records = StepRecords("aggregate")
+        record(records, "a", duration=1.0)
+        record(records, "b", duration=5.0)
+        record(records, "a", STATUS_ERR, duration=3.0)
+        unfinished = records.begin("c", 0.0)
+
+        self.assertEqual(list(records.rows()), [])
+        self.assertEqual(records.count, 4)
+
+        aggr_a, aggr_b = records.aggregates()
+        self.assertEqual((aggr_a.fullname, aggr_a.count, aggr_a.total, aggr_a.min, aggr_a.max), ("a", 2, 4.0, 1.0, 3.0))
+        self.assertEqual(aggr_a.statuses, {STATUS_OK: 1, STATUS_ERR: 1})
+        self.assertEqual(aggr_b.count, 1)
+
+        records.end(unfinished, STATUS_UNKNOWN, 0.0)
+        self.assertEqual(len(records.aggregates()), 3)
+
+    def test_retention(self):
+        """Test the parsing of the retention policies"""
+        self.assertEqual(parse_retention("full"), ("full", None))
+        self.assertEqual(parse_retention("aggregate"), ("aggregate", 0))
+        self.assertEqual(parse_retention("last:100"), ("last", 100))
+
+        for each in ["", "last", "last:0", "last:-1", "last:x", "all"]:
+            with self.assertRaises(ValueError):
+                StepRecords(each)
+
+    def test_percentiles(self):
+        """Test the percentiles of the execution times"""
+        records = StepRecords("aggregate")
+        for each in range(1, 101):
+            record(records, "step", duration=float(each))
+
+        aggr, = records.aggregates()
+        self.assertEqual((aggr.min, aggr.percentile(50), aggr.percentile(95), aggr.max), (1.0, 50.0, 95.0, 100.0))
+
+        # The sample of large runs is bounded
+        for each in range(RESERVOIR_SIZE * 3):
+            record(records, "many", duration=1.0)
+        aggr = records.aggregates()[1]
+        self.assertEqual(len(aggr.samples), RESERVOIR_SIZE)
+        self.assertEqual(aggr.percentile(95), 1.0)
@@ -0,0 +1,79 @@
+from fruit.modules.resources import ResourceMonitor, ResourceUsage, is_supported
+from fruit.modules.records import StepRecords
+from fruit.modules.step import Step, StepDescriptor, STATUS_OK
+from unittest import mock
+import subprocess
+import itertools
+import types
+import unittest
+import sys
+
+def spin():
+    sum(range(2_000_000))
+
+def child():
+    subprocess.run([sys.executable, "-c", "x = bytearray(64 * 1024 * 1024); sum(range(2_000_000))"], check=True)
+
+@unittest.skipUnless(is_supported(), "getrusage() is not available")
+class TestResources(unittest.TestCase):
+    """Test the resource accounting of the steps"""
+
+    def test_monitor(self):
+        """Test the usage of the step itself and of its child processes"""
+        spun = Step(StepDescriptor(spin, "spin"))
+        spawned = Step(StepDescriptor(child, "child"))
+        unmeasured = Step(StepDescriptor(spin, "spin"))
+
+        with ResourceMonitor():
+            spun()
+            spawned()
+        # Steps after the monitoring are not measured
+        unmeasured()
+
+        self.assertGreater(spun.usage.cpu, 0)
+        self.assertGreater(spawned.usage.cpu, 0)
+        self.assertGreaterEqual(spawned.usage.max_rss, 64 * 1024 * 1024)
+        self.assertIsNone(unmeasured.usage)
+
+    def test_interleaved(self):
+        """Test that steps finishing in another order than they started are measured from their own start"""
+        counter = itertools.count(1)
+
+        def getrusage(who):
+            value = next(counter)
+            return types.SimpleNamespace(ru_utime=value, ru_stime=0, ru_maxrss=0, ru_inblock=0, ru_oublock=0)
+
+        first = Step(StepDescriptor(spin, "first"))
+        second = Step(StepDescriptor(spin, "second"))
+        monitor = ResourceMonitor()
+        with mock.patch('fruit.modules.resources.resource.getrusage', side_effect=getrusage):
+            monitor.on_step_start(first)    # 1, 2
+            monitor.on_step_start(second)   # 3, 4
+            monitor.on_step_end(first)      # 5, 6
+            monitor.on_step_abort(second, None) # 7, 8
+
+        self.assertEqual(first.usage.cpu_user, (5 - 1) + (6 - 2))
+        self.assertEqual(second.usage.cpu_user, (7 - 3) + (8 - 4))
+
+    def test_records(self):
+        """Test that the usage is stored and aggregated"""
+        records = StepRecords(resources=True)
+        for each_cpu, each_rss in [(1.0, 100), (2.0, 300)]:
+            rec = records.begin("step", 0.0)
+            records.end(rec, STATUS_OK, 1.0, ResourceUsage(each_cpu, 0.5, each_rss, 1, 2))
+
+        self.assertEqual([(r.usage.cpu, r.usage.max_rss) for r in records.rows()], [(1.5, 100), (2.5, 300)])
+
+        aggr, = records.aggregates()
+        self.assertEqual((aggr.usage.cpu, aggr.usage.max_rss, aggr.usage.read_blocks), (4.0, 300, 2))
+
+        report = records.to_dict()
+        self.assertEqual(report['rows'][0]['status'], "OK")
+        self.assertEqual(report['rows'][1]['usage']['write_blocks'], 2)
+        self.assertEqual(report['aggregates'][0]['usage']['cpu_user'], 3.0)
+
+        # Without resources, no usage is stored
+        records = StepRecords()
+        rec = records.begin("step", 0.0)
+        records.end(rec, STATUS_OK, 1.0, ResourceUsage(1.0))
+        self.assertIsNone(next(records.rows()).usage)
@@ -0,0 +1,114 @@
+from fruit.modules import scanner
+import tempfile
+import unittest
+import os
+
+class TestScanner(unittest.TestCase):
+    """Test the static scanning of fruit configurations"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = scanner.INDEX_CACHE_DIR
+        scanner.INDEX_CACHE_DIR = os.path.join(self.tmp.name, "cache")
+
+    def tearDown(self):
+        scanner.INDEX_CACHE_DIR = self.cache_dir
+        self.tmp.cleanup()
+
+    def write(self, name: str, content: str) -> str:
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as fp:
+            fp.write(content)
+        return path
+
+    def test_literal_config(self):
+        """Test the scan of a configuration with literal decorator arguments"""
+        path = self.write("fruitconfig.py", "\n".join([
+            "import fruit",
+            "from fruit import provider as prov",
+            "import expensive_module_that_does_not_exist",
+            "",
+            "@fruit.step(name='Compile')",
+            "def compile(): pass",
+            "",
+            "@fruit.target('build', 'Build the project', depends=['lint'])",
+            "def make_build(): compile()",
+            "",
+            "@fruit.target()",
+            "def lint(): pass",
+            "",
+            "@prov()",
+            "def version():",
+            "    '''Project version'''",
+            "    return '1.0'",
+        ]))
+
+        index = scanner.scan_config(path)
+        self.assertFalse(index.dynamic)
+        self.assertEqual([(t.name, t.help) for t in index.targets], [('build', 'Build the project'), ('lint', '')])
+        self.assertEqual(index.targets[0].options['depends'], ['lint'])
+        self.assertEqual([s.name for s in index.steps], ['Compile'])
+        self.assertEqual([(p.name, p.help) for p in index.providers], [('version', 'Project version')])
+
+    def test_fruit_imports(self):
+        """Test the decorators referenced through the modules of the fruit api"""
+        path = self.write("fruitconfig.py", "\n".join([
+            "import fruit.api.decorators",
+            "import fruit.api.decorators as dec",
+            "from fruit.api import decorators",
+            "from fruit import shell, api",
+            "",
+            "@fruit.api.decorators.target()",
+            "def a(): pass",
+            "",
+            "@dec.step()",
+            "def b(): pass",
+            "",
+            "@decorators.provider()",
+            "def c(): pass",
+            "",
+            "@api.decorators.target()",
+            "def d(): pass",
+        ]))
+
+        index = scanner.scan_config(path)
+        self.assertFalse(index.dynamic)
+        self.assertEqual([(e.kind, e.name) for e in index.entries],
+                         [('target', 'a'), ('step', 'b'), ('provider', 'c'), ('target', 'd')])
+
+    def test_helper_module(self):
+        """Test that imported helper modules of the configuration are scanned"""
+        self.write("helpers.py", "import fruit\n@fruit.target(name='shared')\ndef shared(): pass\n")
+        path = self.write("fruitconfig.py", "from helpers import shared\n")
+
+        index = scanner.scan_config(path)
+        self.assertEqual([t.name for t in index.targets], ['shared'])
+        self.assertEqual(len(index.files), 2)
+
+    def test_dynamic_config(self):
+        """Test the detection of dynamically registered objects"""
+        dynamic_sources = [
+            "import fruit\nNAME = 'x'\n@fruit.target(name=NAME)\ndef x(): pass\n",
+            "import fruit\nfor i in range(3):\n    @fruit.target(name=str(i))\n    def x(): pass\n",
+            "import fruit\ndef x(): pass\nfruit.target()(x)\n",
+            "import sys\nsys.path.append(sys.argv[0])\n",
+            "from fruit import *\n@target()\ndef x(): pass\n",
+            "from fruit.api.decorators import *\n",
+            "from fruit.modules.garden import Garden\n",
+            "import fruit.modules.target as trg\n",
+            "from fruit import modules\n",
+        ]
+
+        for each_source in dynamic_sources:
+            path = self.write("fruitconfig.py", each_source)
+            self.assertTrue(scanner.scan_config(path).dynamic, each_source)
+
+    def test_cache(self):
+        """Test that the cached index is used until a scanned file changes"""
+        path = self.write("fruitconfig.py", "import fruit\n@fruit.target()\ndef a(): pass\n")
+        self.assertEqual([t.name for t in scanner.load_index(path).targets], ['a'])
+        self.assertTrue(os.path.exists(scanner.index_cache_path(path)))
+        self.assertEqual([t.name for t in scanner.load_index(path).targets], ['a'])
+
+        self.write("fruitconfig.py", "import fruit\n@fruit.target()\ndef bb(): pass\n")
+        self.assertEqual([t.name for t in scanner.load_index(path).targets], ['bb'])
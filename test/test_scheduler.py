@@ -0,0 +1,96 @@
+from fruit.modules.scheduler import Scheduler
+from fruit.modules.target import Target
+import threading
+import unittest
+
+def fun():
+    pass
+
+def create_lookup(*targets):
+    """Create a target lookup function for the given targets"""
+    table = {trg.name: trg for trg in targets}
+    return lambda name: table[name]
+
+class TestScheduler(unittest.TestCase):
+    """Test the dependency based scheduling of targets"""
+
+    def test_order(self):
+        """Test that the dependencies are ordered before the targets"""
+        lookup = create_lookup(
+            Target(fun, "lint"),
+            Target(fun, "test", depends=["lint"]),
+            Target(fun, "docs"),
+            Target(fun, "package", depends=["test", "docs"]),
+        )
+
+        self.assertEqual(
+            [trg.name for trg in Scheduler(lookup, "package").order],
+            ["lint", "test", "docs", "package"]
+        )
+
+        # Each target is made only once
+        self.assertEqual(
+            [trg.name for trg in Scheduler(lookup, "lint", "package", "lint").order],
+            ["lint", "test", "docs", "package"]
+        )
+
+    def test_cycle(self):
+        """Test the detection of circular dependencies"""
+        lookup = create_lookup(
+            Target(fun, "a", depends=["b"]),
+            Target(fun, "b", depends=["a"]),
+        )
+
+        with self.assertRaises(ValueError):
+            Scheduler(lookup, "a")
+
+    def test_depends_type(self):
+        """Test the validation of the target dependencies"""
+        self.assertEqual(Target(fun, "x").depends, [])
+
+        with self.assertRaises(TypeError):
+            Target(fun, "x", depends="y")
+        with self.assertRaises(TypeError):
+            Target(fun, "x", depends=[1])
+
+    def test_parallel(self):
+        """Test that independent targets are run at the same time"""
+        barrier = threading.Barrier(2, timeout=5)
+        made = []
+
+        lookup = create_lookup(
+            Target(fun, "a"),
+            Target(fun, "b"),
+            Target(fun, "c", depends=["a", "b"]),
+        )
+
+        def make(trg):
+            if trg.name in ("a", "b"):
+                # Both targets have to arrive, otherwise the barrier breaks
+                barrier.wait()
+            made.append(trg.name)
+
+        Scheduler(lookup, "c").run(make, jobs=2)
+        self.assertEqual(made[-1], "c")
+        self.assertEqual(sorted(made), ["a", "b", "c"])
+
+    def test_failure(self):
+        """Test that the dependents of a failed target are not made"""
+        made = []
+
+        lookup = create_lookup(
+            Target(fun, "a"),
+            Target(fun, "b", depends=["a"]),
+        )
+
+        def make(trg):
+            if trg.name == "a":
+                raise RuntimeError("a failed")
+            made.append(trg.name)
+
+        schedule = Scheduler(lookup, "b")
+        with self.assertRaises(RuntimeError):
+            schedule.run(make, jobs=4)
+
+        self.assertEqual(made, [])
+        self.assertEqual(schedule.failed.name, "a")
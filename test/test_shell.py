@@ -0,0 +1,91 @@
+from fruit.api.shell import shell, shell_many, which, ShellResult
+from unittest import mock
+import subprocess
+import unittest
+import time
+import sys
+import os
+
+@unittest.skipIf(os.name != 'posix', "The test commands require a POSIX shell")
+class TestShell(unittest.TestCase):
+    """Test the execution of shell commands"""
+
+    def test_returncode(self):
+        """Test that the returncode of the command is returned"""
+        self.assertEqual(shell("true", echo=False), 0)
+        self.assertEqual(shell("exit 3", echo=False), 3)
+
+    def test_capture(self):
+        """Test the capturing of the command output"""
+        result = shell("echo out; echo err 1>&2", capture=True, echo=False)
+
+        self.assertIsInstance(result, ShellResult)
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stdout, "out")
+        self.assertEqual(result.stderr, "err")
+
+    def test_timeout(self):
+        """Test that commands are killed after the timeout"""
+        tic = time.time()
+        with self.assertRaises(TimeoutError):
+            shell("exec sleep 10", timeout=0.2, echo=False)
+        self.assertLess(time.time() - tic, 5)
+
+    def test_shell_many(self):
+        """Test the parallel execution of commands"""
+        tic = time.time()
+        results = shell_many(["sleep 0.5; echo 1", "sleep 0.5; echo 2", "exit 4"], capture=True, echo=False)
+        self.assertLess(time.time() - tic, 1.4)
+
+        self.assertEqual([r.returncode for r in results], [0, 0, 4])
+        self.assertEqual([r.stdout for r in results], ["1", "2", ""])
+
+        self.assertEqual(shell_many(["true", "exit 1"], max_parallel=1, echo=False), [0, 1])
+
+    def test_argv(self):
+        """Test the direct execution of argument lists"""
+        result = shell(["echo", "a  b", "$HOME"], capture=True, echo=False)
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stdout, "a  b $HOME")
+        self.assertEqual(result.cmd, "echo 'a  b' '$HOME'")
+
+        self.assertEqual(shell(["sh", "-c", "exit 5"], echo=False), 5)
+        self.assertEqual(shell_many([["true"], "exit 2"], echo=False), [0, 2])
+
+    def test_which(self):
+        """Test the cached lookup of executables"""
+        self.assertEqual(which("sh"), which("sh"))
+        self.assertEqual(which("/bin/sh"), "/bin/sh")
+
+        with self.assertRaises(FileNotFoundError):
+            which("fruit-executable-that-does-not-exist")
+        with self.assertRaises(FileNotFoundError):
+            shell(["fruit-executable-that-does-not-exist"], echo=False)
+
+    @unittest.skipUnless(hasattr(os, 'openpty'), "The test requires a pseudo terminal")
+    def test_terminal(self):
+        """Test that commands, that are not captured, inherit the terminal of fruit"""
+        isatty = [sys.executable, "-c", "import sys; sys.exit(0 if sys.stdout.isatty() and sys.stderr.isatty() else 1)"]
+        master, slave = os.openpty()
+        saved = [os.dup(1), os.dup(2)]
+        try:
+            os.dup2(slave, 1)
+            os.dup2(slave, 2)
+            inherited = shell(isatty)
+            captured = shell(isatty, capture=True, echo=False).returncode
+        finally:
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            for each in saved + [master, slave]:
+                os.close(each)
+
+        self.assertEqual(inherited, 0)
+        self.assertEqual(captured, 1)
+
+    @unittest.skipUnless(getattr(subprocess, '_USE_POSIX_SPAWN', False), "posix_spawn is not used by subprocess")
+    def test_posix_spawn(self):
+        """Test that argument lists are spawned without forking the fruit process"""
+        with mock.patch('os.posix_spawn', wraps=os.posix_spawn) as spawn:
+            self.assertEqual(shell(["true"], echo=False), 0)
+            self.assertEqual(shell(["true"], capture=True, echo=False).returncode, 0)
+        self.assertEqual(spawn.call_count, 2)
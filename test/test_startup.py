@@ -0,0 +1,64 @@
+import subprocess
+import unittest
+import sys
+import os
+
+# Root directory of the repository
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget of the import time of the fruit cli itself, without click (in milliseconds)
+IMPORT_BUDGET_MS = float(os.environ.get('FRUIT_IMPORT_BUDGET_MS', 30))
+
+# The wall-clock budgets depend on the machine, they are only checked on request
+TIMING_TESTS = os.environ.get('FRUIT_TIMING_TESTS') == '1'
+
+# Modules, that may only be imported by the subcommands needing them
+DEFERRED_MODULES = (
+    'tabulate',
+    'fruit.modules.garden',
+    'fruit.modules.printing',
+    'fruit.modules.fruitloader',
+    'fruit.extensions.global_providers',
+)
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    """Run a python interpreter with the repository on the python path"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable] + list(args), cwd=ROOT, env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+class TestStartup(unittest.TestCase):
+    """Test the import overhead of the fruit cli"""
+
+    def test_deferred_imports(self):
+        """Test that the cli does not import the modules of the subcommands"""
+        proc = run_python("-c", "import sys, fruit.fruit; print('\\n'.join(sys.modules))")
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+
+        modules = set(proc.stdout.split())
+        for each_module in DEFERRED_MODULES:
+            self.assertNotIn(each_module, modules)
+
+    def test_lazy_api(self):
+        """Test that the api of the fruit package is loaded on access"""
+        proc = run_python("-c", "import fruit; print(fruit.target.__module__, fruit.shell.__module__)")
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertEqual(proc.stdout.split(), ['fruit.api.decorators', 'fruit.api.shell'])
+
+    @unittest.skipUnless(TIMING_TESTS, "The timing tests are enabled with FRUIT_TIMING_TESTS=1")
+    def test_import_budget(self):
+        """Test the import time of the cli with -X importtime"""
+        proc = run_python("-X", "importtime", "-c", "import fruit.fruit")
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+
+        # Cumulative import times (us) of the top level modules
+        cumulative = {}
+        for each_line in proc.stderr.splitlines():
+            if not each_line.startswith("import time:") or "cumulative" in each_line:
+                continue
+            __, cum, name = each_line[len("import time:"):].split("|")
+            cumulative[name.strip()] = int(cum)
+
+        # The parent package and click are imported (and counted) as part of fruit.fruit
+        own_time = cumulative['fruit.fruit'] - cumulative.get('click', 0)
+        self.assertLess(own_time / 1000, IMPORT_BUDGET_MS)
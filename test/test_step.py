@@ -1,3 +1,64 @@
-from fruit.modules.step import Step
+from fruit.modules.step import Step, StepDescriptor, STATUS_OK, STATUS_SKIPPED, SkipStepSignal
+from fruit.modules import lifecycle
+import fruit.modules.console as console
+import contextlib
 import unittest
+import io
 
+def square(value: int) -> int:
+    return value * value
+
+def skip():
+    raise SkipStepSignal("Nothing to do")
+
+class TestStep(unittest.TestCase):
+    """Test the definition and the execution records of steps"""
+
+    def test_descriptor(self):
+        """Test that every call of a descriptor creates a new record"""
+        records = []
+        descriptor = StepDescriptor(square, "square", help="Square a number")
+        listener = lifecycle.subscribe(lifecycle.STEP_END, lambda sender: records.append(sender))
+        try:
+            self.assertEqual(descriptor(3), 9)
+            self.assertEqual(descriptor(4), 16)
+        finally:
+            lifecycle.unsubscribe(lifecycle.STEP_END, listener)
+
+        self.assertEqual(len(records), 2)
+        self.assertIsNot(records[0], records[1])
+        self.assertTrue(all(isinstance(rec, Step) for rec in records))
+        self.assertEqual([rec.name for rec in records], ["square", "square"])
+        self.assertEqual(records[0].help, "Square a number")
+        self.assertEqual(records[0].status, STATUS_OK)
+
+    def test_record(self):
+        """Test the step records created from functions"""
+        stp = Step(skip, "skip")
+        self.assertIsNone(stp())
+        self.assertEqual(stp.status, STATUS_SKIPPED)
+        self.assertEqual(stp.name, stp.descriptor.name)
+
+        with self.assertRaises(AttributeError):
+            stp.custom = 1
+
+        with self.assertRaises(TypeError):
+            Step(None, "name")
+        with self.assertRaises(ValueError):
+            StepDescriptor(square, "")
+
+    def test_output_order(self):
+        """Test that the output of the step function follows the queued header of the step"""
+        def header(sender):
+            console.echo(f"Step {sender.name}")
+
+        out = io.StringIO()
+        lifecycle.subscribe(lifecycle.STEP_START, header)
+        try:
+            with contextlib.redirect_stdout(out):
+                StepDescriptor(lambda: print("body"), "print")()
+                console.flush()
+        finally:
+            lifecycle.unsubscribe(lifecycle.STEP_START, header)
+        lines = out.getvalue().splitlines()
+        self.assertLess(lines.index("Step print"), lines.index("body"))
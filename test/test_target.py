@@ -1,4 +1,5 @@
 from fruit.modules.target import Target
+import fruit.modules.lifecycle as lifecycle
 import unittest
 
 def fun():
@@ -48,4 +49,29 @@ class TestTarget(unittest.TestCase):
 
     def test_ondeactivate(self):
         """Test the OnDeactivate Event"""
-        pass
\ No newline at end of file
+        pass
+
+    def test_interrupted(self):
+        """Test that the end of a target interrupted by an exception is published"""
+        ended = []
+
+        def on_end(sender):
+            ended.append((sender.name, type(sender.exception)))
+
+        def broken():
+            raise KeyError("broken")
+
+        async def broken_async():
+            raise ValueError("broken")
+
+        lifecycle.subscribe(lifecycle.TARGET_END, on_end)
+        try:
+            with self.assertRaises(KeyError):
+                Target(broken, "broken")()
+            with self.assertRaises(ValueError):
+                Target(broken_async, "async")()
+            Target(fun, "fine")()
+        finally:
+            lifecycle.unsubscribe(lifecycle.TARGET_END, on_end)
+
+        self.assertEqual(ended, [("broken", KeyError), ("async", ValueError), ("fine", type(None))])
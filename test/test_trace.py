@@ -0,0 +1,80 @@
+from fruit.modules.trace import TraceRecorder
+from fruit.modules.target import Target
+from fruit.modules.step import StepDescriptor, SkipStepSignal
+import tempfile
+import threading
+import asyncio
+import unittest
+import json
+import os
+
+def skip():
+    raise SkipStepSignal()
+
+class TestTrace(unittest.TestCase):
+    """Test the timeline export of the executions"""
+
+    def test_trace(self):
+        """Test the begin and end events of targets and steps"""
+        step = StepDescriptor(skip, "skip")
+        target = Target(lambda: step(), "target")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            with TraceRecorder(path):
+                target()
+                worker = threading.Thread(target=target, name="worker")
+                worker.start()
+                worker.join()
+            # Events after the recording are not written
+            target()
+
+            with open(path, 'r') as fp:
+                events = json.load(fp)
+
+        spans = [e for e in events if e['ph'] in 'BE']
+        self.assertEqual([(e['ph'], e.get('name'), e['tid']) for e in spans], [
+            ('B', 'target', 1), ('B', 'skip', 1), ('E', None, 1), ('E', None, 1),
+            ('B', 'target', 2), ('B', 'skip', 2), ('E', None, 2), ('E', None, 2),
+        ])
+        self.assertEqual(spans[2]['args'], {'status': 'Skipped'})
+        self.assertTrue(all(a['ts'] <= b['ts'] for a, b in zip(spans[:4], spans[1:4])))
+
+        lanes = {e['tid']: e['args']['name'] for e in events if e.get('name') == 'thread_name'}
+        self.assertEqual(lanes[2], "worker")
+
+    def test_async(self):
+        """Test that async steps running at the same time on one thread are recorded in own lanes"""
+        def sleeper(seconds: float):
+            async def sleep():
+                await asyncio.sleep(seconds)
+            return StepDescriptor(sleep, f"sleep-{seconds}")
+
+        steps = [sleeper(0.03), sleeper(0.01), sleeper(0.02)]
+
+        async def gather():
+            await asyncio.gather(*(each() for each in steps))
+            await asyncio.gather(*(each() for each in steps))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            with TraceRecorder(path):
+                StepDescriptor(gather, "gather")()
+            with open(path, 'r') as fp:
+                events = json.load(fp)
+
+        # Pair the begin and end events of each lane
+        open_spans, spans = {}, []
+        for each in events:
+            if each['ph'] == 'B':
+                open_spans.setdefault(each['tid'], []).append(each)
+            elif each['ph'] == 'E':
+                begin = open_spans[each['tid']].pop()
+                spans.append((begin['name'].split(" :: ")[-1], (each['ts'] - begin['ts']) / 1e6))
+
+        self.assertEqual(sorted(name for name, __ in spans), ["gather"] + sorted(["sleep-0.01", "sleep-0.02", "sleep-0.03"] * 2))
+        for each_name, each_duration in spans:
+            if each_name != "gather":
+                self.assertGreaterEqual(each_duration, float(each_name.split("-")[1]) * 0.9)
+        # The lanes of the finished steps are reused
+        self.assertEqual(len({e['tid'] for e in events if e['ph'] == 'B'}), 3)
@@ -0,0 +1,114 @@
+from fruit.modules.watch import PatternSet, PollingWatcher, InotifyWatcher, InputTracker, WatchSession, translate_pattern
+from fruit.modules.garden import Garden
+from fruit.modules.target import Target
+from fruit.modules.step import StepDescriptor
+import tempfile
+import unittest
+import time
+import sys
+import re
+import os
+
+def write(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as fp:
+        fp.write(text)
+
+class TestPatterns(unittest.TestCase):
+    """Test the matching of the watched paths"""
+
+    def test_translate(self):
+        """Test the glob semantics of the patterns"""
+        cases = [
+            ("/src/*.py", "/src/a.py", True),
+            ("/src/*.py", "/src/sub/a.py", False),
+            ("/src/**/*.py", "/src/a.py", True),
+            ("/src/**/*.py", "/src/sub/deep/a.py", True),
+            ("/src/?.[ch]", "/src/a.c", True),
+            ("/src/?.[!ch]", "/src/a.c", False),
+            ("/src/a+b.txt", "/src/a+b.txt", True),
+        ]
+        for each_pattern, each_path, each_match in cases:
+            self.assertEqual(re.match(translate_pattern(each_pattern), each_path) is not None, each_match,
+                             (each_pattern, each_path))
+
+    def test_relative(self):
+        """Test that the patterns are relative to the current directory"""
+        patterns = PatternSet(["docs/*.md"])
+        self.assertTrue(patterns.match(os.path.abspath("docs/index.md")))
+        self.assertFalse(patterns.match(os.path.abspath("index.md")))
+
+class TestWatchers(unittest.TestCase):
+    """Test the file watchers"""
+
+    def check_watcher(self, watcher):
+        with tempfile.TemporaryDirectory() as tmp:
+            write(os.path.join(tmp, "src", "a.txt"), "a")
+            watcher.watch(PatternSet([os.path.join(tmp, "src", "**", "*.txt")]))
+            self.assertEqual(watcher.wait(0), set())
+
+            time.sleep(0.01)
+            write(os.path.join(tmp, "src", "a.txt"), "changed")
+            write(os.path.join(tmp, "src", "ignored.log"), "")
+            self.assertEqual(watcher.wait(5), {os.path.join(tmp, "src", "a.txt")})
+
+            # New subdirectories are watched
+            os.makedirs(os.path.join(tmp, "src", "sub"))
+            watcher.wait(0.1)
+            write(os.path.join(tmp, "src", "sub", "b.txt"), "b")
+            self.assertEqual(watcher.wait(5), {os.path.join(tmp, "src", "sub", "b.txt")})
+        watcher.close()
+
+    def test_polling(self):
+        """Test the polling watcher"""
+        self.check_watcher(PollingWatcher(interval=0.01))
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), "inotify is only available on Linux")
+    def test_inotify(self):
+        """Test the inotify watcher"""
+        self.check_watcher(InotifyWatcher())
+
+class TestInputTracker(unittest.TestCase):
+    """Test the collection of the inputs of the targets"""
+
+    def test_tracker(self):
+        """Test that nested targets collect the inputs of their steps"""
+        step = StepDescriptor(lambda: None, "gen", inputs=["src/*.c"], outputs=["build/gen.o"])
+        inner = Target(lambda: step(), "inner")
+        outer = Target(lambda: inner(), "outer")
+
+        tracker = InputTracker()
+        tracker.start()
+        try:
+            outer()
+        finally:
+            tracker.stop()
+
+        for each_name in ["inner", "outer"]:
+            self.assertTrue(tracker.inputs[each_name].match(os.path.abspath("src/main.c")))
+            self.assertTrue(tracker.outputs[each_name].match(os.path.abspath("build/gen.o")))
+
+class TestWatchSession(unittest.TestCase):
+    """Test the loading of the configuration by the watch session"""
+
+    def test_broken_config(self):
+        """Test that a configuration failing to load at the start is watched and loaded, when it is fixed"""
+        with tempfile.TemporaryDirectory() as tmp:
+            config = os.path.join(tmp, "fruitconfig.py")
+            write(config, "import fruit\n@fruit.target(\ndef build(): pass\n")
+            session = WatchSession(tmp, ["build"])
+            try:
+                with self.assertRaises(SyntaxError):
+                    session.load()
+
+                watcher = PollingWatcher(interval=0.01)
+                watcher.watch(session.patterns())
+                time.sleep(0.01)
+                write(config, "import fruit\n@fruit.target()\ndef build(): pass\n")
+                self.assertEqual(watcher.wait(5), {config})
+                watcher.close()
+
+                session.load()
+                self.assertEqual(session.targets(), ["build"])
+            finally:
+                Garden().clear()
@@ -0,0 +1,94 @@
+from fruit.modules import workspace, pickup
+import tempfile
+import unittest
+import time
+import os
+
+CONFIG = """
+import fruit
+
+@fruit.target(help="Build {name}")
+def build(): pass
+
+@fruit.target(tags=["ci"])
+def test(): pass
+"""
+
+class TestWorkspace(unittest.TestCase):
+    """Test the index of the picked-up configurations"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index_file = workspace.WORKSPACE_INDEX_FILE
+        self.fruitpath = pickup.DOT_FRUITPATH
+        workspace.WORKSPACE_INDEX_FILE = os.path.join(self.tmp.name, "cache", "workspace.json")
+        pickup.DOT_FRUITPATH = os.path.join(self.tmp.name, ".fruitpath")
+
+    def tearDown(self):
+        workspace.WORKSPACE_INDEX_FILE = self.index_file
+        pickup.DOT_FRUITPATH = self.fruitpath
+        self.tmp.cleanup()
+
+    def project(self, name: str, config: str = CONFIG) -> str:
+        path = os.path.join(self.tmp.name, name)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "fruitconfig.py"), 'w') as fp:
+            fp.write(config.format(name=name))
+        return path
+
+    def test_fruitpath(self):
+        """Test that the picked-up paths are saved one per line"""
+        first, second = self.project("first"), self.project("second")
+        pickup.pickup_path(first)
+        pickup.pickup_path(second)
+        pickup.pickup_path(first)
+        self.assertEqual(pickup.load_fruit_env(), [first, second])
+
+        pickup.drop_path(first)
+        self.assertEqual(pickup.load_fruit_env(), [second])
+
+    def test_project_name(self):
+        """Test the project names of the picked-up paths"""
+        path = self.project("tools")
+        self.assertEqual(workspace.project_name(path), "tools")
+        self.assertEqual(workspace.project_name(os.path.join(path, "fruitconfig.py")), "tools")
+
+        release = os.path.join(path, "release.py")
+        open(release, 'w').close()
+        self.assertEqual(workspace.project_name(release), "release")
+
+    def test_index(self):
+        """Test the global target names and their cached index"""
+        first, second = self.project("first"), self.project("second")
+        index = workspace.load_workspace([first, second])
+        self.assertEqual([each.name for each in index.targets()],
+                         ["first:build", "first:test", "second:build", "second:test"])
+        self.assertEqual(index.targets()[2].help, "Build second")
+
+        # Changed configurations are scanned again
+        time.sleep(0.01)
+        self.project("second", CONFIG + "\n@fruit.target()\ndef deploy(): pass\n")
+        index = workspace.load_workspace([first, second])
+        self.assertIn("second:deploy", [each.name for each in index.targets()])
+
+    def test_resolve(self):
+        """Test the resolution of the global target selectors"""
+        first, second = self.project("first"), self.project("second")
+        index = workspace.load_workspace([first, second])
+        config = os.path.join(second, "fruitconfig.py")
+
+        self.assertEqual(index.resolve(["second:build", "second:@tag:ci"]), (config, ["build", "@tag:ci"]))
+        self.assertEqual(index.resolve(["build", "@tag:ci"]), (None, ["build", "@tag:ci"]))
+        with self.assertRaises(ValueError):
+            index.resolve(["second:deploy"])
+        with self.assertRaises(ValueError):
+            index.resolve(["first:build", "second:build"])
+        with self.assertRaises(ValueError):
+            index.resolve(["build", "second:build"])
+
+    def test_is_global(self):
+        """Test which selectors may refer to a picked-up project"""
+        self.assertTrue(workspace.is_global("tools:build"))
+        self.assertTrue(workspace.is_global("tools:@tag:ci"))
+        self.assertFalse(workspace.is_global("build"))
+        self.assertFalse(workspace.is_global("@tag:ci"))